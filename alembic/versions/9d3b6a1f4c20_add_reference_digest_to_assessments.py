@@ -0,0 +1,30 @@
+"""add reference_digest to assessments
+
+Revision ID: 9d3b6a1f4c20
+Revises: 37f42b9bb151
+Create Date: 2026-10-19 09:12:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6a1f4c20'
+down_revision: Union[str, Sequence[str], None] = '37f42b9bb151'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('assessments', sa.Column('reference_digest', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_assessments_reference_digest'), 'assessments', ['reference_digest'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_assessments_reference_digest'), table_name='assessments')
+    op.drop_column('assessments', 'reference_digest')
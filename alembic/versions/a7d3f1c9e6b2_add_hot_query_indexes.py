@@ -0,0 +1,46 @@
+"""add hot query indexes
+
+Revision ID: a7d3f1c9e6b2
+Revises: e2a9c4b7d815
+Create Date: 2026-10-19 19:02:47.318526
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f1c9e6b2'
+down_revision: Union[str, Sequence[str], None] = 'e2a9c4b7d815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_department_section', 'users', ['department_id', 'section'], unique=False)
+    op.create_index('ix_users_last_used', 'users', ['last_used'], unique=False)
+    op.create_index(
+        'ix_user_credentials_valid',
+        'user_credentials',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('is_valid'),
+        sqlite_where=sa.text('is_valid'),
+    )
+    op.create_index(
+        'ix_cohort_states_term_probe',
+        'cohort_states',
+        ['academic_year', 'semester', 'last_probe_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cohort_states_term_probe', table_name='cohort_states')
+    op.drop_index('ix_user_credentials_valid', table_name='user_credentials')
+    op.drop_index('ix_users_last_used', table_name='users')
+    op.drop_index('ix_users_department_section', table_name='users')
@@ -0,0 +1,70 @@
+"""store encrypted payloads as binary
+
+Revision ID: b41e7c95d2a8
+Revises: 9d3b6a1f4c20
+Create Date: 2026-10-19 11:37:05.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7c95d2a8'
+down_revision: Union[str, Sequence[str], None] = '9d3b6a1f4c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column) pairs holding AES-GCM payloads
+ENCRYPTED_COLUMNS = (
+    ('semester_results', 'encrypted_result_detail'),
+    ('assessments', 'encrypted_assessment_detail'),
+    ('assessments', 'encrypted_grade'),
+)
+
+
+def _to_bytea(column: str) -> str:
+    # Existing rows hold URL-safe base64 tokens; decode them in place so the ciphertext
+    # (and its legacy JSON plaintext) stays readable. Anything that is not a token is
+    # kept as its UTF-8 bytes and simply fails authentication on read.
+    return (
+        f"CASE WHEN {column} ~ '^[A-Za-z0-9_-]*={{0,2}}$' AND length({column}) % 4 = 0 "
+        f"THEN decode(translate({column}, '-_', '+/'), 'base64') "
+        f"ELSE convert_to({column}, 'UTF8') END"
+    )
+
+
+def _to_text(column: str) -> str:
+    # encode(..., 'base64') wraps lines every 76 chars; translate drops the newlines.
+    return f"translate(encode({column}, 'base64'), E'+/\\n', '-_')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in ENCRYPTED_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            existing_type=sa.Text(),
+            type_=sa.LargeBinary(),
+            existing_nullable=False,
+            postgresql_using=_to_bytea(column),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows written in the compact format stay binary-encoded inside the token and need
+    # the new codec to read; only the column type is restored here.
+    for table, column in ENCRYPTED_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            existing_type=sa.LargeBinary(),
+            type_=sa.Text(),
+            existing_nullable=False,
+            postgresql_using=_to_text(column),
+        )
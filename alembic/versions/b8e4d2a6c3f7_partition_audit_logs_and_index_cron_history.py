@@ -0,0 +1,100 @@
+"""partition audit logs and index cron history
+
+Revision ID: b8e4d2a6c3f7
+Revises: a7d3f1c9e6b2
+Create Date: 2026-10-19 20:14:31.605219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4d2a6c3f7'
+down_revision: Union[str, Sequence[str], None] = 'a7d3f1c9e6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# One partition per month from the oldest row through next month; later months are
+# created ahead by services.retention.RetentionService.
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    -- UTC wall-clock time, so months are truncated in UTC whatever the session time zone
+    first_at timestamp := (coalesce((SELECT min("timestamp") FROM audit_logs_unpartitioned), now()) AT TIME ZONE 'UTC');
+    start_at date := date_trunc('month', first_at);
+    stop_at date := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '1 month';
+BEGIN
+    WHILE start_at <= stop_at LOOP
+        EXECUTE format(
+            'CREATE TABLE audit_logs_%s PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+            to_char(start_at, 'YYYY_MM'), start_at || ' 00:00:00+00', (start_at + interval '1 month')::date || ' 00:00:00+00'
+        );
+        start_at := start_at + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_cron_runs_started_at'), 'cron_runs', ['started_at'], unique=False)
+    op.create_index(op.f('ix_cohort_scans_started_at'), 'cohort_scans', ['started_at'], unique=False)
+    if op.get_bind().dialect.name != 'postgresql':
+        # SQLite keeps a plain table; retention falls back to batched deletes there
+        op.drop_index('ix_audit_logs_telegram_id', table_name='audit_logs', if_exists=True)
+        op.create_index('ix_audit_logs_telegram_id_timestamp', 'audit_logs', ['telegram_id', 'timestamp'], unique=False)
+        return
+
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned')
+    op.execute('ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey')
+    op.drop_index('ix_audit_logs_telegram_id', table_name='audit_logs_unpartitioned', if_exists=True)
+    op.execute(
+        'CREATE TABLE audit_logs ('
+        ' id UUID NOT NULL,'
+        ' telegram_id BIGINT NOT NULL,'
+        ' action VARCHAR(255) NOT NULL,'
+        ' details JSON,'
+        ' "timestamp" TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,'
+        ' PRIMARY KEY (id, "timestamp")'
+        ') PARTITION BY RANGE ("timestamp")'
+    )
+    op.create_index('ix_audit_logs_telegram_id_timestamp', 'audit_logs', ['telegram_id', 'timestamp'], unique=False)
+    op.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute(
+        'INSERT INTO audit_logs (id, telegram_id, action, details, "timestamp") '
+        'SELECT id, telegram_id, action, details, coalesce("timestamp", now()) FROM audit_logs_unpartitioned'
+    )
+    op.drop_table('audit_logs_unpartitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cohort_scans_started_at'), table_name='cohort_scans')
+    op.drop_index(op.f('ix_cron_runs_started_at'), table_name='cron_runs')
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_audit_logs_telegram_id_timestamp', table_name='audit_logs')
+        op.create_index('ix_audit_logs_telegram_id', 'audit_logs', ['telegram_id'], unique=False)
+        return
+
+    op.create_table(
+        'audit_logs_unpartitioned',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('action', sa.String(length=255), nullable=False),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name='audit_logs_unpartitioned_pkey'),
+    )
+    op.execute(
+        'INSERT INTO audit_logs_unpartitioned (id, telegram_id, action, details, "timestamp") '
+        'SELECT id, telegram_id, action, details, "timestamp" FROM audit_logs'
+    )
+    op.drop_table('audit_logs')
+    op.rename_table('audit_logs_unpartitioned', 'audit_logs')
+    op.execute('ALTER TABLE audit_logs RENAME CONSTRAINT audit_logs_unpartitioned_pkey TO audit_logs_pkey')
+    op.create_index('ix_audit_logs_telegram_id', 'audit_logs', ['telegram_id'], unique=False)
@@ -0,0 +1,33 @@
+"""add wrapped data key to users
+
+Revision ID: c5e8a2d4f913
+Revises: b41e7c95d2a8
+Create Date: 2026-10-19 15:03:47.518209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a2d4f913'
+down_revision: Union[str, Sequence[str], None] = 'b41e7c95d2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('wrapped_data_key', sa.LargeBinary(), nullable=True))
+    op.add_column('users', sa.Column('data_key_id', sa.String(length=16), nullable=True))
+    op.create_index(op.f('ix_users_data_key_id'), 'users', ['data_key_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows sealed under data keys become unreadable once the wrapped keys are gone.
+    op.drop_index(op.f('ix_users_data_key_id'), table_name='users')
+    op.drop_column('users', 'data_key_id')
+    op.drop_column('users', 'wrapped_data_key')
@@ -0,0 +1,28 @@
+"""add is_reachable to users
+
+Revision ID: d7a2e4c9f1b6
+Revises: c3f9a1e5d7b4
+Create Date: 2026-10-19 22:41:27.803514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2e4c9f1b6'
+down_revision: Union[str, Sequence[str], None] = 'c3f9a1e5d7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('is_reachable', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'is_reachable')
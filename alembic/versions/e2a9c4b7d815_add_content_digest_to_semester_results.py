@@ -0,0 +1,35 @@
+"""add content digest to semester results
+
+Revision ID: e2a9c4b7d815
+Revises: c5e8a2d4f913
+Create Date: 2026-10-19 17:26:09.744310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4b7d815'
+down_revision: Union[str, Sequence[str], None] = 'c5e8a2d4f913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('semester_results', sa.Column('content_digest', sa.String(length=64), nullable=True))
+    op.create_index(
+        'ix_semester_results_user_term_digest',
+        'semester_results',
+        ['user_id', 'academic_year', 'semester', 'content_digest'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_semester_results_user_term_digest', table_name='semester_results')
+    op.drop_column('semester_results', 'content_digest')
@@ -0,0 +1,44 @@
+"""add broadcast jobs
+
+Revision ID: e4b8c1f6a2d9
+Revises: d7a2e4c9f1b6
+Create Date: 2026-10-19 23:32:51.146027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c1f6a2d9'
+down_revision: Union[str, Sequence[str], None] = 'd7a2e4c9f1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'broadcast_jobs',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('admin_telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.Enum('RUNNING', 'COMPLETED', 'CANCELLED', name='broadcaststatus'), nullable=False),
+        sa.Column('cursor', sa.BigInteger(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('sent', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('status_message_id', sa.BigInteger(), nullable=True),
+        sa.Column('lease_until', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('broadcast_jobs')
+    sa.Enum(name='broadcaststatus').drop(op.get_bind(), checkfirst=True)
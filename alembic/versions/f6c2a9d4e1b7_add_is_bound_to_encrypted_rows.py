@@ -0,0 +1,35 @@
+"""add is_bound to encrypted rows
+
+Revision ID: f6c2a9d4e1b7
+Revises: e4b8c1f6a2d9
+Create Date: 2026-10-20 09:12:40.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c2a9d4e1b7'
+down_revision: Union[str, Sequence[str], None] = 'e4b8c1f6a2d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('user_credentials', 'semester_results', 'assessments')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows may predate associated-data binding; the re-encryption job binds them
+    # and sets the flag. Rows written from now on are bound.
+    for table in TABLES:
+        op.add_column(table, sa.Column('is_bound', sa.Boolean(), server_default=sa.false(), nullable=False))
+        op.alter_column(table, 'is_bound', server_default=sa.true())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'is_bound')
@@ -5,6 +5,7 @@ from __future__ import annotations
 import hmac
 from contextlib import suppress
 from typing import Any
+from zoneinfo import ZoneInfo
 
 from aiohttp import web
 from aiogram import Bot, Dispatcher
@@ -15,7 +16,7 @@ from clients.aau_portal_adapter import AAUPortalClient
 from clients.telegram_adapter import AiogramTelegramNotificationSender
 from clients.cache_adapter import InMemoryCache
 from config import Settings
-from crypto.cipher import AesGcmCipher
+from crypto.envelope import DataKeyCache, EnvelopeKeyring
 from handlers.commands.admin import build_admin_router
 from handlers.commands.fallback import build_fallback_router
 from handlers.commands.grades import build_grades_router
@@ -26,14 +27,29 @@ from handlers.commands.my_data import build_my_data_router
 from services.container import ApplicationServices
 from services.account_lifecycle.service import AccountLifecycleService
 from services.admin.service import AdminService
+from services.audit.service import BufferedAuditWriter
+from services.background.service import BackgroundJobSupervisor
+from services.broadcast.service import BroadcastService
+from services.grade_persistence.service import GradePersistenceService
+from services.grades.limiter import RefreshLimiter
 from services.grades.service import GradeReadService
-from services.notification.service import NotificationService
+from services.key_rotation.reencrypt import PayloadReencryptionService
+from services.key_rotation.service import DataKeyRewrapService
+from services.notification.alerts import AdminAlertAggregator
+from services.notification.outbox import NotificationOutboxRelay
+from services.notification.service import NotificationService, SharedRateLimiter
 from services.registration.service import RegistrationService
+from services.retention.service import RetentionService
 from services.scheduler.service import SchedulerService
 from services.scraper.service import ScraperService
 
 
-def build_http_app(settings: Settings, services: ApplicationServices | None = None) -> web.Application:
+def build_http_app(
+    settings: Settings,
+    services: ApplicationServices | None = None,
+    dispatcher: Dispatcher | None = None,
+    bot: Bot | None = None,
+) -> web.Application:
     app = web.Application()
 
     async def health(_request: web.Request) -> web.Response:
@@ -61,6 +77,16 @@ def build_http_app(settings: Settings, services: ApplicationServices | None = No
         if services and hasattr(services, 'scheduler'):
             import asyncio
             asyncio.create_task(services.scheduler.run_once())
+            if getattr(services, 'key_rotation', None) is not None:
+                asyncio.create_task(services.key_rotation.run())
+            if getattr(services, 'reencryption', None) is not None:
+                asyncio.create_task(services.reencryption.run())
+            if getattr(services, 'retention', None) is not None:
+                asyncio.create_task(services.retention.run())
+            if getattr(services, 'outbox', None) is not None:
+                services.outbox.wake()
+            if getattr(services, 'broadcasts', None) is not None:
+                asyncio.create_task(services.broadcasts.resume())
             
         return web.json_response({"status": "accepted"})
 
@@ -68,6 +94,20 @@ def build_http_app(settings: Settings, services: ApplicationServices | None = No
     app.router.add_get("/health", health)
     app.router.add_get("/metrics", metrics)
     app.router.add_post("/cron", cron)
+
+    if settings.webhook_endpoint and dispatcher is not None and bot is not None:
+        from aiogram.webhook.aiohttp_server import setup_application
+        from handlers.webhook import BoundedWebhookRequestHandler
+
+        if not settings.webhook_secret:
+            raise ValueError("WEBHOOK_SECRET is required to receive Telegram updates by webhook")
+        BoundedWebhookRequestHandler(
+            dispatcher,
+            bot,
+            secret_token=settings.webhook_secret,
+            max_concurrency=settings.update_concurrency,
+        ).register(app, path=settings.webhook_path)
+        setup_application(app, dispatcher, bot=bot)
     return app
 
 
@@ -76,11 +116,15 @@ def build_application_services(
     bot: Bot | None = None,
     session_factory: Any | None = None,
 ) -> ApplicationServices:
-    if not settings.encryption_key:
+    if not settings.active_encryption_keys:
         raise ValueError("ENCRYPTION_KEY is required to build application services")
 
     portal_client = AAUPortalClient(settings)
-    cipher = AesGcmCipher.from_base64_key(settings.encryption_key)
+    keyring = EnvelopeKeyring.from_base64_keys(
+        settings.active_encryption_keys,
+        DataKeyCache(max_entries=settings.data_key_cache_size, ttl_seconds=settings.data_key_cache_ttl_seconds),
+    )
+    cipher = keyring.master
     sender = AiogramTelegramNotificationSender(bot, settings.admins_telegram_id) if bot is not None else None
     
     # Initialize cache
@@ -90,7 +134,29 @@ def build_application_services(
     else:
         cache = InMemoryCache()
 
-    notification_service = NotificationService(sender)
+    notification_service = NotificationService(
+        sender,
+        workers=settings.notification_workers,
+        max_queue=settings.notification_queue_size,
+        global_limit=settings.notification_rate_limit,
+        min_global_limit=settings.notification_rate_limit_min,
+        max_global_limit=settings.notification_rate_limit_max,
+        max_attempts=settings.notification_max_attempts,
+        digest_window_seconds=settings.notification_digest_window_seconds,
+        quiet_hours=settings.quiet_hours,
+        timezone=ZoneInfo(settings.notification_timezone),
+        # Instances sharing Redis share Telegram's limits too
+        limiter=SharedRateLimiter(cache, global_limit=settings.notification_rate_limit) if settings.redis_url else None,
+    )
+    alerts = AdminAlertAggregator(notification_service, window_seconds=settings.admin_alert_window_seconds)
+    background = BackgroundJobSupervisor()
+    refresh_limiter = RefreshLimiter(
+        cache,
+        user_burst=settings.manual_refresh_burst,
+        user_refill_seconds=settings.manual_scrape_cooldown_minutes * 60,
+        global_burst=settings.portal_refresh_burst,
+        global_per_minute=settings.portal_refresh_per_minute,
+    )
 
     if session_factory is None and settings.database_url:
         with suppress(Exception):
@@ -98,32 +164,111 @@ def build_application_services(
             engine = create_engine_from_url(settings.database_url)
             session_factory = create_session_factory(engine)
 
+    audit = BufferedAuditWriter(
+        session_factory,
+        batch_size=settings.audit_flush_batch_size,
+        flush_interval_seconds=settings.audit_flush_interval_ms / 1000,
+    ) if session_factory is not None else None
+    outbox = NotificationOutboxRelay(
+        session_factory,
+        notification_service,
+        batch_size=settings.outbox_batch_size,
+        max_attempts=settings.outbox_max_attempts,
+    ) if session_factory is not None and sender is not None else None
+    # Grade writes that release grades wake the outbox, which delivers the staged notices
+    persistence = GradePersistenceService(on_change=outbox.grades_changed if outbox is not None else None)
+    broadcasts = BroadcastService(
+        session_factory,
+        notification_service,
+        notifier=sender,
+        page_size=settings.broadcast_page_size,
+        progress_interval_seconds=settings.broadcast_progress_interval_seconds,
+    ) if session_factory is not None and sender is not None else None
+    lifecycle = AccountLifecycleService(
+        notifier=sender,
+        session_factory=session_factory,
+        portal_client=portal_client,
+        keyring=keyring,
+        audit=audit,
+        notifications=notification_service,
+    )
+    # Chats that blocked the bot are flagged so broadcasts and cron notices skip them
+    notification_service.on_unreachable = lifecycle.mark_unreachable
+
     return ApplicationServices(
         registration=RegistrationService(
             portal_client=portal_client,
             cipher=cipher,
             session_factory=session_factory,
             cache=cache,
+            keyring=keyring,
+            persistence=persistence,
+            audit=audit,
         ),
         grades=GradeReadService(
             portal_client=portal_client,
             cipher=cipher,
             session_factory=session_factory,
             cache=cache,
+            manual_scrape_cooldown_minutes=settings.manual_scrape_cooldown_minutes,
             notification_service=notification_service,
+            background=background,
+            stale_while_revalidate=settings.force_refresh_stale_while_revalidate,
+            refresh_limiter=refresh_limiter,
+            keyring=keyring,
+            persistence=persistence,
+            audit=audit,
+            alerts=alerts,
+        ),
+        admin=AdminService(
+            notifier=sender,
+            session_factory=session_factory,
+            notifications=notification_service,
+            broadcasts=broadcasts,
+            alerts=alerts,
         ),
-        admin=AdminService(notifier=sender, session_factory=session_factory),
         scheduler=SchedulerService(
             notification_service=notification_service,
             portal_client=portal_client,
             lock=cache,
             session_factory=session_factory,
             cipher=cipher,
+            refresh_limiter=refresh_limiter,
+            keyring=keyring,
+            persistence=persistence,
+            outbox=outbox,
+            alerts=alerts,
         ),
-        lifecycle=AccountLifecycleService(notifier=sender, session_factory=session_factory, portal_client=portal_client),
+        lifecycle=lifecycle,
         notification=notification_service,
         scraper=ScraperService(portal_client),
         session_factory=session_factory,
+        background=background,
+        key_rotation=DataKeyRewrapService(
+            session_factory,
+            keyring,
+            lock=cache,
+            batch_size=settings.data_key_rewrap_batch_size,
+        ) if session_factory is not None else None,
+        reencryption=PayloadReencryptionService(
+            session_factory,
+            keyring,
+            lock=cache,
+            batch_size=settings.reencryption_batch_size,
+            concurrency=settings.reencryption_concurrency,
+        ) if session_factory is not None else None,
+        audit=audit,
+        retention=RetentionService(
+            session_factory,
+            lock=cache,
+            audit_retention_months=settings.audit_retention_months,
+            cron_history_days=settings.cron_history_retention_days,
+            batch_size=settings.retention_batch_size,
+            archive_dir=settings.audit_archive_dir,
+        ) if session_factory is not None else None,
+        outbox=outbox,
+        broadcasts=broadcasts,
+        alerts=alerts,
     )
 
 
@@ -132,10 +277,16 @@ def build_dispatcher(settings: Settings, services: ApplicationServices) -> Dispa
     if settings.redis_url:
         with suppress(Exception):
             storage = RedisStorage.from_url(settings.redis_url)
-    dispatcher = Dispatcher(storage=storage)
+    from handlers.middlewares.lanes import ChatOrderIsolation, UpdateLanesMiddleware
+    # Updates run concurrently, but one chat's updates run one at a time in arrival order
+    dispatcher = Dispatcher(storage=storage, events_isolation=ChatOrderIsolation())
     
     from handlers.middlewares.logging import LoggingMiddleware
     from handlers.middlewares.maintenance import MaintenanceMiddleware
+    dispatcher.update.middleware(UpdateLanesMiddleware(
+        fast_concurrency=settings.update_fast_lane_concurrency,
+        slow_concurrency=settings.update_slow_lane_concurrency,
+    ))
     dispatcher.update.middleware(LoggingMiddleware())
     dispatcher.update.middleware(MaintenanceMiddleware(settings, services))
     
@@ -3,7 +3,80 @@
 from __future__ import annotations
 
 import time
-from typing import Dict, Tuple
+import uuid
+from collections import deque
+from typing import Dict, Sequence, Tuple
+
+
+# KEYS: bucket keys. ARGV[1]: cost; ARGV[2k], ARGV[2k+1]: capacity and refill/sec of KEYS[k].
+# Each bucket is a hash of {tokens, ts}; nothing is taken unless every bucket can pay.
+_CONSUME_TOKENS_LUA = """
+local cost = tonumber(ARGV[1])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[i * 2])
+  local rate = tonumber(ARGV[i * 2 + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local level = capacity
+  if state[1] then
+    level = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+  end
+  levels[i] = level
+  if level < cost then
+    wait = math.max(wait, (cost - level) / rate)
+  end
+end
+if wait > 0 then
+  return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[i * 2])
+  local rate = tonumber(ARGV[i * 2 + 1])
+  redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+  redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return '0'
+"""
+
+# KEYS[1]: hold key (a send pause, as its TTL). KEYS[2..]: sliding-window keys (sorted sets
+# of grant times). ARGV[1]: member for this grant; ARGV[2k], ARGV[2k+1]: limit and period
+# (seconds) of KEYS[k+1]. Returns {wait, blocker}: wait 0 means granted in every window,
+# otherwise nothing was recorded and blocker is the 0-based window index (-1 for the hold).
+_RESERVE_SLOTS_LUA = """
+local hold = redis.call('PTTL', KEYS[1])
+if hold > 0 then
+  return {tostring(hold / 1000), '-1'}
+end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local wait = 0
+local blocker = -1
+for i = 2, #KEYS do
+  local limit = tonumber(ARGV[(i - 1) * 2])
+  local period = tonumber(ARGV[(i - 1) * 2 + 1])
+  redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - period)
+  local count = redis.call('ZCARD', KEYS[i])
+  if count >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[i], count - limit, count - limit, 'WITHSCORES')
+    local until_free = tonumber(oldest[2]) + period - now
+    if until_free > wait then
+      wait = until_free
+      blocker = i - 2
+    end
+  end
+end
+if wait > 0 then
+  return {tostring(wait), tostring(blocker)}
+end
+for i = 2, #KEYS do
+  redis.call('ZADD', KEYS[i], now, ARGV[1])
+  redis.call('PEXPIRE', KEYS[i], math.ceil(tonumber(ARGV[(i - 1) * 2 + 1]) * 1000) + 1000)
+end
+return {'0', '-1'}
+"""
 
 
 class InMemoryCache:
@@ -12,6 +85,9 @@ class InMemoryCache:
     def __init__(self) -> None:
         # key -> (value, expires_at_timestamp)
         self._store: Dict[str, Tuple[str, float | None]] = {}
+        # key -> (grant times inside the sliding window, oldest first; window period)
+        self._windows: Dict[str, Tuple[deque[float], float]] = {}
+        self._windows_pruned_at = 0.0
 
     async def get(self, key: str) -> str | None:
         if key not in self._store:
@@ -42,12 +118,66 @@ class InMemoryCache:
     async def release_lock(self, key: str) -> None:
         await self.delete(key)
 
+    async def consume_tokens(self, buckets: Sequence[tuple[str, float, float]], cost: float = 1.0) -> float:
+        now = time.time()
+        levels = []
+        wait = 0.0
+        for key, capacity, rate in buckets:
+            level = float(capacity)
+            stored = await self.get(key)
+            if stored is not None:
+                tokens, ts = stored.split(":")
+                level = min(capacity, float(tokens) + max(0.0, now - float(ts)) * rate)
+            levels.append(level)
+            if level < cost:
+                wait = max(wait, (cost - level) / rate)
+        if wait > 0:
+            return wait
+        for (key, capacity, rate), level in zip(buckets, levels):
+            await self.set(key, f"{level - cost}:{now}", ttl_seconds=int(capacity / rate) + 1)
+        return 0.0
+
+    async def reserve_slots(self, hold_key: str, windows: Sequence[tuple[str, int, float]]) -> tuple[float, int]:
+        now = time.time()
+        if hold_key in self._store:
+            _, expires_at = self._store[hold_key]
+            if expires_at is not None and expires_at > now:
+                return expires_at - now, -1
+        wait, blocker = 0.0, -1
+        for index, (key, limit, period) in enumerate(windows):
+            granted, _ = self._windows.setdefault(key, (deque(), period))
+            while granted and granted[0] <= now - period:
+                granted.popleft()
+            if len(granted) >= limit:
+                until_free = granted[len(granted) - limit] + period - now
+                if until_free > wait:
+                    wait, blocker = until_free, index
+        if wait > 0:
+            return wait, blocker
+        for key, _limit, _period in windows:
+            self._windows[key][0].append(now)
+        if now - self._windows_pruned_at >= 1.0:
+            # Drop windows that have emptied, as Redis expires their keys
+            self._windows_pruned_at = now
+            for key, (granted, period) in list(self._windows.items()):
+                if not granted or granted[-1] <= now - period:
+                    del self._windows[key]
+        return 0.0, -1
+
+    async def hold(self, key: str, seconds: float) -> None:
+        expires_at = time.time() + seconds
+        _, current = self._store.get(key, ("", None))
+        if current is None or current < expires_at:
+            self._store[key] = ("1", expires_at)
+
 class RedisCache:
     """Redis-backed cache adapter."""
 
     def __init__(self, url: str) -> None:
         import redis.asyncio as redis
         self.redis = redis.from_url(url, decode_responses=True)
+        self._consume_tokens_script = self.redis.register_script(_CONSUME_TOKENS_LUA)
+        self._reserve_slots_script = self.redis.register_script(_RESERVE_SLOTS_LUA)
 
     async def get(self, key: str) -> str | None:
         try:
@@ -88,3 +218,38 @@ class RedisCache:
         except Exception as e:
             import logging
             logging.getLogger(__name__).error(f"Redis release_lock error: {e}")
+
+    async def consume_tokens(self, buckets: Sequence[tuple[str, float, float]], cost: float = 1.0) -> float:
+        args: list[float] = [cost]
+        for _key, capacity, rate in buckets:
+            args.extend((capacity, rate))
+        try:
+            wait = await self._consume_tokens_script(keys=[key for key, _c, _r in buckets], args=args)
+            return float(wait)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).error(f"Redis consume_tokens error: {e}")
+            return 0.0 # If Redis fails, allow the refresh to proceed as a fallback
+
+    async def reserve_slots(self, hold_key: str, windows: Sequence[tuple[str, int, float]]) -> tuple[float, int]:
+        args: list[str | float] = [uuid.uuid4().hex]
+        for _key, limit, period in windows:
+            args.extend((limit, period))
+        try:
+            keys = [hold_key, *(key for key, _limit, _period in windows)]
+            wait, blocker = await self._reserve_slots_script(keys=keys, args=args)
+            return float(wait), int(blocker)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).error(f"Redis reserve_slots error: {e}")
+            return 0.0, -1 # If Redis fails, fall back to sending; Telegram's 429 handling still applies
+
+    async def hold(self, key: str, seconds: float) -> None:
+        try:
+            milliseconds = max(1, int(seconds * 1000))
+            # Only ever extends a pause another instance set
+            if not await self.redis.set(key, "1", px=milliseconds, nx=True):
+                await self.redis.pexpire(key, milliseconds, gt=True)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).error(f"Redis hold error: {e}")
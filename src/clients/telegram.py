@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Protocol
+
+ADMIN_ALERT_PREFIX = "🚨 Admin Alert:\n"
+
+
+class NotificationDeliveryError(Exception):
+    """Telegram did not accept a message."""
+
+
+class NotificationFloodControlError(NotificationDeliveryError):
+    """Telegram asked us to stop sending for ``retry_after`` seconds (HTTP 429)."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Flood control exceeded; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RecipientUnreachableError(NotificationDeliveryError):
+    """The user blocked the bot or the account is gone; retrying will not help."""
+
+
+class NotificationSender(Protocol):
+    async def send_message(self, telegram_id: int, text: str) -> None:
+        """Send ``text``; raise a ``NotificationDeliveryError`` when Telegram refuses it."""
+        raise NotImplementedError()
+
+    async def send_admin_alert(self, text: str) -> None:
+        """Send ``text`` to every admin; failures are logged, not raised."""
+        raise NotImplementedError()
+
+    async def edit_message(self, telegram_id: int, message_id: int, text: str) -> None:
+        """Replace the text of a message the bot sent earlier."""
+        raise NotImplementedError()
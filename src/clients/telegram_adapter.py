@@ -2,27 +2,63 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+
+from clients.telegram import (
+    ADMIN_ALERT_PREFIX,
+    NotificationDeliveryError,
+    NotificationFloodControlError,
+    RecipientUnreachableError,
+)
 
 logger = logging.getLogger(__name__)
 
+
+_UNREACHABLE_MARKERS = ("chat not found", "user is deactivated", "bot was blocked", "peer_id_invalid")
+
+
 class AiogramTelegramNotificationSender:
     def __init__(self, bot: Bot | None, admin_telegram_ids: list[int] | None = None) -> None:
         self.bot = bot
         self.admin_telegram_ids = admin_telegram_ids or []
 
     async def send_message(self, telegram_id: int, text: str) -> None:
+        """Send ``text``; raises ``NotificationDeliveryError`` (or a subclass) when Telegram refuses it."""
         if self.bot:
             try:
                 await self.bot.send_message(telegram_id, text, parse_mode="HTML")
+            except TelegramRetryAfter as e:
+                raise NotificationFloodControlError(e.retry_after) from e
+            except (TelegramForbiddenError, TelegramNotFound) as e:
+                raise RecipientUnreachableError(str(e)) from e
+            except TelegramBadRequest as e:
+                if any(marker in str(e).lower() for marker in _UNREACHABLE_MARKERS):
+                    raise RecipientUnreachableError(str(e)) from e
+                raise NotificationDeliveryError(str(e)) from e
             except Exception as e:
-                logger.error(f"Failed to send message to {telegram_id}: {e}")
+                raise NotificationDeliveryError(f"Failed to send message to {telegram_id}: {e}") from e
+
+    async def edit_message(self, telegram_id: int, message_id: int, text: str) -> None:
+        if self.bot:
+            try:
+                await self.bot.edit_message_text(text, chat_id=telegram_id, message_id=message_id, parse_mode="HTML")
+            except TelegramBadRequest as e:
+                if "message is not modified" not in str(e).lower():
+                    raise NotificationDeliveryError(str(e)) from e
 
     async def send_admin_alert(self, text: str) -> None:
+        """Send ``text`` to every admin at once; one admin failing does not hold up the rest."""
         if self.bot:
-            for admin_id in self.admin_telegram_ids:
-                try:
-                    await self.bot.send_message(admin_id, f"🚨 Admin Alert:\n{text}", parse_mode="HTML")
-                except Exception as e:
-                    logger.error(f"Failed to send admin alert to {admin_id}: {e}")
+            results = await asyncio.gather(
+                *(
+                    self.bot.send_message(admin_id, f"{ADMIN_ALERT_PREFIX}{text}", parse_mode="HTML")
+                    for admin_id in self.admin_telegram_ids
+                ),
+                return_exceptions=True,
+            )
+            for admin_id, result in zip(self.admin_telegram_ids, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to send admin alert to {admin_id}: {result}")
@@ -1,4 +1,5 @@
 import logging
+import re
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -22,8 +23,67 @@ class Settings(BaseSettings):
     portal_timeout_seconds: int = 30
     registration_cooldown_seconds: int = 300
     manual_scrape_cooldown_minutes: int = 30
+    manual_refresh_burst: int = 2
+    portal_refresh_per_minute: float = 60.0
+    portal_refresh_burst: int = 30
+    force_refresh_stale_while_revalidate: bool = True
     inactivity_notice_months: int = 9
     encryption_key: str | None = None
+    encryption_keys: list[str] | None = None
+    data_key_cache_size: int = 10000
+    data_key_cache_ttl_seconds: int = 900
+    data_key_rewrap_batch_size: int = 500
+    reencryption_batch_size: int = 200
+    reencryption_concurrency: int = 2
+    audit_flush_batch_size: int = 100
+    audit_flush_interval_ms: int = 500
+    audit_retention_months: int = 12
+    audit_archive_dir: str | None = None
+    cron_history_retention_days: int = 90
+    retention_batch_size: int = 1000
+    notification_workers: int = 8
+    notification_queue_size: int = 10000
+    notification_drain_timeout_seconds: float = 10.0
+    notification_rate_limit: int = 30
+    notification_rate_limit_min: int = 10
+    notification_rate_limit_max: int = 30
+    notification_max_attempts: int = 3
+    notification_digest_window_seconds: float = 60.0
+    notification_quiet_hours: str | None = None
+    notification_timezone: str = "Africa/Addis_Ababa"
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 8
+    broadcast_page_size: int = 500
+    broadcast_progress_interval_seconds: float = 5.0
+    admin_alert_window_seconds: float = 300.0
+    webhook_url: str | None = None
+    webhook_path: str = "/telegram/webhook"
+    webhook_secret: str | None = None
+    update_concurrency: int = 100
+    update_fast_lane_concurrency: int = 16
+    update_slow_lane_concurrency: int = 4
+
+    @property
+    def active_encryption_keys(self) -> list[str]:
+        """ENCRYPTION_KEYS (primary first) when set, otherwise the single ENCRYPTION_KEY."""
+        if self.encryption_keys:
+            return list(self.encryption_keys)
+        return [self.encryption_key] if self.encryption_key else []
+
+    @property
+    def quiet_hours(self) -> tuple[int, int] | None:
+        """NOTIFICATION_QUIET_HOURS as ``(start, end)`` local hours, e.g. "22-7" -> ``(22, 7)``."""
+        if not self.notification_quiet_hours:
+            return None
+        start, end = (int(hour) for hour in self.notification_quiet_hours.split("-", 1))
+        return start % 24, end % 24
+
+    @property
+    def webhook_endpoint(self) -> str | None:
+        """Full URL Telegram posts updates to, or ``None`` to poll for them instead."""
+        if not self.webhook_url:
+            return None
+        return self.webhook_url.rstrip("/") + self.webhook_path
 
     @field_validator("port")
     @classmethod
@@ -39,6 +99,30 @@ class Settings(BaseSettings):
             raise ValueError("BOT_TOKEN is required")
         return value
 
+    @field_validator("notification_quiet_hours")
+    @classmethod
+    def validate_quiet_hours(cls, value: str | None) -> str | None:
+        if value:
+            parts = value.split("-", 1)
+            if len(parts) != 2 or not all(part.strip().isdigit() and int(part) < 24 for part in parts):
+                raise ValueError("NOTIFICATION_QUIET_HOURS must look like 22-7 (start-end, local hours)")
+        return value
+
+    @field_validator("webhook_secret")
+    @classmethod
+    def validate_webhook_secret(cls, value: str | None) -> str | None:
+        # Telegram accepts 1-256 characters from A-Z, a-z, 0-9, _ and -
+        if value is not None and not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", value):
+            raise ValueError("WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ or -")
+        return value
+
+    @field_validator("update_concurrency", "update_fast_lane_concurrency", "update_slow_lane_concurrency")
+    @classmethod
+    def validate_update_concurrency(cls, value: int, info: ValidationInfo) -> int:
+        if value <= 0:
+            raise ValueError(f"{info.field_name.upper()} must be a positive integer")
+        return value
+
     @field_validator("database_url")
     @classmethod
     def validate_database_url(cls, value: str | None) -> str | None:
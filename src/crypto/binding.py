@@ -0,0 +1,39 @@
+"""Associated data binding each ciphertext to the row it is stored in."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def row_associated_data(table: str, user_id: Any, *term: Any) -> bytes:
+    """
+    AES-GCM associated data for a row: ``table|user_id[|academic_year|semester]``.
+    A blob copied into another user's row, term or table then fails authentication.
+    """
+    parts = [table, str(user_id), *(getattr(part, "name", str(part)) for part in term)]
+    return "|".join(parts).encode("utf-8")
+
+
+def credential_associated_data(user_id: Any) -> bytes:
+    return row_associated_data("user_credentials", user_id)
+
+
+def semester_result_associated_data(user_id: Any, academic_year: str, semester: Any) -> bytes:
+    return row_associated_data("semester_results", user_id, academic_year, semester)
+
+
+def assessment_associated_data(user_id: Any, academic_year: str, semester: Any) -> bytes:
+    return row_associated_data("assessments", user_id, academic_year, semester)
+
+
+def decrypt_bound(cipher: Any, token: str, associated_data: bytes, bound: bool = True) -> str:
+    """
+    Decrypt a token bound to ``associated_data``. Only a row flagged as not yet bound
+    (``is_bound`` False, written before binding existed) may still be read without it.
+    """
+    try:
+        return cipher.decrypt(token, associated_data)
+    except ValueError:
+        if bound:
+            raise
+        return cipher.decrypt(token)
@@ -2,13 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import hashlib
+import hmac
 import secrets
 from dataclasses import dataclass
+from typing import Sequence
 
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+# Associated data for a batch: shared by every item, or one entry per item
+AssociatedData = bytes | Sequence[bytes | None] | None
+
 
 @dataclass(frozen=True)
 class Ciphertext:
@@ -36,11 +43,16 @@ class AesGcmCipher:
 
     NONCE_SIZE = 12
     KEY_SIZE = 32
+    # Batches at least this large are offloaded to a worker thread by the async variants;
+    # AESGCM releases the GIL, so the event loop keeps serving updates meanwhile.
+    OFFLOAD_THRESHOLD = 256
 
     def __init__(self, key: bytes) -> None:
         if len(key) != self.KEY_SIZE:
             raise ValueError("AES-256-GCM requires a 32-byte key")
         self._aesgcm = AESGCM(key)
+        # Separate subkey so digests never reuse the encryption key directly.
+        self._digest_key = hmac.new(key, b"aau-grades/digest-v1", hashlib.sha256).digest()
 
     @classmethod
     def from_base64_key(cls, encoded_key: str) -> "AesGcmCipher":
@@ -53,15 +65,19 @@ class AesGcmCipher:
         """Generate a fresh base64-encoded 32-byte key."""
         return base64.urlsafe_b64encode(secrets.token_bytes(AesGcmCipher.KEY_SIZE)).decode("ascii")
 
-    def encrypt(self, plaintext: str, associated_data: bytes | None = None) -> str:
-        """Encrypt plaintext and return a URL-safe token."""
+    def seal(self, plaintext: str, associated_data: bytes | None = None) -> Ciphertext:
+        """Encrypt plaintext and keep nonce and ciphertext apart, e.g. to store the IV."""
         nonce = secrets.token_bytes(self.NONCE_SIZE)
         ciphertext = self._aesgcm.encrypt(
             nonce,
             plaintext.encode("utf-8"),
             associated_data,
         )
-        return Ciphertext(nonce=nonce, ciphertext=ciphertext).to_token()
+        return Ciphertext(nonce=nonce, ciphertext=ciphertext)
+
+    def encrypt(self, plaintext: str, associated_data: bytes | None = None) -> str:
+        """Encrypt plaintext and return a URL-safe token."""
+        return self.seal(plaintext, associated_data).to_token()
 
     def decrypt(self, token: str, associated_data: bytes | None = None) -> str:
         """Decrypt a URL-safe token into plaintext."""
@@ -75,3 +91,95 @@ class AesGcmCipher:
         except InvalidTag as exc:
             raise ValueError("Ciphertext authentication failed") from exc
         return plaintext.decode("utf-8")
+
+    def encrypt_bytes(self, plaintext: bytes, associated_data: bytes | None = None) -> bytes:
+        """Encrypt raw bytes and return ``nonce || ciphertext`` for binary columns."""
+        nonce = secrets.token_bytes(self.NONCE_SIZE)
+        return nonce + self._aesgcm.encrypt(nonce, plaintext, associated_data)
+
+    def decrypt_bytes(self, blob: bytes | str, associated_data: bytes | None = None) -> bytes:
+        """Decrypt ``nonce || ciphertext`` bytes; legacy URL-safe tokens are accepted too."""
+        if isinstance(blob, str):
+            blob = base64.urlsafe_b64decode(blob.encode("ascii"))
+        if len(blob) < self.NONCE_SIZE:
+            raise ValueError("Ciphertext token is too short")
+        try:
+            return self._aesgcm.decrypt(
+                blob[:self.NONCE_SIZE],
+                blob[self.NONCE_SIZE:],
+                associated_data,
+            )
+        except InvalidTag as exc:
+            raise ValueError("Ciphertext authentication failed") from exc
+
+    @staticmethod
+    def _per_item(associated_data: AssociatedData, count: int) -> Sequence[bytes | None]:
+        """Expand shared associated data to one entry per batch item."""
+        if associated_data is None or isinstance(associated_data, (bytes, bytearray)):
+            return [associated_data] * count
+        if len(associated_data) != count:
+            raise ValueError("Per-item associated data must match the batch length")
+        return associated_data
+
+    def encrypt_many(
+        self,
+        plaintexts: Sequence[bytes],
+        associated_data: AssociatedData = None,
+    ) -> list[tuple[bytes, bytes]]:
+        """
+        Encrypt a batch; returns ``(nonce || ciphertext, nonce)`` pairs in input order.
+        ``associated_data`` is either shared by the batch or a sequence with one entry per item.
+        """
+        size = self.NONCE_SIZE
+        nonces = secrets.token_bytes(size * len(plaintexts))
+        encrypt = self._aesgcm.encrypt
+        sealed = []
+        for index, (plaintext, ad) in enumerate(zip(plaintexts, self._per_item(associated_data, len(plaintexts)))):
+            nonce = nonces[index * size:(index + 1) * size]
+            sealed.append((nonce + encrypt(nonce, plaintext, ad), nonce))
+        return sealed
+
+    def decrypt_many(
+        self,
+        blobs: Sequence[bytes | str],
+        associated_data: AssociatedData = None,
+        strict: bool = True,
+    ) -> list[bytes | None]:
+        """
+        Decrypt a batch of ``nonce || ciphertext`` blobs (legacy tokens accepted).
+        With ``strict=False`` unreadable entries come back as None instead of raising.
+        """
+        plaintexts: list[bytes | None] = []
+        for blob, ad in zip(blobs, self._per_item(associated_data, len(blobs))):
+            try:
+                plaintexts.append(self.decrypt_bytes(blob, ad))
+            except (ValueError, TypeError):
+                if strict:
+                    raise
+                plaintexts.append(None)
+        return plaintexts
+
+    async def encrypt_many_async(
+        self,
+        plaintexts: Sequence[bytes],
+        associated_data: AssociatedData = None,
+    ) -> list[tuple[bytes, bytes]]:
+        """``encrypt_many`` that runs large batches in a worker thread."""
+        if len(plaintexts) < self.OFFLOAD_THRESHOLD:
+            return self.encrypt_many(plaintexts, associated_data)
+        return await asyncio.to_thread(self.encrypt_many, plaintexts, associated_data)
+
+    async def decrypt_many_async(
+        self,
+        blobs: Sequence[bytes | str],
+        associated_data: AssociatedData = None,
+        strict: bool = True,
+    ) -> list[bytes | None]:
+        """``decrypt_many`` that runs large batches in a worker thread."""
+        if len(blobs) < self.OFFLOAD_THRESHOLD:
+            return self.decrypt_many(blobs, associated_data, strict)
+        return await asyncio.to_thread(self.decrypt_many, blobs, associated_data, strict)
+
+    def digest(self, value: str) -> str:
+        """Return a deterministic keyed HMAC-SHA256 hex digest, safe to index and compare."""
+        return hmac.new(self._digest_key, value.encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1,182 @@
+"""Envelope encryption: per-user data keys wrapped by a master key."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Sequence
+
+from .cipher import AesGcmCipher
+
+# Wrapped data key layout: format byte || master key id || nonce || ciphertext
+WRAPPED_KEY_FORMAT = 0x01
+KEY_ID_SIZE = 8
+
+
+def master_key_id(key: bytes) -> str:
+    """Short public fingerprint of a master key, stored next to each wrapped data key."""
+    return hmac.new(key, b"aau-grades/key-id-v1", hashlib.sha256).digest()[:KEY_ID_SIZE].hex()
+
+
+class FallbackCipher(AesGcmCipher):
+    """
+    Cipher that encrypts with its own key but can also decrypt with older ones, so rows
+    sealed before a user got a data key (or before a master rotation) stay readable.
+    """
+
+    def __init__(self, key: bytes, fallbacks: Sequence[AesGcmCipher] = ()) -> None:
+        super().__init__(key)
+        self.fallbacks = tuple(fallbacks)
+
+    def decrypt_for_rotation(self, blob: bytes | str, associated_data: bytes | None = None) -> tuple[bytes, bool]:
+        """Decrypt ``blob``; the flag is True when only a fallback key could open it, i.e. it is due for re-encryption."""
+        try:
+            return super().decrypt_bytes(blob, associated_data), False
+        except ValueError:
+            for fallback in self.fallbacks:
+                try:
+                    return fallback.decrypt_bytes(blob, associated_data), True
+                except ValueError:
+                    continue
+            raise
+
+    def decrypt(self, token: str, associated_data: bytes | None = None) -> str:
+        return self.decrypt_bytes(token, associated_data).decode("utf-8")
+
+    def decrypt_bytes(self, blob: bytes | str, associated_data: bytes | None = None) -> bytes:
+        return self.decrypt_for_rotation(blob, associated_data)[0]
+
+
+class DataKeyCache:
+    """Bounded LRU of unwrapped data-key ciphers whose entries also expire after ``ttl_seconds``."""
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class EnvelopeKeyring:
+    """
+    Issues, wraps and unwraps per-user data keys.
+
+    Payload rows are sealed with the owning user's data key; only the small wrapped key on
+    ``users`` depends on the master key. Rotating the master therefore means re-wrapping one
+    key per user, while retired masters stay listed until that job has finished.
+    """
+
+    def __init__(
+        self,
+        master_key: bytes,
+        retired_keys: Sequence[bytes] = (),
+        cache: DataKeyCache | None = None,
+    ) -> None:
+        self.master_key_id = master_key_id(master_key)
+        self._primary = AesGcmCipher(master_key)
+        self._masters = {master_key_id(key): AesGcmCipher(key) for key in retired_keys}
+        self._masters[self.master_key_id] = self._primary
+        # Users without a data key are still served by the master keys directly
+        self.master = FallbackCipher(master_key, [AesGcmCipher(key) for key in retired_keys])
+        self.cache = cache if cache is not None else DataKeyCache()
+
+    @classmethod
+    def from_base64_keys(cls, keys: Sequence[str], cache: DataKeyCache | None = None) -> "EnvelopeKeyring":
+        """
+        Create a keyring from base64-encoded 32-byte keys, as found in ``ENCRYPTION_KEYS``.
+        The first key is the primary and encrypts; the rest are only used to decrypt.
+        """
+        if not keys:
+            raise ValueError("At least one encryption key is required")
+        decoded = [base64.urlsafe_b64decode(key.encode("ascii")) for key in keys]
+        return cls(decoded[0], decoded[1:], cache)
+
+    @property
+    def has_retired_keys(self) -> bool:
+        return len(self._masters) > 1
+
+    @staticmethod
+    def _wrap_associated_data(user_id: Any) -> bytes:
+        # Binds a wrapped key to its owner, so it cannot be copied onto another user
+        return f"data-key:{user_id}".encode("utf-8")
+
+    @staticmethod
+    def wrapped_key_id(wrapped: bytes) -> str:
+        """Id of the master key that wrapped ``wrapped``."""
+        return bytes(wrapped[1:1 + KEY_ID_SIZE]).hex()
+
+    def wrap(self, user_id: Any, data_key: bytes) -> bytes:
+        """Wrap ``data_key`` under the current master key."""
+        sealed = self._primary.encrypt_bytes(data_key, self._wrap_associated_data(user_id))
+        return bytes([WRAPPED_KEY_FORMAT]) + bytes.fromhex(self.master_key_id) + sealed
+
+    def unwrap(self, user_id: Any, wrapped: bytes) -> bytes:
+        """Recover a data key wrapped by the current or a retired master key."""
+        wrapped = bytes(wrapped)
+        if len(wrapped) <= 1 + KEY_ID_SIZE or wrapped[0] != WRAPPED_KEY_FORMAT:
+            raise ValueError("Unknown wrapped data key format")
+        master = self._masters.get(self.wrapped_key_id(wrapped))
+        if master is None:
+            raise ValueError("Data key is wrapped by an unknown master key")
+        return master.decrypt_bytes(wrapped[1 + KEY_ID_SIZE:], self._wrap_associated_data(user_id))
+
+    def needs_rewrap(self, wrapped: bytes) -> bool:
+        return self.wrapped_key_id(wrapped) != self.master_key_id
+
+    def rewrap(self, user_id: Any, wrapped: bytes) -> bytes:
+        """Re-wrap an existing data key under the current master key; the data key itself is unchanged."""
+        return self.wrap(user_id, self.unwrap(user_id, wrapped))
+
+    def new_data_key(self, user_id: Any) -> tuple[AesGcmCipher, bytes]:
+        """Generate a data key for ``user_id``; returns its cipher and the wrapped key to store."""
+        data_key = secrets.token_bytes(AesGcmCipher.KEY_SIZE)
+        wrapped = self.wrap(user_id, data_key)
+        cipher = FallbackCipher(data_key, [self.master])
+        self.cache.put((str(user_id), wrapped), cipher)
+        return cipher, wrapped
+
+    def cipher_for(self, user_id: Any, wrapped: bytes | None) -> AesGcmCipher:
+        """Cipher for one user's payloads: their data key if they have one, else the master key."""
+        if wrapped is None:
+            return self.master
+        cache_key = (str(user_id), bytes(wrapped))
+        cipher = self.cache.get(cache_key)
+        if cipher is None:
+            cipher = FallbackCipher(self.unwrap(user_id, wrapped), [self.master])
+            self.cache.put(cache_key, cipher)
+        return cipher
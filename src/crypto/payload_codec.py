@@ -0,0 +1,147 @@
+"""Versioned compact encoding for encrypted grade payloads."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import zlib
+from typing import Any, Sequence
+
+from pydantic import BaseModel
+
+from crypto.cipher import AesGcmCipher, AssociatedData
+
+logger = logging.getLogger(__name__)
+
+# First plaintext byte of a sealed payload. Legacy payloads are bare JSON and
+# therefore start with "{" (0x7b) or "[" (0x5b), which never collide with a version.
+FORMAT_ZLIB_JSON = 0x01
+
+_LEGACY_JSON_PREFIXES = (ord("{"), ord("["))
+_ZLIB_LEVEL = 6
+
+
+def encode_payload(data: BaseModel | dict[str, Any]) -> bytes:
+    """Serialize a model or dict to the current compact format (version byte + zlib(JSON))."""
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    body = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return bytes((FORMAT_ZLIB_JSON,)) + zlib.compress(body, _ZLIB_LEVEL)
+
+
+def decode_payload(raw: bytes) -> Any:
+    """Inverse of ``encode_payload``; also reads legacy bare-JSON payloads."""
+    if not raw:
+        raise ValueError("Empty payload")
+    version = raw[0]
+    if version == FORMAT_ZLIB_JSON:
+        return json.loads(zlib.decompress(raw[1:]))
+    if version in _LEGACY_JSON_PREFIXES:
+        return json.loads(raw)
+    raise ValueError(f"Unknown payload format version: {version}")
+
+
+def payload_digest(cipher: AesGcmCipher, data: BaseModel | dict[str, Any], associated_data: bytes) -> str:
+    """
+    Keyed digest of a payload's content in its row context, stored next to the ciphertext.
+    Equal digests mean equal content, so unchanged rows are recognised without decrypting.
+    """
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return cipher.digest(f"{associated_data.decode('utf-8')}|{body}")
+
+
+def seal_payload(
+    cipher: AesGcmCipher,
+    data: BaseModel | dict[str, Any],
+    associated_data: bytes | None = None,
+) -> bytes:
+    """Encode and encrypt ``data`` for a binary column."""
+    return cipher.encrypt_bytes(encode_payload(data), associated_data)
+
+
+def open_payload(
+    cipher: AesGcmCipher,
+    stored: bytes | str,
+    associated_data: bytes | None = None,
+    bound: bool = True,
+) -> Any:
+    """
+    Decrypt and decode a stored payload, whether binary or a legacy text token.
+    Pass ``bound=False`` for rows not yet bound to their associated data; only those are read without it.
+    """
+    try:
+        raw = cipher.decrypt_bytes(stored, associated_data)
+    except ValueError:
+        if associated_data is None or bound:
+            raise
+        raw = cipher.decrypt_bytes(stored)
+    return decode_payload(raw)
+
+
+def seal_payloads(
+    cipher: AesGcmCipher,
+    items: Sequence[BaseModel | dict[str, Any]],
+    associated_data: AssociatedData = None,
+) -> list[tuple[bytes, str]]:
+    """Encode and encrypt a batch; returns ``(blob, iv)`` pairs with the IV ready for the ``iv`` column."""
+    sealed = cipher.encrypt_many([encode_payload(item) for item in items], associated_data)
+    return [(blob, base64.urlsafe_b64encode(nonce).decode("ascii")) for blob, nonce in sealed]
+
+
+def open_payloads(
+    cipher: AesGcmCipher,
+    stored: Sequence[bytes | str],
+    associated_data: AssociatedData = None,
+    bound: bool | Sequence[bool] = True,
+) -> list[Any | None]:
+    """
+    Decrypt and decode a batch; unreadable entries are logged and come back as None.
+    ``bound`` is one flag for the batch or one per entry, as for ``open_payload``.
+    """
+    decoded = []
+    raws = cipher.decrypt_many(stored, associated_data, strict=False)
+    if associated_data is not None:
+        flags = [bound] * len(stored) if isinstance(bound, bool) else bound
+        # Rows sealed before associated data was bound
+        raws = [
+            raw if raw is not None or is_bound else cipher.decrypt_many([blob], strict=False)[0]
+            for raw, blob, is_bound in zip(raws, stored, flags)
+        ]
+    for raw in raws:
+        if raw is None:
+            logger.warning("Failed to decrypt stored payload")
+            decoded.append(None)
+            continue
+        try:
+            decoded.append(decode_payload(raw))
+        except Exception as e:
+            logger.warning(f"Failed to decode stored payload: {e}")
+            decoded.append(None)
+    return decoded
+
+
+async def seal_payloads_async(
+    cipher: AesGcmCipher,
+    items: Sequence[BaseModel | dict[str, Any]],
+    associated_data: AssociatedData = None,
+) -> list[tuple[bytes, str]]:
+    """``seal_payloads`` that runs large batches in a worker thread."""
+    if len(items) < cipher.OFFLOAD_THRESHOLD:
+        return seal_payloads(cipher, items, associated_data)
+    return await asyncio.to_thread(seal_payloads, cipher, items, associated_data)
+
+
+async def open_payloads_async(
+    cipher: AesGcmCipher,
+    stored: Sequence[bytes | str],
+    associated_data: AssociatedData = None,
+    bound: bool | Sequence[bool] = True,
+) -> list[Any | None]:
+    """``open_payloads`` that runs large batches in a worker thread."""
+    if len(stored) < cipher.OFFLOAD_THRESHOLD:
+        return open_payloads(cipher, stored, associated_data, bound)
+    return await asyncio.to_thread(open_payloads, cipher, stored, associated_data, bound)
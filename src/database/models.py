@@ -1,9 +1,9 @@
 import uuid
 from enum import Enum, auto
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 
-from sqlalchemy import JSON, Integer, BigInteger, String, ForeignKey, Text, DateTime, func, UniqueConstraint, Index
+from sqlalchemy import DDL, JSON, Integer, BigInteger, String, ForeignKey, Text, DateTime, LargeBinary, event, func, text, UniqueConstraint, Index
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column
 
@@ -38,6 +38,16 @@ class GradeChangeStatus(Enum):
 class SectionSource(Enum):
     SCRAPED = auto()
     USER_REPORTED = auto()
+
+class OutboxStatus(Enum):
+    PENDING = auto()
+    SENT = auto()
+    FAILED = auto()
+
+class BroadcastStatus(Enum):
+    RUNNING = auto()
+    COMPLETED = auto()
+    CANCELLED = auto()
     
 class Base(DeclarativeBase):
     pass
@@ -85,6 +95,24 @@ class User(Base):
 
     is_credential_valid: Mapped[bool] = mapped_column(default=True)
 
+    # False once Telegram reports the user blocked the bot or deleted the account
+    is_reachable: Mapped[bool] = mapped_column(
+        default=True,
+        server_default=text("true")
+    )
+
+    # Per-user data key, wrapped by the master key identified by data_key_id
+    wrapped_data_key: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True
+    )
+
+    data_key_id: Mapped[str | None] = mapped_column(
+        String(16),
+        index=True,
+        nullable=True
+    )
+
     last_used: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -114,6 +142,20 @@ class User(Base):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # Cohort lookups filter on both columns together
+        Index(
+            "ix_users_department_section",
+            "department_id",
+            "section"
+        ),
+        # Inactive-user cleanup range scan
+        Index(
+            "ix_users_last_used",
+            "last_used"
+        ),
+    )
+
 
 class UserCredential(Base):
     __tablename__ = "user_credentials"
@@ -135,10 +177,27 @@ class UserCredential(Base):
     failed_attempts: Mapped[int] = mapped_column(default=0)
     locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
+    # False for rows written before payloads were bound to their row (see crypto.binding);
+    # only those may still be opened without associated data, until the re-encryption job binds them
+    is_bound: Mapped[bool] = mapped_column(
+        default=True,
+        server_default=text("true")
+    )
+
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user: Mapped["User"] = relationship("User", back_populates="credential")
 
+    __table_args__ = (
+        # Partial index: the cron scan only joins users whose credentials still work
+        Index(
+            "ix_user_credentials_valid",
+            "user_id",
+            postgresql_where=text("is_valid"),
+            sqlite_where=text("is_valid")
+        ),
+    )
+
 class Campus(Base):
     __tablename__ = "campuses"
     
@@ -287,13 +346,14 @@ class Assessment(Base):
         unique=True
     )
 
-    encrypted_assessment_detail: Mapped[str] = mapped_column(
-        Text,
+    # nonce || AES-GCM(payload_codec) bytes; see crypto.payload_codec
+    encrypted_assessment_detail: Mapped[bytes] = mapped_column(
+        LargeBinary,
         nullable=False
     )
 
-    encrypted_grade: Mapped[str] = mapped_column(
-        Text,
+    encrypted_grade: Mapped[bytes] = mapped_column(
+        LargeBinary,
         nullable=False
     )
 
@@ -302,6 +362,20 @@ class Assessment(Base):
         nullable=False
     )
 
+    # Keyed HMAC of (user, academic_year_id, semester_id, course_id) from the portal's
+    # AssessmentReference, so a drilldown targets exactly one row without decrypting.
+    reference_digest: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True,
+        index=True
+    )
+
+    # See UserCredential.is_bound; False until every payload in the row is bound
+    is_bound: Mapped[bool] = mapped_column(
+        default=True,
+        server_default=text("true")
+    )
+
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -322,8 +396,7 @@ class AuditLog(Base):
 
     telegram_id: Mapped[int] = mapped_column(
         BigInteger,
-        nullable=False,
-        index=True
+        nullable=False
     )
 
     action: Mapped[str] = mapped_column(
@@ -336,11 +409,32 @@ class AuditLog(Base):
         nullable=True
     )
 
+    # Part of the primary key because PostgreSQL partitions this table by month on it
     timestamp: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
+        default=lambda: datetime.now(timezone.utc),
         server_default=func.now()
     )
 
+    __table_args__ = (
+        # Admin lookups: one user's events within a time window
+        Index(
+            "ix_audit_logs_telegram_id_timestamp",
+            "telegram_id",
+            "timestamp"
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+# Monthly partitions are created ahead by the retention job; the default partition
+# keeps inserts working on a fresh create_all database until it has run
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT").execute_if(dialect="postgresql"),
+)
+
 """
 This is used to store system-wide settings that can be configured by the admin. 
 Such as - is_scheduling_enabled, is_maintenance_mode, etc.
@@ -382,13 +476,26 @@ class SemesterResult(Base):
         nullable=False
     )
 
-    encrypted_result_detail: Mapped[str] = mapped_column(
-        Text, 
+    # nonce || AES-GCM(payload_codec) bytes; see crypto.payload_codec
+    encrypted_result_detail: Mapped[bytes] = mapped_column(
+        LargeBinary,
         nullable=False
     )
 
     iv: Mapped[str] = mapped_column(String(255), nullable=False)
 
+    # Keyed digest of the decrypted payload in its row context; see crypto.payload_codec.payload_digest
+    content_digest: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+    # See UserCredential.is_bound; False until every payload in the row is bound
+    is_bound: Mapped[bool] = mapped_column(
+        default=True,
+        server_default=text("true")
+    )
+
     user: Mapped["User"] = relationship(
         back_populates="semester_results"
     )
@@ -400,6 +507,14 @@ class SemesterResult(Base):
             "semester",
             name="uq_user_semester_result"
         ),
+        # Covers the cron diff, which compares digests per term without reading ciphertext
+        Index(
+            "ix_semester_results_user_term_digest",
+            "user_id",
+            "academic_year",
+            "semester",
+            "content_digest",
+        ),
     )
 
 class CronRun(Base):
@@ -412,7 +527,8 @@ class CronRun(Base):
 
     started_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        server_default=func.now()
+        server_default=func.now(),
+        index=True
     )
 
     finished_at: Mapped[datetime | None] = mapped_column(
@@ -512,6 +628,16 @@ class CohortState(Base):
 
     last_run = relationship("CronRun")
 
+    __table_args__ = (
+        # Eligible-cohort query: current term, not probed recently
+        Index(
+            "ix_cohort_states_term_probe",
+            "academic_year",
+            "semester",
+            "last_probe_at"
+        ),
+    )
+
 class CohortScan(Base):
     __tablename__ = "cohort_scans"
 
@@ -560,7 +686,8 @@ class CohortScan(Base):
 
     started_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        server_default=func.now()
+        server_default=func.now(),
+        index=True
     )
 
     finished_at: Mapped[datetime | None] = mapped_column(
@@ -592,4 +719,125 @@ class CohortScan(Base):
             "semester",
             "section"
         ),
-    )
\ No newline at end of file
+    )
+
+
+class NotificationOutbox(Base):
+    """A user notification committed together with the change it announces."""
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    # Staging the same key twice is a no-op, so a re-run never queues a second copy
+    idempotency_key: Mapped[str] = mapped_column(
+        String(255),
+        unique=True,
+        nullable=False
+    )
+
+    telegram_id: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False
+    )
+
+    body: Mapped[str] = mapped_column(
+        Text,
+        nullable=False
+    )
+
+    status: Mapped[OutboxStatus] = mapped_column(
+        SQLEnum(OutboxStatus),
+        default=OutboxStatus.PENDING
+    )
+
+    attempts: Mapped[int] = mapped_column(default=0)
+
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
+
+    last_error: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    sent_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True)
+    )
+
+    __table_args__ = (
+        # Relay claims: only pending rows, earliest due first
+        Index(
+            "ix_notification_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'")
+        ),
+    )
+
+
+class BroadcastJob(Base):
+    """An admin broadcast, streamed to users in ``telegram_id`` order and resumable from ``cursor``."""
+    __tablename__ = "broadcast_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    admin_telegram_id: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False
+    )
+
+    body: Mapped[str] = mapped_column(
+        Text,
+        nullable=False
+    )
+
+    status: Mapped[BroadcastStatus] = mapped_column(
+        SQLEnum(BroadcastStatus),
+        default=BroadcastStatus.RUNNING
+    )
+
+    # Last telegram_id whose page was fully handed to Telegram; NULL before the first page
+    cursor: Mapped[int | None] = mapped_column(
+        BigInteger,
+        nullable=True
+    )
+
+    total: Mapped[int] = mapped_column(default=0)
+    sent: Mapped[int] = mapped_column(default=0)
+    failed: Mapped[int] = mapped_column(default=0)
+
+    # The admin's progress message, edited as pages complete
+    status_message_id: Mapped[int | None] = mapped_column(
+        BigInteger,
+        nullable=True
+    )
+
+    # The process sending this job holds it until then; an expired lease means it died
+    lease_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True)
+    )
@@ -38,6 +38,7 @@ class GradeReadResult:
     current_page: int = 0
     total_pages: int = 1
     report: Any | None = None
+    refreshing: bool = False
 
 
 
@@ -46,6 +47,7 @@ class BroadcastRequest:
     admin_telegram_id: int
     message: str
     recipient_ids: tuple[int, ...] = field(default_factory=tuple)
+    status_message_id: int | None = None
 
 
 @dataclass(frozen=True)
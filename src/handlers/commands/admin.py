@@ -48,17 +48,30 @@ def build_admin_router(settings: Settings, services: ApplicationServices) -> Rou
                 await message.answer(f"Broadcast cancelled because you sent '{text}'.")
             return
 
+        await state.clear()
+        # The broadcast job edits this message with its progress
+        status = await message.answer("📣 Starting broadcast...")
         request = BroadcastRequest(
             admin_telegram_id=message.from_user.id if message.from_user else 0,
             message=text,
+            status_message_id=status.message_id,
         )
         try:
             result = await services.admin.broadcast(request)
-            await state.clear()
-            await message.answer(result.message)
+            if result.job_id is None:
+                await status.edit_text(result.message)
         except Exception as exc:
-            await state.clear()
-            await message.answer(f"❌ Broadcast failed: {html.escape(str(exc))}")
+            await status.edit_text(f"❌ Broadcast failed: {html.escape(str(exc))}")
+
+    @router.message(Command("broadcast_cancel"))
+    async def cancel_broadcast(message: Message, state: FSMContext) -> None:
+        """Stops every running broadcast job."""
+        await state.clear()
+        try:
+            cancelled = await services.admin.cancel_broadcasts()
+            await message.answer(f"🛑 Cancelled {cancelled} running broadcast(s)." if cancelled else "No broadcast is running.")
+        except Exception as exc:
+            await message.answer(f"❌ Failed to cancel broadcast: {html.escape(str(exc))}")
 
     @router.message(Command("metrics"))
     async def metrics(message: Message, state: FSMContext) -> None:
@@ -114,6 +127,7 @@ def build_admin_router(settings: Settings, services: ApplicationServices) -> Rou
                 "/setsetting &lt;key&gt; &lt;value&gt; - Update a setting\n"
                 "/metrics - View bot metrics\n"
                 "/broadcast - Send a broadcast message\n"
+                "/broadcast_cancel - Stop a running broadcast\n"
                 "/start_service - Enable grade checking service\n"
                 "/stop_service - Disable grade checking service\n"
                 "/maintenance_on - Enable maintenance mode\n"
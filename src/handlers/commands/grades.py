@@ -5,6 +5,7 @@ import asyncio
 from typing import Any
 
 from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
@@ -269,20 +270,31 @@ def build_grades_router(services: ApplicationServices) -> Router:
         parts = query.data.split(":")
         year = parts[1]
         semester = parts[2]
+        message = query.message
         
         user_id = query.from_user.id
         request = GradeReadRequest(telegram_id=user_id, force_refresh=True, year_filter=year, semester_filter=semester, page_index=0)
         
         await query.answer("Scraping portal...")
-        await query.message.edit_text(f"🔄 Force refreshing grades for {year}, Semester {semester}... Please wait.")
+        if not getattr(services.grades, "stale_while_revalidate", False):
+            await message.edit_text(f"🔄 Force refreshing grades for {year}, Semester {semester}... Please wait.")
+
+        async def on_refreshed(result) -> None:
+            # Runs in a background job once the portal scrape settles; edit the same message in place.
+            kb = build_grades_keyboard(year, semester, result.report, result.current_page, result.total_pages)
+            try:
+                await message.edit_text(result.message, reply_markup=kb)
+            except TelegramBadRequest as exc:
+                import logging
+                logging.getLogger(__name__).debug(f"Skipped refreshed grades edit: {exc}")
         
         try:
-            result = await services.grades.read(request)
+            result = await services.grades.read_stale_while_revalidate(request, on_refreshed)
             kb = build_grades_keyboard(year, semester, result.report, result.current_page, result.total_pages)
-            await query.message.edit_text(result.message, reply_markup=kb)
+            await message.edit_text(result.message, reply_markup=kb)
         except Exception as exc:
             import logging
             logging.getLogger(__name__).error(f"Error reading grades: {exc}", exc_info=True)
-            await query.message.edit_text("❌ An error occurred while retrieving your grades. Please try again later.")
+            await message.edit_text("❌ An error occurred while retrieving your grades. Please try again later.")
 
     return router
@@ -436,20 +436,13 @@ def build_registration_router(services: ApplicationServices) -> Router:
         except PortalSchemaChangedError as exc:
             await state.clear()
             
-            # Extract HTML snippet if available
-            html_snippet = exc.diagnostic.html_snippet if exc.diagnostic and hasattr(exc.diagnostic, "html_snippet") and exc.diagnostic.html_snippet else "N/A"
-            escaped_snippet = html.escape(html_snippet)
-            admin_msg = (
-                f"🚨 <b>PORTAL SCHEMA CHANGED</b> 🚨\n\n"
-                f"A schema change was detected during registration for user <code>{query.from_user.id if query.from_user else 'Unknown'}</code>.\n"
-                f"<b>Error:</b> {exc}\n\n"
-                f"<b>HTML Snippet:</b>\n<pre><code class='language-html'>{escaped_snippet}</code></pre>"
-            )
-            # Send message to all admins using notification service
-            if hasattr(services, 'notification') and hasattr(services.notification, 'send_admin'):
-                await services.notification.send_admin(admin_msg)
+            # One alert per schema signature and window, however many users hit it
+            if getattr(services, 'alerts', None) is not None:
+                await services.alerts.schema_changed(
+                    exc, f"registration for user <code>{query.from_user.id if query.from_user else 'Unknown'}</code>"
+                )
             else:
-                logger.error("Notification service not found, cannot alert admin.")
+                logger.error("Admin alerts not configured, cannot alert admin.")
 
             if query.message:
                 await query.message.answer(
@@ -0,0 +1,99 @@
+"""Per-chat ordering and fast/slow processing lanes for incoming updates."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.types import TelegramObject, Update
+
+from handlers.commands.my_data import ProfileUpdateState
+
+FAST_LANE = "fast"
+SLOW_LANE = "slow"
+
+# Callbacks whose handlers wait on the AAU portal: force refresh, assessment detail, registration login
+SLOW_CALLBACK_PREFIXES = ("grade_r:", "grade_c:", "confirm_registration")
+# FSM steps that check what the user typed against the portal
+SLOW_STATES = (ProfileUpdateState.waiting_for_password.state,)
+
+
+def update_lane(event: TelegramObject, raw_state: str | None = None) -> str:
+    """``SLOW_LANE`` for updates whose handler waits on the portal, ``FAST_LANE`` for the rest."""
+    if not isinstance(event, Update):
+        return FAST_LANE
+    if event.callback_query is not None and (event.callback_query.data or "").startswith(SLOW_CALLBACK_PREFIXES):
+        return SLOW_LANE
+    if event.message is not None and raw_state in SLOW_STATES and not (event.message.text or "").startswith("/"):
+        return SLOW_LANE
+    return FAST_LANE
+
+
+class ChatOrderIsolation(BaseEventIsolation):
+    """
+    Handle one chat's updates one at a time, in the order they arrived.
+
+    aiogram takes this lock per FSM key before it loads the state, so a step never
+    sees the state of an update that has not finished. Waiters get the lock FIFO, and
+    a chat's lock is dropped once nothing holds or waits for it.
+    """
+
+    def __init__(self) -> None:
+        # key -> [lock, updates holding or waiting for it]
+        self._locks: dict[StorageKey, list[Any]] = {}
+
+    @property
+    def tracked_chats(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def close(self) -> None:
+        self._locks.clear()
+
+
+class UpdateLanesMiddleware(BaseMiddleware):
+    """
+    Bound how many updates run at once, separately for fast and slow updates.
+
+    Portal-bound updates (see ``update_lane``) share ``slow_concurrency`` slots and
+    everything else ``fast_concurrency``, so a slow or failing portal only backs up
+    the slow lane while /start and DB-only screens keep answering. Registered inside
+    the chat's ``ChatOrderIsolation`` lock, the lane is picked from the chat's current
+    FSM state.
+    """
+
+    def __init__(self, fast_concurrency: int = 16, slow_concurrency: int = 4):
+        self._lanes = {FAST_LANE: asyncio.Semaphore(fast_concurrency), SLOW_LANE: asyncio.Semaphore(slow_concurrency)}
+        self.running = {FAST_LANE: 0, SLOW_LANE: 0}
+        self.waiting = {FAST_LANE: 0, SLOW_LANE: 0}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        lane = update_lane(event, data.get("raw_state"))
+        self.waiting[lane] += 1
+        try:
+            await self._lanes[lane].acquire()
+        finally:
+            self.waiting[lane] -= 1
+        self.running[lane] += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.running[lane] -= 1
+            self._lanes[lane].release()
@@ -0,0 +1,71 @@
+"""Telegram webhook endpoint mounted on the bot's aiohttp application."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedWebhookRequestHandler(SimpleRequestHandler):
+    """
+    Accept webhook updates and process at most ``max_concurrency`` of them at once.
+
+    Requests without the secret token Telegram was given in ``setWebhook`` get a 401.
+    Accepted updates are answered as soon as a processing slot is free and handled in
+    the background; while every slot is busy the request waits, so Telegram sees the
+    back-pressure and holds further updates instead of the process piling up tasks.
+    ``close`` lets in-flight updates finish for up to ``drain_timeout`` seconds and
+    leaves the bot session to its owner.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: str,
+        max_concurrency: int = 32,
+        drain_timeout: float = 10.0,
+        **data: Any,
+    ) -> None:
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.max_concurrency = max_concurrency
+        self.drain_timeout = drain_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._background_feed_update_tasks)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(bot, update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _process(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await self._background_feed_update(bot=bot, update=update)
+        except Exception as e:
+            logger.error(f"Webhook update {update.get('update_id')} failed: {e}", exc_info=True)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Webhook closed with {len(pending)} updates still being processed")
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -2,6 +2,8 @@ import sys
 import os
 import asyncio
 import logging
+import signal
+from contextlib import suppress
 from aiohttp import web
 
 # Inject src into Python path to fix module imports when run directly
@@ -30,8 +32,8 @@ async def main():
     services = build_application_services(settings, bot)
     dp = build_dispatcher(settings, services)
     
-    # 3. Build Web App
-    app = build_http_app(settings, services)
+    # 3. Build Web App (with the webhook endpoint when WEBHOOK_URL is set)
+    app = build_http_app(settings, services, dp, bot)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', settings.port)
@@ -39,11 +41,49 @@ async def main():
     
     logger.info(f"Web server started on port {settings.port}")
     
-    # 4. Start Polling
-    logger.info("Starting Telegram bot polling...")
+    # Deliver notifications a previous process committed but never sent
+    if services.outbox is not None:
+        services.outbox.wake()
+    # Pick up broadcasts a previous process was streaming when it stopped
+    if services.broadcasts is not None:
+        await services.broadcasts.resume()
+
+    # 4. Receive updates by webhook or long polling
     try:
-        await dp.start_polling(bot)
+        if settings.webhook_endpoint:
+            await bot.set_webhook(
+                settings.webhook_endpoint,
+                secret_token=settings.webhook_secret,
+                max_connections=min(100, settings.update_concurrency),
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+            logger.info(f"Receiving Telegram updates by webhook at {settings.webhook_path}")
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                with suppress(NotImplementedError):
+                    loop.add_signal_handler(sig, stop.set)
+            await stop.wait()
+        else:
+            # A webhook left by a webhook-mode deployment would make getUpdates fail
+            await bot.delete_webhook()
+            logger.info("Starting Telegram bot polling...")
+            await dp.start_polling(bot, tasks_concurrency_limit=settings.update_concurrency, close_bot_session=False)
     finally:
+        # Stops accepting webhook updates and lets in-flight ones finish first
+        await runner.cleanup()
+        if services.background is not None:
+            await services.background.shutdown()
+        if services.broadcasts is not None:
+            await services.broadcasts.close()
+        if services.outbox is not None:
+            await services.outbox.close()
+        if services.alerts is not None:
+            await services.alerts.close()
+        if hasattr(services.notification, "close"):
+            await services.notification.close(timeout=settings.notification_drain_timeout_seconds)
+        if services.audit is not None:
+            await services.audit.close()
         await bot.session.close()
 
 if __name__ == "__main__":
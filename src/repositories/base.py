@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime
 from types import TracebackType
 from typing import Protocol, runtime_checkable
 
@@ -22,6 +23,8 @@ class UnitOfWork(Protocol):
     departments: DepartmentRepository
     courses: CourseRepository
     admin: AdminRepository
+    notification_outbox: NotificationOutboxRepository
+    broadcast_jobs: BroadcastJobRepository
 
     async def __aenter__(self) -> UnitOfWork:
         ...
@@ -60,6 +63,15 @@ class UserRepository(Repository, Protocol):
     async def get_all_users(self) -> list[object]:
         ...
 
+    async def set_reachable(self, telegram_id: int, reachable: bool) -> bool:
+        ...
+
+    async def count_reachable(self) -> int:
+        ...
+
+    async def list_reachable_telegram_ids(self, after: int | None, limit: int) -> list[int]:
+        ...
+
 class CampusRepository(Repository, Protocol):
     async def get_all(self) -> list[object]:
         ...
@@ -129,6 +141,24 @@ class AuditLogRepository(Repository, Protocol):
     async def add(self, audit_log: object) -> None:
         ...
 
+    async def list_for_user(
+        self,
+        telegram_id: int,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int = 100,
+    ) -> list[object]:
+        ...
+
+    async def list_between(
+        self,
+        since: datetime,
+        until: datetime,
+        action: str | None = None,
+        limit: int = 100,
+    ) -> list[object]:
+        ...
+
 
 class SystemSettingRepository(Repository, Protocol):
     async def get(self, key: str) -> str | None:
@@ -146,6 +176,52 @@ class CronRunRepository(Repository, Protocol):
         ...
 
 
+class NotificationOutboxRepository(Repository, Protocol):
+    async def stage(self, messages: list[dict]) -> None:
+        ...
+
+    async def claim_due(self, now: datetime, limit: int, lease_seconds: float) -> list:
+        ...
+
+    async def next_due_at(self) -> datetime | None:
+        ...
+
+    async def mark_sent(self, ids: list, now: datetime) -> None:
+        ...
+
+    async def mark_retry(self, row_id: object, next_attempt_at: datetime, error: str) -> None:
+        ...
+
+    async def mark_failed(self, row_id: object, error: str) -> None:
+        ...
+
+
+class BroadcastJobRepository(Repository, Protocol):
+    async def add(self, job: object) -> None:
+        ...
+
+    async def get(self, job_id: object) -> object | None:
+        ...
+
+    async def claim(self, job_id: object, now: datetime, lease_until: datetime) -> bool:
+        ...
+
+    async def list_abandoned(self, now: datetime) -> list:
+        ...
+
+    async def list_running(self) -> list:
+        ...
+
+    async def record_page(self, job_id: object, cursor: int, sent: int, failed: int, lease_until: datetime) -> bool:
+        ...
+
+    async def release(self, job_ids: list, now: datetime) -> None:
+        ...
+
+    async def finish(self, job_id: object, status: object, now: datetime) -> None:
+        ...
+
+
 class AdminRepository(Repository, Protocol):
     async def get_system_metrics(self) -> dict:
         ...
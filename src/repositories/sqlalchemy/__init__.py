@@ -9,6 +9,9 @@ from .cron_run_repository import SqlAlchemyCronRunRepository
 from .user_course_repository import SqlAlchemyUserCourseRepository
 from .assessment_repository import SqlAlchemyAssessmentRepository
 from .semester_result_repository import SqlAlchemySemesterResultRepository
+from .grade_graph_repository import SqlAlchemyGradeGraphRepository
+from .notification_outbox_repository import SqlAlchemyNotificationOutboxRepository
+from .broadcast_job_repository import SqlAlchemyBroadcastJobRepository
 
 __all__ = [
     "SqlAlchemyRepositoryUnitOfWork",
@@ -20,4 +23,7 @@ __all__ = [
     "SqlAlchemyUserCourseRepository",
     "SqlAlchemyAssessmentRepository",
     "SqlAlchemySemesterResultRepository",
+    "SqlAlchemyGradeGraphRepository",
+    "SqlAlchemyNotificationOutboxRepository",
+    "SqlAlchemyBroadcastJobRepository",
 ]
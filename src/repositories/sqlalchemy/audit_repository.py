@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+from datetime import datetime
+
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import AuditLog
@@ -15,3 +18,33 @@ class SqlAlchemyAuditLogRepository:
 
     async def add(self, audit_log: AuditLog) -> None:
         self.session.add(audit_log)
+
+    async def list_for_user(
+        self,
+        telegram_id: int,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int = 100,
+    ) -> list[AuditLog]:
+        """Newest first; served by ``ix_audit_logs_telegram_id_timestamp``."""
+        statement = select(AuditLog).where(AuditLog.telegram_id == telegram_id)
+        if since is not None:
+            statement = statement.where(AuditLog.timestamp >= since)
+        if until is not None:
+            statement = statement.where(AuditLog.timestamp < until)
+        result = await self.session.execute(statement.order_by(AuditLog.timestamp.desc()).limit(limit))
+        return list(result.scalars().all())
+
+    async def list_between(
+        self,
+        since: datetime,
+        until: datetime,
+        action: str | None = None,
+        limit: int = 100,
+    ) -> list[AuditLog]:
+        """Newest first; on PostgreSQL only the partitions overlapping the window are read."""
+        statement = select(AuditLog).where(AuditLog.timestamp >= since, AuditLog.timestamp < until)
+        if action is not None:
+            statement = statement.where(AuditLog.action == action)
+        result = await self.session.execute(statement.order_by(AuditLog.timestamp.desc()).limit(limit))
+        return list(result.scalars().all())
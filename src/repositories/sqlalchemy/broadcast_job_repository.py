@@ -0,0 +1,84 @@
+"""SQLAlchemy implementation for admin broadcast jobs."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import BroadcastJob, BroadcastStatus
+
+
+class SqlAlchemyBroadcastJobRepository:
+    """
+    Persist broadcast progress so a restarted process picks up where the last one stopped.
+
+    A job is owned by whoever holds its lease; ``claim`` only succeeds on a running job
+    whose lease has expired, so two processes never stream the same job.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def add(self, job: BroadcastJob) -> None:
+        self.session.add(job)
+
+    async def get(self, job_id: Any) -> BroadcastJob | None:
+        return await self.session.get(BroadcastJob, job_id)
+
+    async def claim(self, job_id: Any, now: datetime, lease_until: datetime) -> bool:
+        result = await self.session.execute(
+            update(BroadcastJob)
+            .where(
+                BroadcastJob.id == job_id,
+                BroadcastJob.status == BroadcastStatus.RUNNING,
+                BroadcastJob.lease_until <= now,
+            )
+            .values(lease_until=lease_until)
+        )
+        return result.rowcount > 0
+
+    async def list_abandoned(self, now: datetime) -> list[Any]:
+        """Ids of running jobs whose owner let the lease lapse."""
+        return list(await self.session.scalars(
+            select(BroadcastJob.id)
+            .where(BroadcastJob.status == BroadcastStatus.RUNNING, BroadcastJob.lease_until <= now)
+            .order_by(BroadcastJob.created_at)
+        ))
+
+    async def list_running(self) -> list[BroadcastJob]:
+        return list(await self.session.scalars(
+            select(BroadcastJob).where(BroadcastJob.status == BroadcastStatus.RUNNING)
+        ))
+
+    async def record_page(self, job_id: Any, cursor: int, sent: int, failed: int, lease_until: datetime) -> bool:
+        """Advance the cursor past a delivered page and extend the lease; ``False`` once the job was cancelled."""
+        result = await self.session.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.status == BroadcastStatus.RUNNING)
+            .values(
+                cursor=cursor,
+                sent=BroadcastJob.sent + sent,
+                failed=BroadcastJob.failed + failed,
+                lease_until=lease_until,
+            )
+        )
+        return result.rowcount > 0
+
+    async def release(self, job_ids: list[Any], now: datetime) -> None:
+        """Give up the lease on jobs this process stopped streaming."""
+        if job_ids:
+            await self.session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id.in_(job_ids), BroadcastJob.status == BroadcastStatus.RUNNING)
+                .values(lease_until=now)
+            )
+
+    async def finish(self, job_id: Any, status: BroadcastStatus, now: datetime) -> None:
+        await self.session.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.status == BroadcastStatus.RUNNING)
+            .values(status=status, finished_at=now, lease_until=now)
+        )
@@ -0,0 +1,195 @@
+"""Set-based upserts for the course graph behind a grade transcript."""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any, Sequence
+
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Assessment, Course, DepartmentCourse, Semester, UserCourse
+
+# Rows per INSERT; keeps bind parameters well under PostgreSQL's 65535 and SQLite's 32766
+UPSERT_CHUNK_SIZE = 500
+
+UserCourseKey = tuple[str, str, Semester]
+
+
+def _chunks(rows: Sequence[dict[str, Any]]) -> list[Sequence[dict[str, Any]]]:
+    return [rows[i:i + UPSERT_CHUNK_SIZE] for i in range(0, len(rows), UPSERT_CHUNK_SIZE)]
+
+
+class SqlAlchemyGradeGraphRepository:
+    """
+    Upserts courses, department links, user courses and assessments a few statements per
+    transcript instead of a select/flush per course.
+
+    PostgreSQL and SQLite use ``INSERT ... ON CONFLICT``; other dialects fall back to one
+    lookup per table followed by ORM inserts, which keeps the same results.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    def _insert(self, table: Any) -> Any | None:
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return None
+        return insert(table)
+
+    async def add_missing_courses(self, courses: Sequence[dict[str, Any]]) -> None:
+        """Insert catalogue rows for unseen course ids; existing courses are left untouched."""
+        rows = list({row["course_id"]: row for row in courses}.values())
+        if not rows:
+            return
+        stmt = self._insert(Course)
+        if stmt is None:
+            existing = set(await self.session.scalars(
+                select(Course.course_id).where(Course.course_id.in_([row["course_id"] for row in rows]))
+            ))
+            self.session.add_all(Course(**row) for row in rows if row["course_id"] not in existing)
+            await self.session.flush()
+            return
+        for chunk in _chunks(rows):
+            await self.session.execute(stmt.values(chunk).on_conflict_do_nothing(index_elements=["course_id"]))
+
+    async def link_department_courses(self, department_id: str, course_ids: Sequence[str]) -> None:
+        """Ensure a ``department_courses`` row exists for each course."""
+        rows = [{"department_id": department_id, "course_id": course_id} for course_id in dict.fromkeys(course_ids)]
+        if not rows:
+            return
+        stmt = self._insert(DepartmentCourse)
+        if stmt is None:
+            existing = set(await self.session.scalars(
+                select(DepartmentCourse.course_id).where(
+                    DepartmentCourse.department_id == department_id,
+                    DepartmentCourse.course_id.in_([row["course_id"] for row in rows]),
+                )
+            ))
+            self.session.add_all(DepartmentCourse(**row) for row in rows if row["course_id"] not in existing)
+            await self.session.flush()
+            return
+        for chunk in _chunks(rows):
+            await self.session.execute(
+                stmt.values(chunk).on_conflict_do_nothing(index_elements=["department_id", "course_id"])
+            )
+
+    async def upsert_user_courses(self, user_id: Any, keys: Sequence[UserCourseKey]) -> dict[UserCourseKey, Any]:
+        """
+        Ensure a ``user_courses`` row exists for each ``(course_id, academic_year, semester)``.
+        Returns the id of every requested row, whether it was inserted or already there.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        stmt = self._insert(UserCourse)
+        if stmt is None:
+            ids = await self._user_course_ids(user_id, keys)
+            missing = [key for key in keys if key not in ids]
+            for course_id, academic_year, semester in missing:
+                row_id = uuid.uuid4()
+                self.session.add(UserCourse(
+                    id=row_id, user_id=user_id, course_id=course_id, academic_year=academic_year, semester=semester,
+                ))
+                ids[(course_id, academic_year, semester)] = row_id
+            await self.session.flush()
+            return ids
+
+        ids = {}
+        for chunk in _chunks([
+            {"id": uuid.uuid4(), "user_id": user_id, "course_id": course_id, "academic_year": year, "semester": semester}
+            for course_id, year, semester in keys
+        ]):
+            result = await self.session.execute(
+                stmt.values(chunk)
+                .on_conflict_do_nothing(index_elements=["user_id", "course_id", "academic_year", "semester"])
+                .returning(UserCourse.id, UserCourse.course_id, UserCourse.academic_year, UserCourse.semester)
+            )
+            for row in result:
+                ids[(row.course_id, row.academic_year, row.semester)] = row.id
+        # RETURNING only reports inserted rows; existing ones are read in one query
+        missing = [key for key in keys if key not in ids]
+        if missing:
+            ids.update(await self._user_course_ids(user_id, missing))
+        return ids
+
+    async def _user_course_ids(self, user_id: Any, keys: Sequence[UserCourseKey]) -> dict[UserCourseKey, Any]:
+        result = await self.session.execute(
+            select(UserCourse.id, UserCourse.course_id, UserCourse.academic_year, UserCourse.semester).where(
+                UserCourse.user_id == user_id,
+                tuple_(UserCourse.course_id, UserCourse.academic_year, UserCourse.semester).in_(keys),
+            )
+        )
+        return {(row.course_id, row.academic_year, row.semester): row.id for row in result}
+
+    async def upsert_assessments(self, assessments: Sequence[dict[str, Any]]) -> dict[Any, Any]:
+        """
+        Insert or refresh one assessment per ``user_course_id`` and return ``{user_course_id: id}``.
+
+        The grade, IV and reference digest are always replaced. The cached detail is only
+        replaced when the portal reference changed (or was never recorded), so detailed
+        scores fetched earlier survive a refresh; a kept detail keeps the row's ``is_bound``.
+        """
+        rows = list({row["user_course_id"]: row for row in assessments}.values())
+        if not rows:
+            return {}
+        stmt = self._insert(Assessment)
+        if stmt is None:
+            return await self._upsert_assessments_orm(rows)
+
+        table = Assessment.__table__
+        ids = {}
+        for chunk in _chunks([{"id": uuid.uuid4(), **row} for row in rows]):
+            upsert = stmt.values(chunk)
+            excluded = upsert.excluded
+            detail_replaced = (
+                table.c.reference_digest.is_(None)
+                | table.c.reference_digest.is_distinct_from(excluded.reference_digest)
+            )
+            result = await self.session.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=["user_course_id"],
+                    set_={
+                        "encrypted_grade": excluded.encrypted_grade,
+                        "iv": excluded.iv,
+                        "reference_digest": excluded.reference_digest,
+                        "encrypted_assessment_detail": case(
+                            (detail_replaced, excluded.encrypted_assessment_detail),
+                            else_=table.c.encrypted_assessment_detail,
+                        ),
+                        # A kept detail may predate binding
+                        "is_bound": case((detail_replaced, excluded.is_bound), else_=table.c.is_bound),
+                        "updated_at": func.now(),
+                    },
+                ).returning(Assessment.id, Assessment.user_course_id)
+            )
+            ids.update({row.user_course_id: row.id for row in result})
+        return ids
+
+    async def _upsert_assessments_orm(self, rows: list[dict[str, Any]]) -> dict[Any, Any]:
+        existing = {
+            asm.user_course_id: asm
+            for asm in await self.session.scalars(
+                select(Assessment).where(Assessment.user_course_id.in_([row["user_course_id"] for row in rows]))
+            )
+        }
+        for row in rows:
+            asm = existing.get(row["user_course_id"])
+            if asm is None:
+                asm = Assessment(id=uuid.uuid4(), **row)
+                self.session.add(asm)
+                existing[row["user_course_id"]] = asm
+                continue
+            if asm.reference_digest is None or asm.reference_digest != row["reference_digest"]:
+                asm.encrypted_assessment_detail = row["encrypted_assessment_detail"]
+                asm.is_bound = row.get("is_bound", True)
+            asm.encrypted_grade = row["encrypted_grade"]
+            asm.iv = row["iv"]
+            asm.reference_digest = row["reference_digest"]
+        await self.session.flush()
+        return {user_course_id: asm.id for user_course_id, asm in existing.items()}
@@ -0,0 +1,98 @@
+"""SQLAlchemy implementation for the notification outbox."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import NotificationOutbox, OutboxStatus
+
+
+class SqlAlchemyNotificationOutboxRepository:
+    """
+    Stage notifications in the caller's transaction and hand due ones to the relay.
+
+    A claimed row is leased by pushing ``next_attempt_at`` past the lease, so another
+    relay (or this one after a crash) only picks it up again once the lease runs out.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def stage(self, messages: Sequence[dict[str, Any]]) -> None:
+        """Insert ``idempotency_key``/``telegram_id``/``body`` rows, skipping keys already staged."""
+        rows = list({row["idempotency_key"]: row for row in messages}.values())
+        if not rows:
+            return
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            existing = set(await self.session.scalars(
+                select(NotificationOutbox.idempotency_key)
+                .where(NotificationOutbox.idempotency_key.in_([row["idempotency_key"] for row in rows]))
+            ))
+            self.session.add_all(NotificationOutbox(**row) for row in rows if row["idempotency_key"] not in existing)
+            await self.session.flush()
+            return
+        await self.session.execute(
+            insert(NotificationOutbox).values(rows).on_conflict_do_nothing(index_elements=["idempotency_key"])
+        )
+
+    async def claim_due(self, now: datetime, limit: int, lease_seconds: float) -> list[Any]:
+        """Lease up to ``limit`` pending rows that are due, earliest first."""
+        statement = (
+            select(
+                NotificationOutbox.id,
+                NotificationOutbox.telegram_id,
+                NotificationOutbox.body,
+                NotificationOutbox.attempts,
+            )
+            .where(NotificationOutbox.status == OutboxStatus.PENDING, NotificationOutbox.next_attempt_at <= now)
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(limit)
+        )
+        if self.session.get_bind().dialect.name == "postgresql":
+            statement = statement.with_for_update(skip_locked=True)
+        rows = (await self.session.execute(statement)).all()
+        if rows:
+            await self.session.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_([row.id for row in rows]))
+                .values(next_attempt_at=now + timedelta(seconds=lease_seconds))
+            )
+        return rows
+
+    async def next_due_at(self) -> datetime | None:
+        """When the earliest pending row becomes due, or ``None`` when nothing is pending."""
+        return await self.session.scalar(
+            select(func.min(NotificationOutbox.next_attempt_at))
+            .where(NotificationOutbox.status == OutboxStatus.PENDING)
+        )
+
+    async def mark_sent(self, ids: Sequence[Any], now: datetime) -> None:
+        if ids:
+            await self.session.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_(list(ids)))
+                .values(status=OutboxStatus.SENT, sent_at=now, attempts=NotificationOutbox.attempts + 1)
+            )
+
+    async def mark_retry(self, row_id: Any, next_attempt_at: datetime, error: str) -> None:
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row_id)
+            .values(next_attempt_at=next_attempt_at, last_error=error, attempts=NotificationOutbox.attempts + 1)
+        )
+
+    async def mark_failed(self, row_id: Any, error: str) -> None:
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == row_id)
+            .values(status=OutboxStatus.FAILED, last_error=error, attempts=NotificationOutbox.attempts + 1)
+        )
@@ -20,7 +20,10 @@ from .semester_result_repository import SqlAlchemySemesterResultRepository
 from .campus_repository import SqlAlchemyCampusRepository
 from .department_repository import SqlAlchemyDepartmentRepository
 from .course_repository import SqlAlchemyCourseRepository
+from .grade_graph_repository import SqlAlchemyGradeGraphRepository
 from .admin_repository import SqlAlchemyAdminRepository
+from .notification_outbox_repository import SqlAlchemyNotificationOutboxRepository
+from .broadcast_job_repository import SqlAlchemyBroadcastJobRepository
 
 SessionFactory = Callable[[], AsyncSession]
 
@@ -42,7 +45,10 @@ class SqlAlchemyRepositoryUnitOfWork:
         self.semester_results: SqlAlchemySemesterResultRepository | None = None
         self.departments: SqlAlchemyDepartmentRepository | None = None
         self.courses: SqlAlchemyCourseRepository | None = None
+        self.grade_graph: SqlAlchemyGradeGraphRepository | None = None
         self.admin: SqlAlchemyAdminRepository | None = None
+        self.notification_outbox: SqlAlchemyNotificationOutboxRepository | None = None
+        self.broadcast_jobs: SqlAlchemyBroadcastJobRepository | None = None
 
     async def __aenter__(self) -> Self:
         await self._base_uow.__aenter__()
@@ -61,7 +67,10 @@ class SqlAlchemyRepositoryUnitOfWork:
         self.semester_results = SqlAlchemySemesterResultRepository(self.session)
         self.departments = SqlAlchemyDepartmentRepository(self.session)
         self.courses = SqlAlchemyCourseRepository(self.session)
+        self.grade_graph = SqlAlchemyGradeGraphRepository(self.session)
         self.admin = SqlAlchemyAdminRepository(self.session)
+        self.notification_outbox = SqlAlchemyNotificationOutboxRepository(self.session)
+        self.broadcast_jobs = SqlAlchemyBroadcastJobRepository(self.session)
 
         return self
 
@@ -90,3 +99,6 @@ class SqlAlchemyRepositoryUnitOfWork:
         self.semester_results = None
         self.departments = None
         self.courses = None
+        self.grade_graph = None
+        self.notification_outbox = None
+        self.broadcast_jobs = None
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import User
@@ -43,3 +43,24 @@ class SqlAlchemyUserRepository:
         statement = select(User).where(User.last_used < threshold_date)
         result = await self.session.execute(statement)
         return list(result.scalars().all())
+
+    async def set_reachable(self, telegram_id: int, reachable: bool) -> bool:
+        """Flip ``is_reachable``; returns whether a row changed."""
+        result = await self.session.execute(
+            update(User)
+            .where(User.telegram_id == telegram_id, User.is_reachable.is_not(reachable))
+            .values(is_reachable=reachable)
+        )
+        return result.rowcount > 0
+
+    async def count_reachable(self) -> int:
+        return await self.session.scalar(
+            select(func.count()).select_from(User).where(User.is_reachable == True)
+        ) or 0
+
+    async def list_reachable_telegram_ids(self, after: int | None, limit: int) -> list[int]:
+        """Keyset page of reachable ``telegram_id``s above ``after``, without loading users."""
+        statement = select(User.telegram_id).where(User.is_reachable == True)
+        if after is not None:
+            statement = statement.where(User.telegram_id > after)
+        return list(await self.session.scalars(statement.order_by(User.telegram_id).limit(limit)))
@@ -5,6 +5,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 
+from crypto.binding import credential_associated_data, decrypt_bound
 from dto.bot import AccountDeletionRequest
 
 
@@ -22,12 +23,15 @@ class AccountLifecycleService:
     handler layer and future background jobs.
     """
 
-    def __init__(self, user_repository: Any | None = None, audit_repository: Any | None = None, notifier: Any | None = None, session_factory: Any | None = None, portal_client: Any | None = None) -> None:
+    def __init__(self, user_repository: Any | None = None, audit_repository: Any | None = None, notifier: Any | None = None, session_factory: Any | None = None, portal_client: Any | None = None, keyring: Any | None = None, audit: Any | None = None, notifications: Any | None = None) -> None:
         self.user_repository = user_repository
         self.audit_repository = audit_repository
         self.notifier = notifier
         self.session_factory = session_factory
         self.portal_client = portal_client
+        self.keyring = keyring
+        self.audit = audit
+        self.notifications = notifications
 
     async def is_registered(self, telegram_id: int) -> bool:
         """Returns True if the user exists in the database."""
@@ -65,15 +69,15 @@ class AccountLifecycleService:
                         
                     results = await uow.semester_results.get_by_user_id(user.id)
                     for res in results:
-                        res.encrypted_result_detail = "deleted_result"
+                        res.encrypted_result_detail = b"deleted_result"
                         res.iv = "deleted_iv"
                         
                     courses = await uow.user_courses.get_by_user_id(user.id)
                     for c in courses:
                         assessment = await uow.assessments.get_by_user_course_id(c.id)
                         if assessment:
-                            assessment.encrypted_assessment_detail = "deleted_assessment"
-                            assessment.encrypted_grade = "deleted_grade"
+                            assessment.encrypted_assessment_detail = b"deleted_assessment"
+                            assessment.encrypted_grade = b"deleted_grade"
                             assessment.iv = "deleted_iv"
 
                     user.telegram_id = -random.randint(1000000, 9999999)
@@ -85,13 +89,17 @@ class AccountLifecycleService:
                     # 2. Actually delete the scrambled row
                     await uow.users.remove(user)
                     
-                    # 3. Add audit log
-                    audit = AuditLog(
-                        telegram_id=request.telegram_id,
-                        action="account_deletion_requested",
-                        details={"confirmed": True, "reason": request.reason},
-                    )
-                    await uow.audit_logs.add(audit)
+                    # 3. Add audit log; written synchronously so it commits with the delete
+                    details = {"confirmed": True, "reason": request.reason}
+                    if self.audit is not None:
+                        await self.audit.record_now(uow, request.telegram_id, "account_deletion_requested", details)
+                    else:
+                        audit = AuditLog(
+                            telegram_id=request.telegram_id,
+                            action="account_deletion_requested",
+                            details=details,
+                        )
+                        await uow.audit_logs.add(audit)
                     await uow.commit()
                     return AccountLifecycleResult(message="Account and all credentials securely deleted.", deleted=True)
                 else:
@@ -249,11 +257,12 @@ class AccountLifecycleService:
                         
                         # 3. Save new password
                         import base64
-                        from crypto.cipher import Ciphertext
-                        encrypted_token = cipher.encrypt(new_password)
-                        payload = Ciphertext.from_token(encrypted_token)
-                        cred.encrypted_password = encrypted_token
-                        cred.iv = base64.urlsafe_b64encode(payload.nonce).decode("ascii")
+                        if self.keyring is not None:
+                            cipher = self.keyring.cipher_for(user.id, user.wrapped_data_key)
+                        sealed_password = cipher.seal(new_password, credential_associated_data(user.id))
+                        cred.encrypted_password = sealed_password.to_token()
+                        cred.iv = base64.urlsafe_b64encode(sealed_password.nonce).decode("ascii")
+                        cred.is_bound = True
                         cred.is_valid = True
                         cred.failed_attempts = 0
                         cred.locked_until = None
@@ -272,7 +281,11 @@ class AccountLifecycleService:
                     cred = await uow.credentials.get_by_user_id(user.id)
                     if cred and cred.encrypted_password:
                         try:
-                            return cipher.decrypt(cred.encrypted_password)
+                            if self.keyring is not None:
+                                cipher = self.keyring.cipher_for(user.id, user.wrapped_data_key)
+                            return decrypt_bound(
+                                cipher, cred.encrypted_password, credential_associated_data(user.id), cred.is_bound
+                            )
                         except Exception as e:
                             import logging
                             logging.getLogger(__name__).error(f"Failed to decrypt password for user {telegram_id}: {e}")
@@ -339,7 +352,12 @@ class AccountLifecycleService:
         return deleted_count
 
     async def bump_last_used(self, telegram_id: int) -> None:
-        """Update the last_used timestamp for the given user."""
+        """Update the last_used timestamp for the given user.
+
+        A user who talks to the bot has not blocked it, so they are reachable again.
+        """
+        if self.notifications is not None:
+            self.notifications.mark_reachable(telegram_id)
         if self.session_factory is not None:
             from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
             from sqlalchemy import func
@@ -347,4 +365,15 @@ class AccountLifecycleService:
                 user = await uow.users.get_by_telegram_id(telegram_id)
                 if user is not None:
                     user.last_used = func.now()
+                    user.is_reachable = True
+                    await uow.commit()
+
+    async def mark_unreachable(self, telegram_id: int) -> None:
+        """Flag a user Telegram will not deliver to, so broadcasts and cron notices skip them."""
+        if self.session_factory is not None:
+            from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+            async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                if await uow.users.set_reachable(telegram_id, False):
+                    if self.audit is not None:
+                        self.audit.record(telegram_id, "notifications_unreachable")
                     await uow.commit()
@@ -13,6 +13,7 @@ class BroadcastResult:
     """Result of an admin broadcast operation."""
     message: str
     recipients: int = 0
+    job_id: Any | None = None
 
 
 @dataclass(frozen=True)
@@ -24,32 +25,42 @@ class SettingsUpdateResult:
 class AdminService:
     """Handle admin-only broadcast and settings workflows."""
 
-    def __init__(self, notifier: Any | None = None, settings_repository: Any | None = None, metrics: Any | None = None, session_factory: Any | None = None) -> None:
+    def __init__(self, notifier: Any | None = None, settings_repository: Any | None = None, metrics: Any | None = None, session_factory: Any | None = None, notifications: Any | None = None, broadcasts: Any | None = None, alerts: Any | None = None) -> None:
         self.notifier = notifier
         self.settings_repository = settings_repository
         self.metrics = metrics
         self.session_factory = session_factory
+        self.notifications = notifications
+        self.broadcasts = broadcasts
+        self.alerts = alerts
 
     async def broadcast(self, request: BroadcastRequest) -> BroadcastResult:
         """
         Broadcasts a message to a list of target telegram IDs.
-        If no target IDs are provided, it broadcasts to all registered users.
+        If no target IDs are provided, it starts a background job that streams the
+        message to every reachable user and reports progress in ``status_message_id``.
         """
+        if not request.recipient_ids and self.broadcasts is not None:
+            progress = await self.broadcasts.start(
+                request.admin_telegram_id, request.message, request.status_message_id
+            )
+            return BroadcastResult(
+                message=f"Broadcast started to {progress.total} users",
+                recipients=progress.total,
+                job_id=progress.job_id,
+            )
+
         recipients = 0
-        target_ids = request.recipient_ids or []
-        
-        # If no explicit recipients provided, fetch all users from the DB
-        if not target_ids and self.session_factory is not None:
-            from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
-            async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
-                all_users = await uow.users.get_all_users()
-                target_ids = [u.telegram_id for u in all_users]
-        
-        if self.notifier is not None and target_ids:
-            for telegram_id in target_ids:
+        if self.notifier is not None and request.recipient_ids:
+            for telegram_id in request.recipient_ids:
                 try:
-                    await self.notifier.send_message(telegram_id, request.message)
-                    recipients += 1
+                    if self.notifications is not None:
+                        # Through the queue, so explicit lists also respect Telegram's limits
+                        delivered = await self.notifications.deliver(telegram_id, request.message)
+                    else:
+                        await self.notifier.send_message(telegram_id, request.message)
+                        delivered = True
+                    recipients += int(delivered)
                 except Exception as e:
                     import logging
                     logging.getLogger(__name__).warning(f"Failed to send broadcast to {telegram_id}: {e}")
@@ -59,6 +70,12 @@ class AdminService:
             
         return BroadcastResult(message=f"Broadcast sent to {recipients} users", recipients=recipients)
 
+    async def cancel_broadcasts(self) -> int:
+        """Cancels every running broadcast job; returns how many were stopped."""
+        if self.broadcasts is None:
+            return 0
+        return await self.broadcasts.cancel_running()
+
     async def update_setting(self, request: SettingsUpdateRequest) -> SettingsUpdateResult:
         """Updates a global system setting in the database."""
         if not request.confirm:
@@ -102,6 +119,10 @@ class AdminService:
             except Exception as e:
                 import html
                 details["db_error"] = html.escape(str(e))
+        if self.notifications is not None:
+            details["notifications"] = self.notifications.stats()
+        if self.alerts is not None:
+            details["admin_alerts"] = self.alerts.stats()
                 
         import time
         import psutil
@@ -0,0 +1,5 @@
+"""Buffered audit log package."""
+
+from .service import BufferedAuditWriter
+
+__all__ = ["BufferedAuditWriter"]
@@ -0,0 +1,118 @@
+"""Buffered audit log writes off the request path."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedAuditWriter:
+    """Collect audit events in memory and insert them in batches.
+
+    ``record`` only appends to a bounded buffer; a background task flushes it with one
+    multi-row ``INSERT`` once ``batch_size`` events are waiting or ``flush_interval_seconds``
+    has passed, and ``close`` flushes whatever is left. Each event keeps the time it was
+    recorded, not the time it was flushed.
+
+    Events buffered when the process dies are lost, so actions whose audit trail must be
+    durable (account deletion) use ``record_now`` to write inside the caller's unit of work.
+    """
+
+    def __init__(
+        self,
+        session_factory: Any,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 0.5,
+        max_buffered: int = 10000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_buffered = max_buffered
+        self.dropped = 0
+        self._buffer: deque[dict[str, Any]] = deque()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, telegram_id: int, action: str, details: dict[str, Any] | None = None) -> None:
+        """Queue an audit event; never blocks and never raises on the request path."""
+        if len(self._buffer) >= self.max_buffered:
+            self._buffer.popleft()
+            self.dropped += 1
+            logger.warning(f"Audit buffer full; dropped oldest event ({self.dropped} dropped so far)")
+        self._buffer.append(_event(telegram_id, action, details))
+        if self._closed:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="audit-flush")
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    async def record_now(self, uow: Any, telegram_id: int, action: str, details: dict[str, Any] | None = None) -> None:
+        """Add the event to ``uow`` so it commits, or rolls back, with the action it records."""
+        from database.models import AuditLog
+
+        await uow.audit_logs.add(AuditLog(**_event(telegram_id, action, details)))
+
+    async def flush(self) -> int:
+        """Insert everything buffered so far; returns the number of rows written."""
+        from sqlalchemy import insert
+        from database.models import AuditLog
+
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                try:
+                    async with self.session_factory() as session:
+                        await session.execute(insert(AuditLog).values(batch))
+                        await session.commit()
+                except Exception as e:
+                    # Put the batch back in order; record() trims the buffer if it keeps failing
+                    self._buffer.extendleft(reversed(batch))
+                    logger.error(f"Audit flush of {len(batch)} events failed: {e}", exc_info=True)
+                    break
+                written += len(batch)
+        return written
+
+    async def close(self) -> None:
+        """Stop the flush task and write the remaining events."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while self._buffer:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if await self.flush() == 0 and self._buffer:
+                # The database is refusing writes; back off for one interval before retrying
+                await asyncio.sleep(self.flush_interval_seconds)
+
+
+def _event(telegram_id: int, action: str, details: dict[str, Any] | None) -> dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "telegram_id": telegram_id,
+        "action": action,
+        "details": details,
+        "timestamp": datetime.now(timezone.utc),
+    }
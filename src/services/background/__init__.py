@@ -0,0 +1,5 @@
+"""Supervised background job package."""
+
+from .service import BackgroundJobSupervisor
+
+__all__ = ["BackgroundJobSupervisor"]
@@ -0,0 +1,60 @@
+"""Supervised execution of background jobs (ADR 016)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobSupervisor:
+    """Own fire-and-forget jobs so failures are logged and shutdown can drain them.
+
+    Services hand a job factory to ``submit`` instead of calling
+    ``asyncio.create_task`` themselves. Each job runs in its own task, inherits
+    the caller's correlation ID through the copied context, and must open its
+    own Unit of Work if it needs the database.
+    """
+
+    def __init__(self, shutdown_timeout_seconds: float = 10.0) -> None:
+        self.shutdown_timeout_seconds = shutdown_timeout_seconds
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, name: str, job: Callable[[], Awaitable[Any]]) -> asyncio.Task | None:
+        """Schedule ``job`` on the running loop; returns None after shutdown started."""
+        if self._closed:
+            logger.warning(f"Background job {name} rejected: supervisor is shutting down")
+            return None
+
+        async def run() -> None:
+            try:
+                await job()
+            except asyncio.CancelledError:
+                logger.info(f"Background job {name} cancelled")
+                raise
+            except Exception as exc:
+                logger.error(f"Background job {name} failed: {exc}", exc_info=True)
+
+        task = asyncio.create_task(run(), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def shutdown(self) -> None:
+        """Stop accepting jobs, wait for running ones, then cancel stragglers."""
+        self._closed = True
+        if not self._tasks:
+            return
+        _done, pending = await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,5 @@
+"""Admin broadcast service package."""
+
+from .service import BroadcastProgress, BroadcastService
+
+__all__ = ["BroadcastProgress", "BroadcastService"]
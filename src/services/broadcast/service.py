@@ -0,0 +1,225 @@
+"""Streaming, resumable admin broadcasts."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BroadcastProgress:
+    """Where a broadcast job stands; ``sent + failed`` recipients have been handled."""
+    job_id: Any
+    total: int
+    sent: int = 0
+    failed: int = 0
+    finished: bool = False
+    cancelled: bool = False
+
+    @property
+    def handled(self) -> int:
+        return self.sent + self.failed
+
+
+def _progress_text(progress: BroadcastProgress, rate_per_second: float) -> str:
+    if progress.cancelled:
+        title = "🛑 <b>Broadcast cancelled</b>"
+    elif progress.finished:
+        title = "✅ <b>Broadcast finished</b>"
+    else:
+        title = "📣 <b>Broadcast in progress</b>"
+    percent = 100 if not progress.total else min(100, progress.handled * 100 // progress.total)
+    text = (
+        f"{title}\n\n"
+        f"{progress.handled}/{progress.total} users ({percent}%)\n"
+        f"Delivered: {progress.sent} · Failed: {progress.failed}"
+    )
+    remaining = max(0, progress.total - progress.handled)
+    if not progress.finished and not progress.cancelled and remaining and rate_per_second > 0:
+        text += f"\nAbout {max(1, round(remaining / rate_per_second / 60))} min left"
+    return text
+
+
+class BroadcastService:
+    """
+    Send an admin message to every reachable user without loading them all.
+
+    Recipients are read a page of ``telegram_id``s at a time in id order and handed to
+    ``NotificationService.deliver``, so the broadcast runs at the shared Telegram rate
+    limit alongside everything else. After each page the job's cursor and counts are
+    committed and its lease extended; a job whose lease lapses (the process died) is
+    picked up from its cursor by ``resume``, re-sending at most the page in flight.
+    Progress is shown by editing the admin's status message, at most once per
+    ``progress_interval_seconds``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Any,
+        notifications: Any,
+        notifier: Any | None = None,
+        page_size: int = 500,
+        lease_seconds: float = 300.0,
+        progress_interval_seconds: float = 5.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.notifications = notifications
+        self.notifier = notifier
+        self.page_size = page_size
+        self.lease_seconds = lease_seconds
+        self.progress_interval_seconds = progress_interval_seconds
+        self._tasks: dict[Any, asyncio.Task] = {}
+
+    @property
+    def running(self) -> int:
+        return sum(1 for task in self._tasks.values() if not task.done())
+
+    async def start(self, admin_telegram_id: int, text: str, status_message_id: int | None = None) -> BroadcastProgress:
+        """Record a job for every reachable user and start streaming it in the background."""
+        from database.models import BroadcastJob
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        job_id = uuid.uuid4()
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            total = await uow.users.count_reachable()
+            await uow.broadcast_jobs.add(BroadcastJob(
+                id=job_id,
+                admin_telegram_id=admin_telegram_id,
+                body=text,
+                total=total,
+                status_message_id=status_message_id,
+                lease_until=self._lease_until(),
+            ))
+            await uow.commit()
+        progress = BroadcastProgress(job_id, total)
+        await self._report(admin_telegram_id, status_message_id, progress)
+        self._spawn(job_id)
+        return progress
+
+    async def resume(self) -> int:
+        """Take over running jobs whose owner stopped renewing the lease; returns how many."""
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        now = datetime.now(timezone.utc)
+        resumed = 0
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            for job_id in await uow.broadcast_jobs.list_abandoned(now):
+                if job_id in self._tasks or not await uow.broadcast_jobs.claim(job_id, now, self._lease_until()):
+                    continue
+                await uow.commit()
+                self._spawn(job_id)
+                resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} interrupted broadcast(s)")
+        return resumed
+
+    async def cancel_running(self) -> int:
+        """Stop every running job, including ones streamed by another process; returns how many."""
+        from database.models import BroadcastStatus
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        now = datetime.now(timezone.utc)
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            jobs = [
+                (job.admin_telegram_id, job.status_message_id, BroadcastProgress(job.id, job.total, job.sent, job.failed, cancelled=True))
+                for job in await uow.broadcast_jobs.list_running()
+            ]
+            for _admin_id, _message_id, progress in jobs:
+                await uow.broadcast_jobs.finish(progress.job_id, BroadcastStatus.CANCELLED, now)
+            await uow.commit()
+        # Local jobs stop now; remote ones stop when their next page fails to record
+        for admin_id, message_id, progress in jobs:
+            task = self._tasks.get(progress.job_id)
+            if task is not None:
+                task.cancel()
+            await self._report(admin_id, message_id, progress)
+        return len(jobs)
+
+    async def close(self) -> None:
+        """Stop local jobs and release their leases so the next start resumes them at once."""
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        tasks = dict(self._tasks)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if tasks:
+            async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                await uow.broadcast_jobs.release(list(tasks), datetime.now(timezone.utc))
+                await uow.commit()
+
+    def _spawn(self, job_id: Any) -> None:
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id), name=f"broadcast-{job_id}")
+        self._tasks[job_id].add_done_callback(lambda _task: self._tasks.pop(job_id, None))
+
+    def _lease_until(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    async def _run(self, job_id: Any) -> None:
+        from database.models import BroadcastStatus
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            job = await uow.broadcast_jobs.get(job_id)
+            if job is None:
+                return
+            admin_id, message_id, text, cursor = job.admin_telegram_id, job.status_message_id, job.body, job.cursor
+            progress = BroadcastProgress(job_id, job.total, job.sent, job.failed)
+        reported_at = time.monotonic()
+        try:
+            while True:
+                async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                    page = await uow.users.list_reachable_telegram_ids(cursor, self.page_size)
+                if not page:
+                    break
+                outcomes = await asyncio.gather(
+                    *(self.notifications.deliver(telegram_id, text) for telegram_id in page),
+                    return_exceptions=True,
+                )
+                sent = sum(1 for outcome in outcomes if outcome is True)
+                async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                    recorded = await uow.broadcast_jobs.record_page(
+                        job_id, page[-1], sent, len(page) - sent, self._lease_until()
+                    )
+                    await uow.commit()
+                if not recorded:
+                    return  # cancelled from elsewhere
+                cursor = page[-1]
+                # Users who joined mid-broadcast are included, so the total can grow
+                handled = progress.handled + len(page)
+                progress = BroadcastProgress(
+                    job_id, max(progress.total, handled), progress.sent + sent, progress.failed + len(page) - sent
+                )
+                if time.monotonic() - reported_at >= self.progress_interval_seconds:
+                    reported_at = time.monotonic()
+                    await self._report(admin_id, message_id, progress)
+
+            async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                await uow.broadcast_jobs.finish(job_id, BroadcastStatus.COMPLETED, datetime.now(timezone.utc))
+                await uow.commit()
+        except Exception as e:
+            # The lease lapses and the next resume picks the job up from its cursor
+            logger.error(f"Broadcast {job_id} stopped: {e}", exc_info=True)
+            return
+        progress = BroadcastProgress(job_id, progress.handled, progress.sent, progress.failed, finished=True)
+        logger.info(f"Broadcast {job_id} finished: {progress.sent} delivered, {progress.failed} failed")
+        await self._report(admin_id, message_id, progress)
+
+    async def _report(self, admin_id: int, message_id: int | None, progress: BroadcastProgress) -> None:
+        if self.notifier is None:
+            return
+        text = _progress_text(progress, float(self.notifications.limiter.global_limit))
+        try:
+            if message_id is not None:
+                await self.notifier.edit_message(admin_id, message_id, text)
+            elif progress.finished:
+                await self.notifier.send_message(admin_id, text)
+        except Exception as e:
+            logger.warning(f"Could not update broadcast progress for {admin_id}: {e}")
@@ -16,3 +16,11 @@ class ApplicationServices:
     notification: Any
     scraper: Any
     session_factory: Any | None = None
+    background: Any | None = None
+    key_rotation: Any | None = None
+    reencryption: Any | None = None
+    audit: Any | None = None
+    retention: Any | None = None
+    outbox: Any | None = None
+    broadcasts: Any | None = None
+    alerts: Any | None = None
@@ -0,0 +1,15 @@
+"""Grade transcript persistence shared by registration, refresh and the cron scan."""
+
+from .service import (
+    GradePersistenceResult,
+    GradePersistenceService,
+    detect_released_grades,
+    parse_semester,
+)
+
+__all__ = [
+    "GradePersistenceResult",
+    "GradePersistenceService",
+    "detect_released_grades",
+    "parse_semester",
+]
@@ -0,0 +1,251 @@
+"""Shared persistence of scraped grade transcripts."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Sequence
+
+from crypto.binding import assessment_associated_data, semester_result_associated_data
+from crypto.payload_codec import open_payloads_async, payload_digest, seal_payloads_async
+from database.models import Semester
+from parser.models import GradeReport
+
+logger = logging.getLogger(__name__)
+
+
+def parse_semester(label: str) -> Semester:
+    """Map a portal semester label ("Semester II", "second", ...) to ``Semester``."""
+    lab = label.lower()
+    if "2" in lab or "two" in lab or "second" in lab or " ii" in lab:
+        return Semester.SECOND
+    if "3" in lab or "three" in lab or "third" in lab or "iii" in lab:
+        return Semester.THIRD
+    return Semester.FIRST
+
+
+def _is_graded(grade: str | None) -> bool:
+    return bool(grade and grade.strip() and grade.strip().upper() != "N/A")
+
+
+def detect_released_grades(
+    old_reports: Sequence[GradeReport],
+    new_reports: Sequence[GradeReport],
+) -> tuple[list[str], set[str]]:
+    """Returns the courses with newly released grades, and every currently graded course."""
+    old_graded = {
+        cg.course_code
+        for rep in old_reports
+        for cg in rep.course_grades
+        if _is_graded(cg.grade)
+    }
+    released = []
+    graded = set()
+    for rep in new_reports:
+        for cg in rep.course_grades:
+            if _is_graded(cg.grade):
+                graded.add(f"{cg.course_name} ({cg.course_code})")
+                if cg.course_code not in old_graded:
+                    released.append(f"{cg.course_name} ({cg.course_code})")
+    return released, graded
+
+
+@dataclass(frozen=True)
+class GradePersistenceResult:
+    """What persisting one transcript changed."""
+    user_id: Any
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    released: tuple[str, ...] = ()
+    graded: frozenset[str] = field(default_factory=frozenset)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.written or self.removed)
+
+
+@dataclass(frozen=True)
+class _Term:
+    report: GradeReport
+    semester: Semester
+    associated_data: bytes
+    digest: str
+
+    @property
+    def key(self) -> tuple[str, Semester]:
+        return self.report.academic_year, self.semester
+
+
+class GradePersistenceService:
+    """
+    Writes a scraped transcript for one user; used by registration, manual refresh and the
+    cron scan so the write path is optimised in one place.
+
+    Terms are diffed by keyed content digest. Unchanged terms are neither decrypted nor
+    rewritten; changed terms are updated in place together with their courses and
+    assessments; terms the portal no longer lists are removed. Only stored rows that
+    changed are decrypted, to tell which grades are newly released.
+    """
+
+    def __init__(self, on_change: Callable[[GradePersistenceResult], Awaitable[None]] | None = None) -> None:
+        self.on_change = on_change
+
+    async def persist(
+        self,
+        uow: Any,
+        user_id: Any,
+        reports: Sequence[GradeReport],
+        cipher: Any,
+        department_id: Any | None = None,
+    ) -> GradePersistenceResult:
+        """Write ``reports`` inside ``uow`` without committing; call ``publish`` after the commit."""
+        from sqlalchemy import delete, select, update
+        from database.models import SemesterResult
+
+        terms = []
+        for rep in reports:
+            semester = parse_semester(rep.semester_label)
+            associated_data = semester_result_associated_data(user_id, rep.academic_year, semester)
+            terms.append(_Term(rep, semester, associated_data, payload_digest(cipher, rep, associated_data)))
+
+        stored = {
+            (row.academic_year, row.semester): row
+            for row in await uow.session.execute(
+                select(SemesterResult.id, SemesterResult.academic_year, SemesterResult.semester, SemesterResult.content_digest)
+                .where(SemesterResult.user_id == user_id)
+            )
+        }
+        unchanged, changed = [], []
+        for term in terms:
+            row = stored.pop(term.key, None)
+            if row is not None and row.content_digest == term.digest:
+                unchanged.append(term)
+            else:
+                changed.append((term, row))
+        removed = list(stored.values())
+
+        old_reports = [term.report for term in unchanged]
+        old_reports += await self._open_rows(uow, user_id, cipher, [row for _term, row in changed if row] + removed)
+        released, graded = detect_released_grades(old_reports, reports)
+
+        sealed = await seal_payloads_async(
+            cipher, [term.report for term, _row in changed], [term.associated_data for term, _row in changed]
+        )
+        for (term, row), (blob, iv) in zip(changed, sealed):
+            if row is None:
+                uow.session.add(SemesterResult(
+                    user_id=user_id,
+                    academic_year=term.report.academic_year,
+                    semester=term.semester,
+                    encrypted_result_detail=blob,
+                    iv=iv,
+                    content_digest=term.digest,
+                ))
+            else:
+                await uow.session.execute(
+                    update(SemesterResult)
+                    .where(SemesterResult.id == row.id)
+                    .values(encrypted_result_detail=blob, iv=iv, content_digest=term.digest, is_bound=True)
+                )
+        if removed:
+            await uow.session.execute(delete(SemesterResult).where(SemesterResult.id.in_([row.id for row in removed])))
+
+        await self._write_course_graph(uow, user_id, department_id, [term for term, _row in changed], cipher)
+        return GradePersistenceResult(
+            user_id=user_id,
+            written=len(changed),
+            unchanged=len(unchanged),
+            removed=len(removed),
+            released=tuple(released),
+            graded=frozenset(graded),
+        )
+
+    async def publish(self, result: GradePersistenceResult) -> None:
+        """Hand a committed change to the ``on_change`` subscriber; failures are logged, not raised."""
+        if self.on_change is None or not result.changed:
+            return
+        try:
+            await self.on_change(result)
+        except Exception as e:
+            logger.error(f"Grade change subscriber failed for user {result.user_id}: {e}", exc_info=True)
+
+    async def _open_rows(self, uow: Any, user_id: Any, cipher: Any, rows: Sequence[Any]) -> list[GradeReport]:
+        from sqlalchemy import select
+        from database.models import SemesterResult
+
+        if not rows:
+            return []
+        blobs = {row.id: (row.encrypted_result_detail, row.is_bound) for row in (await uow.session.execute(
+            select(SemesterResult.id, SemesterResult.encrypted_result_detail, SemesterResult.is_bound)
+            .where(SemesterResult.id.in_([row.id for row in rows]))
+        )).all()}
+        payloads = await open_payloads_async(
+            cipher,
+            [blobs[row.id][0] for row in rows],
+            [semester_result_associated_data(user_id, row.academic_year, row.semester) for row in rows],
+            [blobs[row.id][1] for row in rows],
+        )
+        reports = []
+        for payload in payloads:
+            if payload is None:
+                continue
+            try:
+                reports.append(GradeReport.model_validate(payload))
+            except Exception as e:
+                logger.warning(f"Failed to parse stored SemesterResult: {e}")
+        return reports
+
+    async def _write_course_graph(
+        self,
+        uow: Any,
+        user_id: Any,
+        department_id: Any | None,
+        terms: Sequence[_Term],
+        cipher: Any,
+    ) -> None:
+        """Upsert courses, department links, user courses and assessments for ``terms``."""
+        from services.grades.service import assessment_reference_digest
+
+        graded = [
+            ((cg.course_code, term.report.academic_year, term.semester), term, cg)
+            for term in terms
+            for cg in term.report.course_grades
+        ]
+        if not graded:
+            return
+        sealed = await seal_payloads_async(
+            cipher,
+            [
+                {"reference": cg.assessment.model_dump() if cg.assessment else None, "grade": cg.grade}
+                for _key, _term, cg in graded
+            ],
+            [
+                assessment_associated_data(user_id, term.report.academic_year, term.semester)
+                for _key, term, _cg in graded
+            ],
+        )
+
+        await uow.grade_graph.add_missing_courses([
+            {
+                "course_id": cg.course_code,
+                "course_name": cg.course_name,
+                "credit_hours": int(cg.credit_hours) if cg.credit_hours else 0,
+                "ects": int(cg.ects) if cg.ects else 0,
+            }
+            for _key, _term, cg in graded
+        ])
+        if department_id:
+            await uow.grade_graph.link_department_courses(department_id, [cg.course_code for _key, _term, cg in graded])
+        user_course_ids = await uow.grade_graph.upsert_user_courses(user_id, [key for key, _term, _cg in graded])
+        await uow.grade_graph.upsert_assessments([
+            {
+                "user_course_id": user_course_ids[key],
+                "encrypted_assessment_detail": blob,
+                "encrypted_grade": blob,
+                "iv": iv,
+                "reference_digest": assessment_reference_digest(cipher, user_id, cg.assessment),
+                "is_bound": True,
+            }
+            for (key, _term, cg), (blob, iv) in zip(graded, sealed)
+        ])
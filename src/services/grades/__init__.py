@@ -1,5 +1,6 @@
 """Grade read service package."""
 
+from .limiter import RefreshLimiter
 from .service import GradeReadService
 
-__all__ = ["GradeReadService"]
+__all__ = ["GradeReadService", "RefreshLimiter"]
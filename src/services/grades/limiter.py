@@ -0,0 +1,63 @@
+"""Token-bucket limits for manual grade refreshes and the shared portal budget."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BUCKET_KEY = "tokens:portal:global"
+
+
+class RefreshLimiter:
+    """
+    Per-user and global token buckets backed by the cache's ``consume_tokens``.
+    A manual refresh pays into both buckets in one atomic cache round trip; scheduled
+    scrapes pay only into the global bucket, so cron and users share one portal budget.
+    The global bucket is disabled when ``global_per_minute`` is None.
+    """
+
+    def __init__(
+        self,
+        cache: Any,
+        user_burst: int = 2,
+        user_refill_seconds: float = 1800,
+        global_burst: int = 30,
+        global_per_minute: float | None = None,
+    ) -> None:
+        self.cache = cache
+        self.user_burst = user_burst
+        self.user_refill_seconds = user_refill_seconds
+        self.global_burst = global_burst
+        self.global_per_minute = global_per_minute
+
+    def _global_bucket(self) -> list[tuple[str, float, float]]:
+        if not self.global_per_minute:
+            return []
+        return [(GLOBAL_BUCKET_KEY, float(self.global_burst), self.global_per_minute / 60)]
+
+    async def try_manual_refresh(self, telegram_id: int) -> float:
+        """Spend one refresh token for ``telegram_id``; returns 0.0 if allowed, else seconds to wait."""
+        buckets = [
+            (f"tokens:refresh:{telegram_id}", float(self.user_burst), 1 / self.user_refill_seconds),
+            *self._global_bucket(),
+        ]
+        return await self.cache.consume_tokens(buckets)
+
+    async def acquire_scheduled(self, max_wait_seconds: float = 300) -> bool:
+        """Wait for a global portal token on behalf of the scheduler; False if it never came."""
+        buckets = self._global_bucket()
+        if not buckets:
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait_seconds
+        while True:
+            wait = await self.cache.consume_tokens(buckets)
+            if wait <= 0:
+                return True
+            if loop.time() + wait > deadline:
+                logger.warning(f"Scheduled scrape gave up waiting {max_wait_seconds}s for portal budget")
+                return False
+            await asyncio.sleep(wait)
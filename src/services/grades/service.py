@@ -3,11 +3,50 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import logging
+import math
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
 from typing import Any, Sequence
 
+from crypto.binding import (
+    assessment_associated_data,
+    credential_associated_data,
+    decrypt_bound,
+    semester_result_associated_data,
+)
+from crypto.payload_codec import open_payload, open_payloads_async, seal_payload
 from dto.bot import GradeReadRequest, GradeReadResult
 from parser.models import GradeReport, CourseGrade, AssessmentReference, GradeReportSummary
+from services.grade_persistence.service import GradePersistenceResult, GradePersistenceService
+
+from .limiter import RefreshLimiter
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+REFRESHING_MARKER = "🔄 <i>Refreshing from the portal… this message will update when fresh grades arrive.</i>"
+REFRESH_UNAVAILABLE_MARKER = (
+    "⚠️ <b>Refresh unavailable</b>\n"
+    "Could not get fresh grades from the portal right now. Showing your stored grades."
+)
+REFRESH_IN_PROGRESS_MESSAGE = (
+    "⏳ <b>Refresh in progress...</b>\n"
+    "A grade refresh is already in progress. Please wait a moment for it to complete."
+)
+
+# Returned by the refresh path when another process still holds the scrape lock
+# after the wait budget ran out.
+_REFRESH_STILL_RUNNING = object()
+
+
+def assessment_reference_digest(cipher: Any, user_id: Any, reference: Any) -> str | None:
+    """Keyed digest identifying one user's assessment by its portal reference."""
+    if reference is None or cipher is None:
+        return None
+    return cipher.digest(
+        f"{user_id}:{reference.academic_year_id}:{reference.semester_id}:{reference.course_id}"
+    )
 
 
 @dataclass(frozen=True)
@@ -68,6 +107,15 @@ class GradeReadService:
         portal_client: Any | None = None,
         manual_scrape_cooldown_minutes: int = 30,
         notification_service: Any | None = None,
+        background: Any | None = None,
+        stale_while_revalidate: bool = False,
+        refresh_wait_seconds: float = 60.0,
+        refresh_poll_interval_seconds: float = 0.25,
+        refresh_limiter: RefreshLimiter | None = None,
+        keyring: Any | None = None,
+        persistence: GradePersistenceService | None = None,
+        audit: Any | None = None,
+        alerts: Any | None = None,
     ) -> None:
         self.cache = cache
         self.repository = repository
@@ -76,6 +124,24 @@ class GradeReadService:
         self.portal_client = portal_client
         self.manual_scrape_cooldown_minutes = manual_scrape_cooldown_minutes
         self.notification_service = notification_service
+        self.background = background
+        self.stale_while_revalidate = stale_while_revalidate
+        self.refresh_wait_seconds = refresh_wait_seconds
+        self.refresh_poll_interval_seconds = refresh_poll_interval_seconds
+        self._flights = SingleFlight()
+        if refresh_limiter is None and cache is not None:
+            refresh_limiter = RefreshLimiter(cache, user_refill_seconds=manual_scrape_cooldown_minutes * 60)
+        self.refresh_limiter = refresh_limiter
+        self.keyring = keyring
+        self.persistence = persistence or GradePersistenceService()
+        self.audit = audit
+        self.alerts = alerts
+
+    def _cipher_for(self, user_id: Any, wrapped_data_key: bytes | None) -> Any:
+        """Cipher for one user's rows: their data key when envelope encryption is on, else ``self.cipher``."""
+        if self.keyring is None:
+            return self.cipher
+        return self.keyring.cipher_for(user_id, wrapped_data_key)
 
     def _format_reports_to_pages(self, reports: Any, year_filter: str | None = None, semester_filter: str | None = None) -> list[str]:
         if not reports:
@@ -162,259 +228,185 @@ class GradeReadService:
             pages.append((msg, rep))
         return pages
 
+    async def _load_stored_reports(self, uow: Any, user_id: Any, cipher: Any | None = None) -> list[GradeReport]:
+        """Decrypt every stored SemesterResult for a user, skipping unreadable rows."""
+        from sqlalchemy import select
+        from database.models import SemesterResult
+
+        db_results = list(await uow.session.scalars(
+            select(SemesterResult)
+            .where(SemesterResult.user_id == user_id)
+        ))
+        payloads = await open_payloads_async(
+            cipher or self.cipher,
+            [res.encrypted_result_detail for res in db_results],
+            [semester_result_associated_data(user_id, res.academic_year, res.semester) for res in db_results],
+            [res.is_bound for res in db_results],
+        )
+        reports = []
+        for payload in payloads:
+            if payload is None:
+                continue
+            try:
+                reports.append(GradeReport.model_validate(payload))
+            except Exception as e:
+                logger.warning(f"Failed to decrypt/parse SemesterResult: {e}")
+        return reports
+
+    def _page_result(self, reports: Sequence[GradeReport], request: GradeReadRequest) -> GradeReadResult | None:
+        """Select the requested page out of ``reports``; None when nothing matches the filters."""
+        pages = self._format_reports_to_pages(reports, request.year_filter, request.semester_filter)
+        if not pages:
+            return None
+        idx = max(0, min(request.page_index, len(pages) - 1))
+        msg, rep = pages[idx]
+        return GradeReadResult(
+            message=msg,
+            cached=False,
+            current_page=idx,
+            total_pages=len(pages),
+            report=rep
+        )
+
+    async def _read_stored(self, request: GradeReadRequest) -> GradeReadResult | None:
+        """Return the requested page from the database only, never touching the portal."""
+        return await self._flights.do(("stored", request), lambda: self._read_stored_uncoalesced(request))
+
+    async def _read_stored_uncoalesced(self, request: GradeReadRequest) -> GradeReadResult | None:
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        try:
+            async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                db_user = await uow.users.get_by_telegram_id(request.telegram_id)
+                if db_user is None or not db_user.id:
+                    return None
+                cipher = self._cipher_for(db_user.id, getattr(db_user, "wrapped_data_key", None))
+                reports = await self._load_stored_reports(uow, db_user.id, cipher)
+        except Exception as e:
+            logger.error(f"Error loading stored grades: {e}", exc_info=True)
+            return None
+        return self._page_result(reports, request)
+
+    async def read_stale_while_revalidate(
+        self,
+        request: GradeReadRequest,
+        on_refreshed: Callable[[GradeReadResult], Awaitable[None]],
+    ) -> GradeReadResult:
+        """
+        Serve a force refresh from stored grades and scrape the portal in the background.
+        The returned result carries a "refreshing" marker; ``on_refreshed`` receives the
+        fresh page (or the stored page with a failure note) once the background job ends.
+        Falls back to a blocking read when the mode is disabled, the refresh is rate limited,
+        or nothing is stored yet.
+        """
+        if (
+            not request.force_refresh
+            or not self.stale_while_revalidate
+            or self.background is None
+            or self.session_factory is None
+            or self.cipher is None
+        ):
+            return await self.read(request)
+
+        retry_after = await self._admit_refresh(request)
+        if retry_after > 0:
+            return await self._read(replace(request, force_refresh=False), retry_after)
+
+        stale = await self._read_stored(request)
+        if stale is None:
+            return await self._read_admitted(request)
+
+        async def revalidate() -> None:
+            fresh = await self._read_admitted(request)
+            if fresh.report is None:
+                fresh = replace(stale, message=f"{REFRESH_UNAVAILABLE_MARKER}\n\n{stale.message}")
+            await on_refreshed(fresh)
+
+        task = self.background.submit(f"grade-revalidate:{request.telegram_id}", revalidate)
+        if task is None:
+            return await self._read_admitted(request)
+        return replace(stale, message=f"{REFRESHING_MARKER}\n\n{stale.message}", refreshing=True)
+
     async def read(self, request: GradeReadRequest) -> GradeReadResult:
         """
         Reads a user's grade reports, prioritizing the database cache.
-        If `force_refresh` is True, it attempts a live portal scrape, respecting cooldown limits.
+        If `force_refresh` is True, it attempts a live portal scrape when the refresh limiter allows.
         Filters by year and semester if specified.
-        """
-        cooldown_key = f"cooldown:scrape:{request.telegram_id}"
-
-        # 1b. Check scrape cooldown if force_refresh
-        if self.cache is not None and request.force_refresh:
-            if await self.cache.get(cooldown_key):
-                # Still in cooldown, fallback to DB and add warning
-                request = GradeReadRequest(
-                    telegram_id=request.telegram_id, 
-                    force_refresh=False,
-                    year_filter=request.year_filter,
-                    semester_filter=request.semester_filter,
-                    page_index=request.page_index
-                )
-                pass # Continue to load from DB
 
+        A refresh runs in three phases, each with its own short unit of work: read the user
+        and credentials, scrape the portal with no database session checked out, then write
+        the results. A slow portal therefore never pins a pooled connection.
+
+        Identical concurrent reads share one in-flight call, and concurrent refreshes of the
+        same user share one portal scrape, in this process or (via the cache lock) another.
+        """
+        return await self._flights.do(("read", request), lambda: self._admit_and_read(request))
+
+    async def _admit_refresh(self, request: GradeReadRequest) -> float:
+        """Spend a refresh token; returns 0.0 when the refresh may hit the portal, else seconds to wait."""
+        if not request.force_refresh or self.refresh_limiter is None:
+            return 0.0
+        try:
+            return await self.refresh_limiter.try_manual_refresh(request.telegram_id)
+        except Exception as e:
+            logger.error(f"Refresh limiter failed, allowing refresh: {e}")
+            return 0.0
+
+    async def _admit_and_read(self, request: GradeReadRequest) -> GradeReadResult:
+        retry_after = await self._admit_refresh(request)
+        if retry_after > 0:
+            # Rate limited: fall back to DB with a note on when the next refresh is allowed
+            request = replace(request, force_refresh=False)
+        return await self._read(request, retry_after)
+
+    async def _read_admitted(self, request: GradeReadRequest) -> GradeReadResult:
+        """``read`` for a request whose refresh token was already spent."""
+        return await self._flights.do(("read", request), lambda: self._read(request, 0.0))
+
+    async def _read(self, request: GradeReadRequest, retry_after: float) -> GradeReadResult:
         # 2. Try DB and live portal scrape if credentials exist
         if self.session_factory is not None and self.cipher is not None:
             try:
                 from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
-                from database.models import SemesterResult
+
+                # Phase 1: read what the refresh needs, then give the connection back.
                 async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
                     db_user = await uow.users.get_by_telegram_id(request.telegram_id)
-                    if db_user is not None and db_user.id:
-                        if not request.force_refresh:
-                            # Load from DB
-                            from sqlalchemy import select
-                            db_results = await uow.session.scalars(
-                                select(SemesterResult)
-                                .where(SemesterResult.user_id == db_user.id)
-                            )
-                            reports = []
-                            for res in db_results:
-                                try:
-                                    json_data = self.cipher.decrypt(res.encrypted_result_detail)
-                                    reports.append(GradeReport.model_validate_json(json_data))
-                                except Exception as e:
-                                    import logging
-                                    logging.getLogger(__name__).warning(f"Failed to decrypt/parse SemesterResult: {e}")
-                            
-                            if reports:
-                                pages = self._format_reports_to_pages(reports, request.year_filter, request.semester_filter)
-                                if pages:
-                                    idx = max(0, min(request.page_index, len(pages) - 1))
-                                    msg, rep = pages[idx]
-                                    if self.cache is not None and await self.cache.get(cooldown_key):
-                                        msg = f"⏳ <b>Cooldown Active</b>\nYou can only refresh from the portal every {self.manual_scrape_cooldown_minutes} minutes to reduce load. Showing DB grades.\n\n{msg}"
-                                    return GradeReadResult(
-                                        message=msg,
-                                        cached=False,
-                                        current_page=idx,
-                                        total_pages=len(pages),
-                                        report=rep
-                                    )
-                        # Force refresh from portal
-                        lock_key = f"lock:scrape:{request.telegram_id}"
-                        if self.cache is not None:
-                            if not await self.cache.acquire_lock(lock_key, ttl_seconds=60):
-                                return GradeReadResult(
-                                    message="⏳ <b>Refresh in progress...</b>\nA grade refresh is already in progress. Please wait a moment for it to complete.",
-                                    cached=False,
-                                    current_page=0,
-                                    total_pages=1,
-                                    report=None
-                                )
-                                
-                        cred = await uow.credentials.get_by_user_id(db_user.id)
-                        if cred is not None and self.portal_client is not None:
-                            try:
-                                password = self.cipher.decrypt(cred.encrypted_password)
-                                _profile, grade_reports = await self.portal_client.scrape(
-                                    db_user.university_id,
-                                    password,
-                                    db_user.university_id,
+                    if db_user is None or not db_user.id:
+                        return self._no_grades_result()
+                    wrapped_data_key = getattr(db_user, "wrapped_data_key", None)
+                    if not request.force_refresh:
+                        reports = await self._load_stored_reports(
+                            uow, db_user.id, self._cipher_for(db_user.id, wrapped_data_key)
+                        )
+                        stored = self._page_result(reports, request)
+                        if stored is not None:
+                            if retry_after > 0:
+                                minutes = max(1, math.ceil(retry_after / 60))
+                                stored = replace(
+                                    stored,
+                                    message=f"⏳ <b>Cooldown Active</b>\nPortal refreshes are limited to reduce load. You can refresh again in {minutes} min. Showing DB grades.\n\n{stored.message}",
                                 )
-                                
-                                # Save to DB
-                                from database.models import Semester, AuditLog
-                                
-                                # Audit manual scrape success
-                                audit_success = AuditLog(
-                                    telegram_id=request.telegram_id,
-                                    action="manual_scrape",
-                                    details={"success": True, "university_id": db_user.university_id}
-                                )
-                                uow.session.add(audit_success)
-
-                                def parse_semester(label: str) -> Semester:
-                                    lab = label.lower()
-                                    if "2" in lab or "two" in lab or "second" in lab or " ii" in lab:
-                                        return Semester.SECOND
-                                    if "3" in lab or "three" in lab or "third" in lab or "iii" in lab:
-                                        return Semester.THIRD
-                                    return Semester.FIRST
-                                    
-                                from sqlalchemy import delete
-                                await uow.session.execute(delete(SemesterResult).where(SemesterResult.user_id == db_user.id))
-                                
-                                import base64
-                                from crypto.cipher import Ciphertext
-                                for rep in grade_reports:
-                                    rep_json = json.dumps(rep.model_dump())
-                                    enc_rep = self.cipher.encrypt(rep_json)
-                                    rep_payload = Ciphertext.from_token(enc_rep)
-                                    rep_iv = base64.urlsafe_b64encode(rep_payload.nonce).decode("ascii")
-                                    sr = SemesterResult(
-                                        user_id=db_user.id,
-                                        academic_year=rep.academic_year,
-                                        semester=parse_semester(rep.semester_label),
-                                        encrypted_result_detail=enc_rep,
-                                        iv=rep_iv,
-                                    )
-                                    uow.session.add(sr)
-                                    
-                                    # Save Courses, UserCourses, Assessments, and DepartmentCourses
-                                    from database.models import Course, UserCourse, Assessment, DepartmentCourse
-                                    from sqlalchemy import select
-                                    
-                                    for cg in rep.course_grades:
-                                        # Ensure Course exists
-                                        course_db = await uow.courses.get_by_id(cg.course_code)
-                                        if not course_db:
-                                            course_db = Course(
-                                                course_id=cg.course_code,
-                                                course_name=cg.course_name,
-                                                credit_hours=int(cg.credit_hours) if cg.credit_hours else 0,
-                                                ects=int(cg.ects) if cg.ects else 0,
-                                            )
-                                            await uow.courses.add(course_db)
-                                            await uow.session.flush()
-                                            
-                                        if db_user.department_id:
-                                            dc_stmt = select(DepartmentCourse).where(
-                                                DepartmentCourse.department_id == db_user.department_id,
-                                                DepartmentCourse.course_id == course_db.course_id
-                                            )
-                                            dc_db = await uow.session.scalar(dc_stmt)
-                                            if not dc_db:
-                                                dc_db = DepartmentCourse(
-                                                    department_id=db_user.department_id,
-                                                    course_id=course_db.course_id
-                                                )
-                                                uow.session.add(dc_db)
-
-                                        # Create or update UserCourse
-                                        uc_stmt = select(UserCourse).where(
-                                            UserCourse.user_id == db_user.id,
-                                            UserCourse.course_id == course_db.course_id,
-                                            UserCourse.academic_year == rep.academic_year,
-                                            UserCourse.semester == parse_semester(rep.semester_label)
-                                        )
-                                        uc_db = await uow.session.scalar(uc_stmt)
-                                        if not uc_db:
-                                            uc_db = UserCourse(
-                                                user_id=db_user.id,
-                                                course_id=course_db.course_id,
-                                                academic_year=rep.academic_year,
-                                                semester=parse_semester(rep.semester_label)
-                                            )
-                                            uow.session.add(uc_db)
-                                            await uow.session.flush()
-
-                                        # Save Assessment reference
-                                        asm_dict = {
-                                            "reference": cg.assessment.model_dump() if cg.assessment else None,
-                                            "grade": cg.grade
-                                        }
-                                        enc_asm = self.cipher.encrypt(json.dumps(asm_dict))
-                                        asm_payload = Ciphertext.from_token(enc_asm)
-                                        asm_iv = base64.urlsafe_b64encode(asm_payload.nonce).decode("ascii")
-
-                                        asm_stmt = select(Assessment).where(Assessment.user_course_id == uc_db.id)
-                                        asm_db = await uow.session.scalar(asm_stmt)
-                                        if not asm_db:
-                                            asm_db = Assessment(
-                                                user_course_id=uc_db.id,
-                                                encrypted_assessment_detail=enc_asm,
-                                                encrypted_grade=enc_asm,
-                                                iv=asm_iv
-                                            )
-                                            uow.session.add(asm_db)
-                                        else:
-                                            # Don't overwrite if it already has detailed scores, only if it's just reference
-                                            asm_db.encrypted_assessment_detail = enc_asm
-                                            asm_db.encrypted_grade = enc_asm
-                                            asm_db.iv = asm_iv
-                                            
-                                await uow.commit()
-
-                                pages = self._format_reports_to_pages(grade_reports, request.year_filter, request.semester_filter)
-                                if pages:
-                                    if self.cache is not None:
-                                        await self.cache.set(cooldown_key, "1", ttl_seconds=self.manual_scrape_cooldown_minutes * 60)
-                                    idx = max(0, min(request.page_index, len(pages) - 1))
-                                    msg, rep = pages[idx]
-                                    return GradeReadResult(
-                                        message=msg,
-                                        cached=False,
-                                        current_page=idx,
-                                        total_pages=len(pages),
-                                        report=rep
-                                    )
-                            except Exception as scrape_err:
-                                import logging
-                                from clients.aau_portal import PortalSchemaChangedError, PortalAuthenticationError
-                                from database.models import AuditLog
-                                
-                                if isinstance(scrape_err, PortalSchemaChangedError) and self.notification_service is not None:
-                                    snippet = getattr(scrape_err.diagnostic, "html_snippet", "")
-                                    await getattr(self.notification_service, "send_admin", self.notification_service.send_admin_alert)(
-                                        f"Portal schema changed during grades refresh: {scrape_err}",
-                                        snippet
-                                    )
-                                elif isinstance(scrape_err, PortalAuthenticationError):
-                                    # Mark credentials as invalid to prevent lockout (ADR 021)
-                                    cred.is_valid = False
-                                    
-                                    audit_fail = AuditLog(
-                                        telegram_id=request.telegram_id,
-                                        action="authentication_failed",
-                                        details={"reason": "invalid_credentials", "university_id": db_user.university_id}
-                                    )
-                                    uow.session.add(audit_fail)
-                                    
-                                    await uow.commit()
-                                    if self.notification_service is not None and hasattr(self.notification_service, "send_user"):
-                                        await self.notification_service.send_user(
-                                            request.telegram_id,
-                                            "⚠️ <b>Authentication Failed</b>\nYour AAU portal password appears to have been changed or is incorrect. Automated grade checking has been paused. Please use /change_password to update it."
-                                        )
-                                else:
-                                    audit_fail = AuditLog(
-                                        telegram_id=request.telegram_id,
-                                        action="manual_scrape_failed",
-                                        details={"reason": str(scrape_err), "university_id": db_user.university_id}
-                                    )
-                                    uow.session.add(audit_fail)
-                                    await uow.commit()
-
-                                logging.getLogger(__name__).warning(f"Portal scrape failed for user: {scrape_err}")
-                            finally:
-                                if self.cache is not None:
-                                    await self.cache.release_lock(lock_key)
+                            return stored
+                    cred = await uow.credentials.get_by_user_id(db_user.id)
+                    user_id = db_user.id
+                    university_id = db_user.university_id
+                    department_id = db_user.department_id
+                    encrypted_password = cred.encrypted_password if cred is not None else None
+                    password_bound = cred.is_bound if cred is not None else True
+
+                if encrypted_password is not None and self.portal_client is not None:
+                    return await self._refresh_from_portal(
+                        request, user_id, university_id, department_id, encrypted_password, wrapped_data_key,
+                        password_bound,
+                    ) or self._no_grades_result()
             except Exception as e:
-                import logging
-                logging.getLogger(__name__).error(f"Error checking cooldown or parsing DB: {e}", exc_info=True)
+                logger.error(f"Error loading or refreshing grades: {e}", exc_info=True)
 
         # Fallback: no grades found via any path
+        return self._no_grades_result()
+
+    def _no_grades_result(self) -> GradeReadResult:
         return GradeReadResult(
             message=(
                 "No grades available yet. Please use /register to connect your AAU account "
@@ -425,77 +417,331 @@ class GradeReadService:
             total_pages=1,
         )
 
+    async def _refresh_from_portal(
+        self,
+        request: GradeReadRequest,
+        user_id: Any,
+        university_id: str,
+        department_id: Any,
+        encrypted_password: str,
+        wrapped_data_key: bytes | None = None,
+        password_bound: bool = True,
+    ) -> GradeReadResult | None:
+        """Scrape the portal and persist the results; None when the refresh produced nothing."""
+        grade_reports = await self._flights.do(
+            ("refresh", request.telegram_id),
+            lambda: self._refresh_reports(
+                request, user_id, university_id, department_id, encrypted_password, wrapped_data_key,
+                password_bound,
+            ),
+        )
+        if grade_reports is _REFRESH_STILL_RUNNING:
+            return GradeReadResult(
+                message=REFRESH_IN_PROGRESS_MESSAGE,
+                cached=False,
+                current_page=0,
+                total_pages=1,
+                report=None
+            )
+        if grade_reports is None:
+            return None
+        return self._page_result(grade_reports, request)
+
+    async def _refresh_reports(
+        self,
+        request: GradeReadRequest,
+        user_id: Any,
+        university_id: str,
+        department_id: Any,
+        encrypted_password: str,
+        wrapped_data_key: bytes | None = None,
+        password_bound: bool = True,
+    ) -> Any:
+        """
+        Leader side of a refresh: scrape, persist, and publish the outcome for other processes.
+        When another process holds the scrape lock, wait for it and reuse what it stored.
+        A user without a data key is issued one in the write phase, together with the
+        re-sealed grades, so all of their grade rows always share one key.
+        """
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+        from database.models import AuditLog
+
+        lock_key = f"lock:scrape:{request.telegram_id}"
+        status_key = f"refresh:status:{request.telegram_id}"
+        if self.cache is not None:
+            if not await self.cache.acquire_lock(lock_key, ttl_seconds=60):
+                return await self._await_remote_refresh(lock_key, status_key, user_id)
+
+        status = "failed"
+        try:
+            try:
+                # Phase 2: portal I/O, no database session held.
+                password = decrypt_bound(
+                    self._cipher_for(user_id, wrapped_data_key),
+                    encrypted_password,
+                    credential_associated_data(user_id),
+                    password_bound,
+                )
+                _profile, grade_reports = await self.portal_client.scrape(
+                    university_id,
+                    password,
+                    university_id,
+                )
+
+                # Phase 3: write the fresh results in a new, short unit of work.
+                async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                    cipher = self.cipher
+                    if self.keyring is not None:
+                        from services.key_rotation.service import ensure_user_data_key
+                        cipher = await ensure_user_data_key(self.keyring, uow.session, user_id, wrapped_data_key)
+                    audit_details = {"success": True, "university_id": university_id}
+                    if self.audit is None:
+                        uow.session.add(AuditLog(telegram_id=request.telegram_id, action="manual_scrape", details=audit_details))
+                    persisted = await self._persist_reports(uow, user_id, department_id, grade_reports, cipher)
+                    await uow.commit()
+                if self.audit is not None:
+                    self.audit.record(request.telegram_id, "manual_scrape", audit_details)
+                await self.persistence.publish(persisted)
+            except Exception as scrape_err:
+                await self._record_refresh_failure(request, user_id, university_id, scrape_err)
+                return None
+
+            status = "ok"
+            return list(grade_reports)
+        finally:
+            if self.cache is not None:
+                # Publish the outcome before releasing so waiting processes never read a stale status.
+                await self.cache.set(status_key, status, ttl_seconds=60)
+                await self.cache.release_lock(lock_key)
+
+    async def _await_remote_refresh(self, lock_key: str, status_key: str, user_id: Any) -> Any:
+        """Wait for another process's refresh to finish, then load what it persisted."""
+        import asyncio
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.refresh_wait_seconds
+        while await self.cache.get(lock_key):
+            if loop.time() >= deadline:
+                return _REFRESH_STILL_RUNNING
+            await asyncio.sleep(self.refresh_poll_interval_seconds)
+
+        if await self.cache.get(status_key) != "ok":
+            return None
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            cipher = self.cipher
+            if self.keyring is not None:
+                # The other process may have just issued this user's data key
+                from sqlalchemy import select
+                from database.models import User
+                wrapped = await uow.session.scalar(select(User.wrapped_data_key).where(User.id == user_id))
+                cipher = self._cipher_for(user_id, wrapped)
+            return await self._load_stored_reports(uow, user_id, cipher)
+
+    async def _persist_reports(
+        self,
+        uow: Any,
+        user_id: Any,
+        department_id: Any,
+        grade_reports: Sequence[GradeReport],
+        cipher: Any | None = None,
+    ) -> GradePersistenceResult:
+        """Write ``grade_reports`` and their course graph through the shared persistence service."""
+        return await self.persistence.persist(uow, user_id, grade_reports, cipher or self.cipher, department_id)
+
+    async def _record_refresh_failure(
+        self,
+        request: GradeReadRequest,
+        user_id: Any,
+        university_id: str,
+        scrape_err: Exception,
+    ) -> None:
+        """Audit a failed refresh in its own unit of work and alert whoever needs to know."""
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+        from clients.aau_portal import PortalSchemaChangedError, PortalAuthenticationError
+        from database.models import AuditLog
+
+        try:
+            if isinstance(scrape_err, PortalSchemaChangedError) and self.alerts is not None:
+                # Every user hits the same redesign; the aggregator alerts once per signature
+                await self.alerts.schema_changed(scrape_err, "a grades refresh")
+            elif isinstance(scrape_err, PortalAuthenticationError):
+                async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                    # Mark credentials as invalid to prevent lockout (ADR 021)
+                    cred = await uow.credentials.get_by_user_id(user_id)
+                    if cred is not None:
+                        cred.is_valid = False
+                    self._audit(
+                        uow,
+                        request.telegram_id,
+                        "authentication_failed",
+                        {"reason": "invalid_credentials", "university_id": university_id},
+                    )
+                    await uow.commit()
+                if self.notification_service is not None and hasattr(self.notification_service, "send_user"):
+                    # The user is waiting on this refresh, so digests and quiet hours do not apply
+                    await self.notification_service.send_user(
+                        request.telegram_id,
+                        "⚠️ <b>Authentication Failed</b>\nYour AAU portal password appears to have been changed or is incorrect. Automated grade checking has been paused. Please use /change_password to update it.",
+                        background=False,
+                    )
+            elif self.audit is not None:
+                self.audit.record(
+                    request.telegram_id,
+                    "manual_scrape_failed",
+                    {"reason": str(scrape_err), "university_id": university_id},
+                )
+            else:
+                async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                    uow.session.add(AuditLog(
+                        telegram_id=request.telegram_id,
+                        action="manual_scrape_failed",
+                        details={"reason": str(scrape_err), "university_id": university_id}
+                    ))
+                    await uow.commit()
+        except Exception as e:
+            logger.error(f"Failed to record grade refresh failure: {e}", exc_info=True)
+
+        logger.warning(f"Portal scrape failed for user: {scrape_err}")
+
+    def _audit(self, uow: Any, telegram_id: int, action: str, details: dict[str, Any]) -> None:
+        """Buffer the event when an audit writer is configured, else add it to ``uow``."""
+        from database.models import AuditLog
+
+        if self.audit is not None:
+            self.audit.record(telegram_id, action, details)
+        else:
+            uow.session.add(AuditLog(telegram_id=telegram_id, action=action, details=details))
+
     async def read_assessment(self, telegram_id: int, course_code: str, reference: Any) -> str:
-        """Fetch assessment details from DB or Portal."""
+        """
+        Fetch assessment details from DB or Portal.
+        Stored details are found by the reference's keyed digest, so a cache hit is one
+        indexed query and one decrypt; a miss scrapes once and writes back to that exact row.
+        """
         if not hasattr(reference, "academic_year_id"):
             return "Invalid reference."
-            
+
         if self.session_factory is not None and self.cipher is not None:
-            from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
-            from database.models import UserCourse, Assessment
-            from sqlalchemy import select
-            import json
-            from parser.models import AssessmentDetailsResult
+            key = ("assessment", telegram_id, reference.academic_year_id, reference.semester_id, reference.course_id)
+            return await self._flights.do(key, lambda: self._read_assessment(telegram_id, course_code, reference))
 
-            async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
-                db_user = await uow.users.get_by_telegram_id(telegram_id)
-                if not db_user:
-                    return "User not found."
-                
-                # Try finding it in DB first
-                uc_stmt = select(UserCourse).where(UserCourse.user_id == db_user.id, UserCourse.course_id == course_code)
-                ucs = await uow.session.scalars(uc_stmt)
-                # Just take the first matching user_course that has this assessment (we don't know the year/sem here exactly, but it should be unique enough for the course, or we can just try all)
-                for uc in ucs:
-                    asm_stmt = select(Assessment).where(Assessment.user_course_id == uc.id)
-                    asm_db = await uow.session.scalar(asm_stmt)
-                    if asm_db:
-                        try:
-                            decrypted = self.cipher.decrypt(asm_db.encrypted_assessment_detail)
-                            data = json.loads(decrypted)
-                            if "scores" in data:
-                                # It's a full detail, not just a reference
-                                det = AssessmentDetailsResult.model_validate_json(decrypted)
-                                return self._format_assessment(det)
-                        except Exception:
-                            pass
-                            
-                # If we get here, we need to scrape
-                cred = await uow.credentials.get_by_user_id(db_user.id)
-                if not cred or not self.portal_client:
-                    return "Credentials missing or portal client not configured."
-                    
-                password = self.cipher.decrypt(cred.encrypted_password)
-                
-                det_result = await self.portal_client.scrape_assessment(
-                    db_user.university_id,
-                    password,
-                    db_user.university_id,
-                    reference.academic_year_id,
-                    reference.semester_id,
-                    reference.course_id
+        return "Service unavailable."
+
+    async def _read_assessment(self, telegram_id: int, course_code: str, reference: Any) -> str:
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+        from database.models import Assessment, UserCourse
+        from sqlalchemy import select
+        from parser.models import AssessmentDetailsResult
+
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            db_user = await uow.users.get_by_telegram_id(telegram_id)
+            if not db_user:
+                return "User not found."
+
+            cipher = self._cipher_for(db_user.id, getattr(db_user, "wrapped_data_key", None))
+            ref_digest = assessment_reference_digest(cipher, db_user.id, reference)
+            stored = (await uow.session.execute(
+                select(
+                    Assessment.encrypted_assessment_detail,
+                    Assessment.is_bound,
+                    UserCourse.academic_year,
+                    UserCourse.semester,
                 )
-                
-                # Save it back if we can find the Assessment row
-                # We need to know which uc it is.
-                # The reference.course_id is the GUID on AAU side, not the course_code
-                # But we know course_code. Let's just find the first uc with course_code and update its Assessment.
-                uc_stmt = select(UserCourse).where(UserCourse.user_id == db_user.id, UserCourse.course_id == course_code)
-                uc = await uow.session.scalar(uc_stmt)
-                if uc:
-                    asm_stmt = select(Assessment).where(Assessment.user_course_id == uc.id)
-                    asm_db = await uow.session.scalar(asm_stmt)
-                    if asm_db:
-                        from crypto.cipher import Ciphertext
-                        import base64
-                        new_json = det_result.model_dump_json()
-                        enc_asm = self.cipher.encrypt(new_json)
-                        asm_db.encrypted_assessment_detail = enc_asm
-                        await uow.commit()
-
-                return self._format_assessment(det_result)
+                .join(UserCourse, Assessment.user_course_id == UserCourse.id)
+                .where(Assessment.reference_digest == ref_digest)
+                .limit(1)
+            )).first()
+            if stored is not None:
+                try:
+                    data = open_payload(
+                        cipher,
+                        stored.encrypted_assessment_detail,
+                        assessment_associated_data(db_user.id, stored.academic_year, stored.semester),
+                        stored.is_bound,
+                    )
+                    if "assessment" in data:
+                        # It's a full detail, not just a reference
+                        return self._format_assessment(AssessmentDetailsResult.model_validate(data))
+                except Exception as e:
+                    logger.warning(f"Failed to decrypt/parse cached assessment: {e}")
+
+            cred = await uow.credentials.get_by_user_id(db_user.id)
+            if not cred or not self.portal_client:
+                return "Credentials missing or portal client not configured."
+            user_id = db_user.id
+            university_id = db_user.university_id
+            encrypted_password = cred.encrypted_password
+            password_bound = cred.is_bound
+
+        # Scrape with no database session held.
+        password = decrypt_bound(cipher, encrypted_password, credential_associated_data(user_id), password_bound)
+        det_result = await self.portal_client.scrape_assessment(
+            university_id,
+            password,
+            university_id,
+            reference.academic_year_id,
+            reference.semester_id,
+            reference.course_id
+        )
 
-        return "Service unavailable."
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            found = (await uow.session.execute(
+                select(Assessment, UserCourse.academic_year, UserCourse.semester)
+                .join(UserCourse, Assessment.user_course_id == UserCourse.id)
+                .where(Assessment.reference_digest == ref_digest)
+                .limit(1)
+            )).first()
+            if found is None:
+                found = await self._find_legacy_assessment(uow, user_id, course_code, reference, cipher)
+            if found is not None:
+                asm_db, academic_year, semester = found
+                asm_db.encrypted_assessment_detail = seal_payload(
+                    cipher, det_result, assessment_associated_data(user_id, academic_year, semester)
+                )
+                asm_db.reference_digest = ref_digest
+                await uow.commit()
+
+        return self._format_assessment(det_result)
+
+    async def _find_legacy_assessment(
+        self,
+        uow: Any,
+        user_id: Any,
+        course_code: str,
+        reference: Any,
+        cipher: Any,
+    ) -> tuple[Any, str, Any] | None:
+        """
+        Locate a row stored before reference digests existed by matching its encrypted reference.
+        Returns the row with its course's academic year and semester.
+        """
+        from database.models import UserCourse, Assessment
+        from sqlalchemy import select
+
+        rows = await uow.session.execute(
+            select(Assessment, UserCourse.academic_year, UserCourse.semester)
+            .join(UserCourse, Assessment.user_course_id == UserCourse.id)
+            .where(
+                UserCourse.user_id == user_id,
+                UserCourse.course_id == course_code,
+                Assessment.reference_digest.is_(None),
+            )
+        )
+        wanted = reference.model_dump()
+        for asm_db, academic_year, semester in rows:
+            try:
+                data = open_payload(
+                    cipher,
+                    asm_db.encrypted_assessment_detail,
+                    assessment_associated_data(user_id, academic_year, semester),
+                    asm_db.is_bound,
+                )
+            except Exception:
+                continue
+            if data.get("reference") == wanted:
+                return asm_db, academic_year, semester
+        return None
 
     def _format_assessment(self, result: Any) -> str:
         if not result or not result.assessment:
@@ -0,0 +1,57 @@
+"""In-process request coalescing for concurrent identical work."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """The leading call was cancelled; its followers were not, so they run the work again."""
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+    Callers arriving while a call for the same key is in flight await its result
+    (or exception) instead of starting their own. The key is forgotten as soon as
+    the call finishes, so later callers always see fresh work. If the leading caller
+    is cancelled, its followers are not: one of them becomes the new leader.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future[Any]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        while (existing := self._calls.get(key)) is not None:
+            try:
+                # Shield so a cancelled follower does not cancel the leader's call.
+                return await asyncio.shield(existing)
+            except _LeaderCancelled:
+                continue
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when no follower was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
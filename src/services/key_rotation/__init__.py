@@ -0,0 +1,12 @@
+"""Data key issuance and master-key rotation package."""
+
+from .reencrypt import PayloadReencryptionService, ReencryptionRunResult
+from .service import DataKeyRewrapService, RewrapRunResult, ensure_user_data_key
+
+__all__ = [
+    "DataKeyRewrapService",
+    "PayloadReencryptionService",
+    "ReencryptionRunResult",
+    "RewrapRunResult",
+    "ensure_user_data_key",
+]
@@ -0,0 +1,430 @@
+"""Resumable re-encryption of stored payloads onto the current keys."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from crypto.binding import (
+    assessment_associated_data,
+    credential_associated_data,
+    semester_result_associated_data,
+)
+from crypto.envelope import EnvelopeKeyring
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PREFIX = "reencrypt"
+CURSOR_DONE = "done"
+# Part of the pass target, so a finished pass is redone when a new pass version must revisit
+# every row under the same key (2: bind rows written before associated data and set is_bound)
+PASS_VERSION = 2
+TABLES = ("user_credentials", "semester_results", "assessments")
+
+
+@dataclass(frozen=True)
+class ReencryptionTableReport:
+    """Work done on one table during a re-encryption pass."""
+    table: str
+    scanned: int = 0
+    reencrypted: int = 0
+    failed: int = 0
+    batches: int = 0
+    finished: bool = False
+
+
+@dataclass(frozen=True)
+class ReencryptionRunResult:
+    """Outcome of one run of the re-encryption job."""
+    tables: tuple[ReencryptionTableReport, ...] = ()
+    elapsed_seconds: float = 0.0
+    completed: bool = False
+    skipped: bool = False
+
+    @property
+    def rows_per_second(self) -> float:
+        scanned = sum(report.scanned for report in self.tables)
+        return scanned / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def _iv(blob: bytes) -> str:
+    return base64.urlsafe_b64encode(blob[:12]).decode("ascii")
+
+
+def _open_for_rotation(
+    cipher: Any, blob: bytes | str, associated_data: bytes, bound: bool
+) -> tuple[bytes, bool]:
+    """
+    Like ``decrypt_for_rotation``, but in rows not yet flagged ``is_bound`` a blob sealed
+    without associated data is also read, and counts as stale.
+    """
+    try:
+        return cipher.decrypt_for_rotation(blob, associated_data)
+    except ValueError:
+        if bound:
+            raise
+        return cipher.decrypt_for_rotation(blob)[0], True
+
+
+class PayloadReencryptionService:
+    """
+    Re-encrypt rows that can only be opened with a retired key, and bind rows written
+    before payloads were bound to their row.
+
+    ``user_credentials``, ``semester_results`` and ``assessments`` are streamed in
+    primary-key order (keyset pagination), one short transaction per batch. The batch's
+    updates and the table's cursor in ``system_settings`` commit together, so a stopped
+    job resumes exactly where it left off. Each update is guarded by the old ciphertext:
+    a row rewritten by the bot in the meantime is left alone, as it is already current.
+    Rows are re-sealed with their owner's data key, or the primary master key for users
+    who do not have one yet. A pass runs whether or not a key was retired: rows with
+    ``is_bound`` False are re-sealed with their associated data and flagged, after which
+    they no longer open without it. Tables run concurrently, up to ``concurrency`` at a
+    time, and the crypto runs in worker threads so the bot keeps serving updates.
+    """
+
+    def __init__(
+        self,
+        session_factory: Any,
+        keyring: EnvelopeKeyring,
+        lock: Any | None = None,
+        batch_size: int = 200,
+        concurrency: int = 2,
+    ) -> None:
+        self.session_factory = session_factory
+        self.keyring = keyring
+        self.lock = lock
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def run(self, max_batches: int | None = None) -> ReencryptionRunResult:
+        """Advance the current pass by up to ``max_batches`` batches per table (all remaining if None)."""
+        lock_key = "lock:reencrypt"
+        if self.lock is not None and not await self.lock.acquire_lock(lock_key, ttl_seconds=3600):
+            return ReencryptionRunResult(skipped=True)
+
+        started = time.perf_counter()
+        try:
+            cursors = await self._load_cursors()
+            if all(cursor == CURSOR_DONE for cursor in cursors.values()):
+                return ReencryptionRunResult(completed=True, skipped=True)
+
+            gate = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(table: str) -> ReencryptionTableReport:
+                async with gate:
+                    return await self._run_table(table, cursors[table], max_batches)
+
+            reports = tuple(await asyncio.gather(*(bounded(table) for table in TABLES)))
+        finally:
+            if self.lock is not None:
+                await self.lock.release_lock(lock_key)
+
+        result = ReencryptionRunResult(
+            tables=reports,
+            elapsed_seconds=time.perf_counter() - started,
+            completed=all(report.finished for report in reports),
+        )
+        summary = ", ".join(f"{r.table}: {r.reencrypted}/{r.scanned}" for r in reports)
+        logger.info(
+            f"Re-encryption pass for key {self.keyring.master_key_id}: {summary} "
+            f"({result.rows_per_second:.0f} rows/s, completed={result.completed})"
+        )
+        return result
+
+    async def _load_cursors(self) -> dict[str, str]:
+        """Read the per-table cursors, starting a new pass if the primary key changed."""
+        from repositories.sqlalchemy.system_setting_repository import SqlAlchemySystemSettingRepository
+
+        async with self.session_factory() as session:
+            settings = SqlAlchemySystemSettingRepository(session)
+            target_key = f"{CHECKPOINT_PREFIX}:target"
+            target = f"{self.keyring.master_key_id}:v{PASS_VERSION}"
+            if await settings.get(target_key) != target:
+                await settings.set(target_key, target)
+                for table in TABLES:
+                    await settings.set(f"{CHECKPOINT_PREFIX}:{table}:cursor", "")
+                await session.commit()
+                return {table: "" for table in TABLES}
+            return {
+                table: await settings.get(f"{CHECKPOINT_PREFIX}:{table}:cursor") or ""
+                for table in TABLES
+            }
+
+    async def _run_table(self, table: str, cursor: str, max_batches: int | None) -> ReencryptionTableReport:
+        from repositories.sqlalchemy.system_setting_repository import SqlAlchemySystemSettingRepository
+
+        if cursor == CURSOR_DONE:
+            return ReencryptionTableReport(table=table, finished=True)
+
+        fetch, transform, write = {
+            "user_credentials": (self._fetch_credentials, self._reencrypt_credential, self._write_credentials),
+            "semester_results": (self._fetch_semester_results, self._reencrypt_semester_result, self._write_semester_results),
+            "assessments": (self._fetch_assessments, self._reencrypt_assessment, self._write_assessments),
+        }[table]
+        scanned = reencrypted = failed = batches = 0
+        after = self._parse_cursor(cursor)
+        finished = False
+        while max_batches is None or batches < max_batches:
+            async with self.session_factory() as session:
+                rows = (await session.execute(fetch(after))).all()
+            if not rows:
+                finished = True
+                next_cursor = CURSOR_DONE
+            else:
+                after = rows[-1][0]
+                next_cursor = str(after)
+
+            updates, errors = [], 0
+            if rows:
+                # Unwrap data keys here, on the loop, so only AES-GCM work goes to the thread
+                ciphers = self._ciphers_for(rows)
+                updates, errors = await asyncio.to_thread(self._transform, rows, ciphers, transform)
+            async with self.session_factory() as session:
+                if updates:
+                    await write(session, updates)
+                await SqlAlchemySystemSettingRepository(session).set(
+                    f"{CHECKPOINT_PREFIX}:{table}:cursor", next_cursor
+                )
+                await session.commit()
+
+            if finished:
+                break
+            batches += 1
+            scanned += len(rows)
+            reencrypted += len(updates)
+            failed += errors
+
+        return ReencryptionTableReport(
+            table=table,
+            scanned=scanned,
+            reencrypted=reencrypted,
+            failed=failed,
+            batches=batches,
+            finished=finished,
+        )
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Any:
+        import uuid
+        return uuid.UUID(cursor) if cursor else None
+
+    def _ciphers_for(self, rows: list[Any]) -> dict[Any, Any]:
+        ciphers = {}
+        for row in rows:
+            if row.owner_id in ciphers:
+                continue
+            try:
+                ciphers[row.owner_id] = self.keyring.cipher_for(row.owner_id, row.wrapped_data_key)
+            except ValueError as e:
+                logger.error(f"Cannot unwrap data key for user {row.owner_id}: {e}")
+        return ciphers
+
+    def _transform(
+        self,
+        rows: list[Any],
+        ciphers: dict[Any, Any],
+        reencrypt_row: Callable[[Any, Any], dict[str, Any] | None],
+    ) -> tuple[list[dict[str, Any]], int]:
+        updates = []
+        failed = 0
+        for row in rows:
+            try:
+                cipher = ciphers.get(row.owner_id)
+                if cipher is None:
+                    raise ValueError("no usable key for the row's owner")
+                update = reencrypt_row(row, cipher)
+            except ValueError as e:
+                # Unreadable under every configured key; leave it for an operator to inspect
+                failed += 1
+                logger.error(f"Cannot re-encrypt row {row[0]}: {e}")
+                continue
+            if update is not None:
+                updates.append(update)
+        return updates, failed
+
+    # user_credentials
+
+    def _fetch_credentials(self, after: Any) -> Any:
+        from sqlalchemy import select
+        from database.models import User, UserCredential
+
+        stmt = (
+            select(
+                UserCredential.user_id,
+                UserCredential.user_id.label("owner_id"),
+                User.wrapped_data_key,
+                UserCredential.encrypted_password,
+                UserCredential.is_bound,
+            )
+            .join(User, User.id == UserCredential.user_id)
+            .order_by(UserCredential.user_id)
+            .limit(self.batch_size)
+        )
+        return stmt if after is None else stmt.where(UserCredential.user_id > after)
+
+    @staticmethod
+    def _reencrypt_credential(row: Any, cipher: Any) -> dict[str, Any] | None:
+        associated_data = credential_associated_data(row.owner_id)
+        plaintext, stale = _open_for_rotation(cipher, row.encrypted_password, associated_data, row.is_bound)
+        if not stale and row.is_bound:
+            return None
+        sealed = cipher.seal(plaintext.decode("utf-8"), associated_data)
+        return {
+            "b_id": row.user_id,
+            "b_old": row.encrypted_password,
+            "b_value": sealed.to_token(),
+            "b_iv": base64.urlsafe_b64encode(sealed.nonce).decode("ascii"),
+        }
+
+    async def _write_credentials(self, session: Any, updates: list[dict[str, Any]]) -> None:
+        from sqlalchemy import bindparam, update
+        from database.models import UserCredential
+
+        table = UserCredential.__table__
+        await session.execute(
+            update(table)
+            .where(table.c.user_id == bindparam("b_id"), table.c.encrypted_password == bindparam("b_old"))
+            .values(encrypted_password=bindparam("b_value"), iv=bindparam("b_iv"), is_bound=True),
+            updates,
+        )
+
+    # semester_results
+
+    def _fetch_semester_results(self, after: Any) -> Any:
+        from sqlalchemy import select
+        from database.models import SemesterResult, User
+
+        stmt = (
+            select(
+                SemesterResult.id,
+                SemesterResult.user_id.label("owner_id"),
+                User.wrapped_data_key,
+                SemesterResult.academic_year,
+                SemesterResult.semester,
+                SemesterResult.content_digest,
+                SemesterResult.encrypted_result_detail,
+                SemesterResult.is_bound,
+            )
+            .join(User, User.id == SemesterResult.user_id)
+            .order_by(SemesterResult.id)
+            .limit(self.batch_size)
+        )
+        return stmt if after is None else stmt.where(SemesterResult.id > after)
+
+    @staticmethod
+    def _reencrypt_semester_result(row: Any, cipher: Any) -> dict[str, Any] | None:
+        from crypto.payload_codec import decode_payload, payload_digest
+
+        associated_data = semester_result_associated_data(row.owner_id, row.academic_year, row.semester)
+        plaintext, stale = _open_for_rotation(cipher, row.encrypted_result_detail, associated_data, row.is_bound)
+        if not stale and row.is_bound and row.content_digest is not None:
+            return None
+        new_blob = cipher.encrypt_bytes(plaintext, associated_data) if stale else row.encrypted_result_detail
+        return {
+            "b_id": row.id,
+            "b_old": row.encrypted_result_detail,
+            "b_value": new_blob,
+            "b_iv": _iv(new_blob),
+            "b_digest": payload_digest(cipher, decode_payload(plaintext), associated_data),
+        }
+
+    async def _write_semester_results(self, session: Any, updates: list[dict[str, Any]]) -> None:
+        from sqlalchemy import bindparam, update
+        from database.models import SemesterResult
+
+        table = SemesterResult.__table__
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.encrypted_result_detail == bindparam("b_old"))
+            .values(
+                encrypted_result_detail=bindparam("b_value"),
+                iv=bindparam("b_iv"),
+                content_digest=bindparam("b_digest"),
+                is_bound=True,
+            ),
+            updates,
+        )
+
+    # assessments
+
+    def _fetch_assessments(self, after: Any) -> Any:
+        from sqlalchemy import select
+        from database.models import Assessment, User, UserCourse
+
+        stmt = (
+            select(
+                Assessment.id,
+                UserCourse.user_id.label("owner_id"),
+                User.wrapped_data_key,
+                UserCourse.academic_year,
+                UserCourse.semester,
+                Assessment.encrypted_grade,
+                Assessment.encrypted_assessment_detail,
+                Assessment.is_bound,
+            )
+            .join(UserCourse, UserCourse.id == Assessment.user_course_id)
+            .join(User, User.id == UserCourse.user_id)
+            .order_by(Assessment.id)
+            .limit(self.batch_size)
+        )
+        return stmt if after is None else stmt.where(Assessment.id > after)
+
+    @staticmethod
+    def _reencrypt_assessment(row: Any, cipher: Any) -> dict[str, Any] | None:
+        from crypto.payload_codec import decode_payload
+        from parser.models import AssessmentReference
+        from services.grades.service import assessment_reference_digest
+
+        associated_data = assessment_associated_data(row.owner_id, row.academic_year, row.semester)
+        grade_blob, detail_blob = row.encrypted_grade, row.encrypted_assessment_detail
+        grade_plain, grade_stale = _open_for_rotation(cipher, grade_blob, associated_data, row.is_bound)
+        detail_plain, detail_stale = _open_for_rotation(cipher, detail_blob, associated_data, row.is_bound)
+        if not grade_stale and not detail_stale and row.is_bound:
+            return None
+        new_grade = cipher.encrypt_bytes(grade_plain, associated_data) if grade_stale else grade_blob
+        # Rows usually share one blob for both columns; keep them identical
+        if detail_blob == grade_blob:
+            new_detail = new_grade
+        else:
+            new_detail = cipher.encrypt_bytes(detail_plain, associated_data) if detail_stale else detail_blob
+        # Master-key digests change with the key, so recompute from the stored reference
+        reference = decode_payload(grade_plain).get("reference")
+        digest = assessment_reference_digest(
+            cipher, row.owner_id, AssessmentReference.model_validate(reference) if reference else None
+        )
+        return {
+            "b_id": row.id,
+            "b_old_grade": grade_blob,
+            "b_old_detail": detail_blob,
+            "b_grade": new_grade,
+            "b_detail": new_detail,
+            "b_iv": _iv(new_grade),
+            "b_digest": digest,
+        }
+
+    async def _write_assessments(self, session: Any, updates: list[dict[str, Any]]) -> None:
+        from sqlalchemy import bindparam, update
+        from database.models import Assessment
+
+        table = Assessment.__table__
+        await session.execute(
+            update(table)
+            .where(
+                table.c.id == bindparam("b_id"),
+                table.c.encrypted_grade == bindparam("b_old_grade"),
+                table.c.encrypted_assessment_detail == bindparam("b_old_detail"),
+            )
+            .values(
+                encrypted_grade=bindparam("b_grade"),
+                encrypted_assessment_detail=bindparam("b_detail"),
+                iv=bindparam("b_iv"),
+                reference_digest=bindparam("b_digest"),
+                is_bound=True,
+            ),
+            updates,
+        )
@@ -0,0 +1,145 @@
+"""Per-user data key issuance and incremental master-key rotation."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from crypto.envelope import EnvelopeKeyring
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_user_data_key(keyring: EnvelopeKeyring, session: Any, user_id: Any, wrapped: bytes | None) -> Any:
+    """
+    Return the cipher for ``user_id``'s data key, issuing one inside ``session`` if the user
+    has none yet. The conditional update means two racing writers end up sharing whichever
+    key was stored first instead of overwriting each other's.
+    """
+    if wrapped is not None:
+        return keyring.cipher_for(user_id, wrapped)
+
+    from sqlalchemy import select, update
+    from database.models import User
+
+    cipher, new_wrapped = keyring.new_data_key(user_id)
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.wrapped_data_key.is_(None))
+        .values(wrapped_data_key=new_wrapped, data_key_id=keyring.master_key_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        return cipher
+    stored = await session.scalar(select(User.wrapped_data_key).where(User.id == user_id))
+    return keyring.cipher_for(user_id, stored)
+
+
+@dataclass(frozen=True)
+class RewrapRunResult:
+    """Outcome of one pass of the data key re-wrap job."""
+    rewrapped: int = 0
+    failed: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+    skipped: bool = False
+
+
+class DataKeyRewrapService:
+    """
+    Move every wrapped data key onto the current master key, a batch at a time.
+
+    Users are walked in primary-key order (keyset pagination) and each batch commits on
+    its own, so the job only holds short row locks and can stop and resume at any point.
+    Payload rows are never read or written: their data keys do not change.
+    """
+
+    def __init__(
+        self,
+        session_factory: Any,
+        keyring: EnvelopeKeyring,
+        lock: Any | None = None,
+        batch_size: int = 500,
+    ) -> None:
+        self.session_factory = session_factory
+        self.keyring = keyring
+        self.lock = lock
+        self.batch_size = batch_size
+
+    async def run(self, max_batches: int | None = None) -> RewrapRunResult:
+        """Re-wrap keys still held under retired master keys; returns what was done."""
+        lock_key = "lock:key-rewrap"
+        if self.lock is not None and not await self.lock.acquire_lock(lock_key, ttl_seconds=600):
+            return RewrapRunResult(skipped=True)
+
+        started = time.perf_counter()
+        rewrapped = failed = batches = 0
+        try:
+            last_id = None
+            while max_batches is None or batches < max_batches:
+                rows = await self._next_batch(last_id)
+                if not rows:
+                    break
+                batches += 1
+                last_id = rows[-1][0]
+                done, errors = await self._rewrap_batch(rows)
+                rewrapped += done
+                failed += errors
+                # Let other tasks use the loop between batches
+                await asyncio.sleep(0)
+        finally:
+            if self.lock is not None:
+                await self.lock.release_lock(lock_key)
+
+        elapsed = time.perf_counter() - started
+        if rewrapped or failed:
+            logger.info(
+                f"Re-wrapped {rewrapped} data keys in {batches} batches ({elapsed:.1f}s, "
+                f"{rewrapped / elapsed if elapsed else 0:.0f} keys/s), {failed} failed"
+            )
+        return RewrapRunResult(rewrapped=rewrapped, failed=failed, batches=batches, elapsed_seconds=elapsed)
+
+    async def _next_batch(self, last_id: Any) -> list[tuple[Any, bytes]]:
+        from sqlalchemy import or_, select
+        from database.models import User
+
+        stmt = (
+            select(User.id, User.wrapped_data_key)
+            .where(
+                User.wrapped_data_key.is_not(None),
+                or_(User.data_key_id.is_(None), User.data_key_id != self.keyring.master_key_id),
+            )
+            .order_by(User.id)
+            .limit(self.batch_size)
+        )
+        if last_id is not None:
+            stmt = stmt.where(User.id > last_id)
+        async with self.session_factory() as session:
+            return [(row.id, row.wrapped_data_key) for row in await session.execute(stmt)]
+
+    async def _rewrap_batch(self, rows: list[tuple[Any, bytes]]) -> tuple[int, int]:
+        from sqlalchemy import update
+        from database.models import User
+
+        updates = []
+        failed = 0
+        for user_id, wrapped in rows:
+            try:
+                updates.append({
+                    "id": user_id,
+                    "wrapped_data_key": self.keyring.rewrap(user_id, wrapped),
+                    "data_key_id": self.keyring.master_key_id,
+                })
+            except ValueError as e:
+                # Typically a master key that was retired from settings too early
+                failed += 1
+                logger.error(f"Cannot re-wrap data key for user {user_id}: {e}")
+
+        if updates:
+            async with self.session_factory() as session:
+                await session.execute(update(User), updates)
+                await session.commit()
+        return len(updates), failed
@@ -1,5 +1,14 @@
 """Notification service package."""
 
+from .alerts import AdminAlertAggregator, schema_signature
+from .outbox import NotificationOutboxRelay, OutboxDrainResult, idempotency_key
 from .service import NotificationService
 
-__all__ = ["NotificationService"]
+__all__ = [
+    "AdminAlertAggregator",
+    "NotificationOutboxRelay",
+    "NotificationService",
+    "OutboxDrainResult",
+    "idempotency_key",
+    "schema_signature",
+]
@@ -0,0 +1,116 @@
+"""Deduplicated admin alerts."""
+
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def schema_signature(error: Exception) -> str:
+    """Structural key for a portal schema failure: page type and selector, never HTML or student data."""
+    diagnostic = getattr(error, "diagnostic", None)
+    if diagnostic is None:
+        return f"schema:{type(error).__name__}"
+    return f"schema:{diagnostic.page_type}|{diagnostic.detected_element}|{diagnostic.expected_selector}"
+
+
+@dataclass
+class _AlertWindow:
+    summary: str
+    closes_at: float
+    suppressed: int = 0
+
+
+class AdminAlertAggregator:
+    """
+    Alert admins once per problem, not once per affected user.
+
+    The first alert for a signature goes out immediately and opens a window of
+    ``window_seconds``. Repeats inside the window are only counted; when it closes,
+    one summary with the count is sent and a new window opens, so a failure that keeps
+    happening costs one message per window. A window that closes with no repeats is
+    dropped, and the next occurrence alerts immediately again.
+    """
+
+    def __init__(self, notifications: Any, window_seconds: float = 300.0) -> None:
+        self.notifications = notifications
+        self.window_seconds = window_seconds
+        self.sent = 0
+        self.suppressed = 0
+        self._windows: dict[str, _AlertWindow] = {}
+        self._task: asyncio.Task | None = None
+
+    async def alert(self, signature: str, text: str, summary: str | None = None) -> bool:
+        """Send ``text`` unless ``signature`` alerted this window; returns whether it was sent."""
+        window = self._windows.get(signature)
+        if window is not None:
+            window.suppressed += 1
+            self.suppressed += 1
+            return False
+        self._windows[signature] = _AlertWindow(summary or text, time.monotonic() + self.window_seconds)
+        self._ensure_flusher()
+        await self._send(text)
+        return True
+
+    async def schema_changed(self, error: Exception, context: str) -> bool:
+        """Alert on a ``PortalSchemaChangedError`` raised during ``context`` (e.g. "registration")."""
+        diagnostic = getattr(error, "diagnostic", None)
+        summary = f"Portal schema changed: {html.escape(str(error))}"
+        if diagnostic is not None:
+            summary += f"\n<b>Page:</b> {html.escape(diagnostic.page_type)} · <b>Expected:</b> {html.escape(diagnostic.expected_selector)}"
+        text = f"🚨 <b>PORTAL SCHEMA CHANGED</b> 🚨\n\nDetected during {context}.\n{summary}"
+        snippet = getattr(diagnostic, "html_snippet", None)
+        if snippet:
+            text += f"\n\n<b>HTML Snippet:</b>\n<pre><code class='language-html'>{html.escape(snippet)}</code></pre>"
+        return await self.alert(schema_signature(error), text, summary)
+
+    def stats(self) -> dict[str, Any]:
+        return {"sent": self.sent, "suppressed": self.suppressed, "open_windows": len(self._windows)}
+
+    async def close(self) -> None:
+        """Send the pending summaries now instead of at the end of their windows."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        windows, self._windows = self._windows, {}
+        for window in windows.values():
+            if window.suppressed:
+                await self._send(self._summary_text(window))
+
+    def _ensure_flusher(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_windows(), name="admin-alert-windows")
+
+    async def _flush_windows(self) -> None:
+        while self._windows:
+            now = time.monotonic()
+            for signature, window in list(self._windows.items()):
+                if window.closes_at > now:
+                    continue
+                if window.suppressed:
+                    text = self._summary_text(window)
+                    window.suppressed, window.closes_at = 0, now + self.window_seconds
+                    await self._send(text)
+                else:
+                    del self._windows[signature]
+            if self._windows:
+                # Windows all last the same time, so one opened later never closes sooner
+                await asyncio.sleep(max(0.0, min(w.closes_at for w in self._windows.values()) - time.monotonic()))
+
+    def _summary_text(self, window: _AlertWindow) -> str:
+        minutes = max(1, round(self.window_seconds / 60))
+        return f"🔁 <b>Repeated {window.suppressed} more time(s) in the last {minutes} min</b>\n\n{window.summary}"
+
+    async def _send(self, text: str) -> None:
+        self.sent += 1
+        try:
+            await self.notifications.send_admin(text)
+        except Exception as e:
+            logger.error(f"Admin alert could not be queued: {e}")
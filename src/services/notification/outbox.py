@@ -0,0 +1,173 @@
+"""Durable delivery of notifications staged in the outbox table."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
+
+from .service import DIGEST_SEPARATOR, group_for_digest
+
+logger = logging.getLogger(__name__)
+
+
+def idempotency_key(kind: str, *parts: Any) -> str:
+    """Stable outbox key for one logical message, e.g. ``("grade_released", chat, course)``."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"{kind}:{digest[:40]}"
+
+
+@dataclass(frozen=True)
+class OutboxDrainResult:
+    """Outcome of one relay pass over due outbox rows."""
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class NotificationOutboxRelay:
+    """
+    Deliver notifications that were committed with the change they announce.
+
+    Producers call ``stage`` inside their own unit of work, so a notification exists if
+    and only if its change was committed. The relay claims due rows in batches, leases
+    them, hands them to ``NotificationService.deliver`` (rows for one chat in a batch are
+    joined into one message) and records the outcome; failed sends are retried with
+    exponential backoff until ``max_attempts``, while messages to a chat that blocked the
+    bot fail at once. Delivery is at-least-once: a crash between a send and its
+    ``mark_sent`` resends that message once the lease expires.
+
+    The relay task runs only while rows are pending; ``wake`` after a commit (and once at
+    startup, for rows left by a previous process) starts it again. ``grades_changed`` is
+    the ``GradePersistenceService.on_change`` subscriber that does so for grade writes.
+    """
+
+    def __init__(
+        self,
+        session_factory: Any,
+        notifications: Any,
+        batch_size: int = 100,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 5.0,
+        retry_max_seconds: float = 3600.0,
+        lease_seconds: float = 300.0,
+        poll_interval_seconds: float = 30.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.notifications = notifications
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+    async def stage(self, uow: Any, messages: Sequence[tuple[int, str, str]]) -> None:
+        """Add ``(telegram_id, text, idempotency_key)`` rows to ``uow``; they commit with it."""
+        await uow.notification_outbox.stage([
+            {"telegram_id": telegram_id, "body": text, "idempotency_key": key}
+            for telegram_id, text, key in messages
+        ])
+
+    def wake(self) -> None:
+        """Deliver newly committed rows now instead of at the next poll."""
+        if self._closed:
+            return
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="notification-outbox")
+
+    async def grades_changed(self, result: Any) -> None:
+        """Wake the relay for release notices staged with a committed grade change."""
+        if result.released:
+            self.wake()
+
+    async def drain_once(self, now: datetime | None = None) -> OutboxDrainResult:
+        """Claim one batch of due rows, deliver them concurrently and record the outcomes."""
+        from clients.telegram import RecipientUnreachableError
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        now = now or datetime.now(timezone.utc)
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            rows = await uow.notification_outbox.claim_due(now, self.batch_size, self.lease_seconds)
+            await uow.commit()
+        if not rows:
+            return OutboxDrainResult()
+
+        # Rows for the same chat in this batch go out as one message and share its outcome
+        by_chat: dict[int, list[Any]] = {}
+        for row in rows:
+            by_chat.setdefault(row.telegram_id, []).append(row)
+        messages = [
+            [chat_rows[index] for index in group]
+            for chat_rows in by_chat.values()
+            for group in group_for_digest([row.body for row in chat_rows])
+        ]
+        outcomes = await asyncio.gather(
+            *(
+                self.notifications.deliver(group[0].telegram_id, DIGEST_SEPARATOR.join(row.body for row in group))
+                for group in messages
+            ),
+            return_exceptions=True,
+        )
+        sent, retried, failed = [], 0, 0
+        async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+            for row, outcome in (
+                (row, outcome) for group, outcome in zip(messages, outcomes) for row in group
+            ):
+                if outcome is True:
+                    sent.append(row.id)
+                    continue
+                error = str(outcome) if isinstance(outcome, BaseException) else "send failed"
+                attempts = row.attempts + 1
+                if attempts >= self.max_attempts or isinstance(outcome, RecipientUnreachableError):
+                    await uow.notification_outbox.mark_failed(row.id, error)
+                    failed += 1
+                    logger.error(f"Outbox message to {row.telegram_id} abandoned after {attempts} attempts: {error}")
+                else:
+                    delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+                    await uow.notification_outbox.mark_retry(row.id, now + timedelta(seconds=delay), error)
+                    retried += 1
+            await uow.notification_outbox.mark_sent(sent, datetime.now(timezone.utc))
+            await uow.commit()
+        return OutboxDrainResult(claimed=len(rows), sent=len(sent), retried=retried, failed=failed)
+
+    async def close(self) -> None:
+        """Stop the relay task; rows still pending stay in the table for the next start."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+        while not self._closed:
+            self._wake.clear()
+            try:
+                if (await self.drain_once()).claimed >= self.batch_size:
+                    continue
+                async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
+                    next_due = await uow.notification_outbox.next_due_at()
+            except Exception as e:
+                logger.error(f"Outbox relay pass failed: {e}", exc_info=True)
+                next_due = datetime.now(timezone.utc) + timedelta(seconds=self.poll_interval_seconds)
+            if next_due is None and not self._wake.is_set():
+                return
+            timeout = self.poll_interval_seconds
+            if next_due is not None:
+                if next_due.tzinfo is None:
+                    next_due = next_due.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+                timeout = min(timeout, max(0.0, (next_due - datetime.now(timezone.utc)).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -2,60 +2,598 @@
 
 from __future__ import annotations
 
-from typing import Any
 import asyncio
+import heapq
+import itertools
+import logging
 import time
-from collections import deque
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, tzinfo
+from typing import Any, Awaitable, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = "\n\n〰️〰️〰️\n\n"
+
+
+def group_for_digest(texts: Sequence[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[list[int]]:
+    """Split ``texts`` into runs, in order, that fit one message once joined with ``DIGEST_SEPARATOR``."""
+    groups: list[list[int]] = []
+    size = 0
+    for index, text in enumerate(texts):
+        if groups and size + len(DIGEST_SEPARATOR) + len(text) <= limit:
+            groups[-1].append(index)
+            size += len(DIGEST_SEPARATOR) + len(text)
+        else:
+            groups.append([index])
+            size = len(text)
+    return groups
+
+
+def quiet_hours_delay(now: datetime, quiet_hours: tuple[int, int]) -> float:
+    """Seconds from ``now`` until quiet hours end, or 0 outside them; ``(22, 7)`` spans midnight."""
+    start, end = quiet_hours
+    if start == end:
+        return 0.0
+    inside = start <= now.hour < end if start < end else (now.hour >= start or now.hour < end)
+    if not inside:
+        return 0.0
+    resume = now.replace(hour=end, minute=0, second=0, microsecond=0)
+    if resume <= now:
+        resume += timedelta(days=1)
+    return (resume - now).total_seconds()
+
+
+@dataclass
+class _ChatState:
+    waiters: deque[asyncio.Future] = field(default_factory=deque)
+    sent: deque[float] = field(default_factory=deque)
+    scheduled: bool = False
+
 
 class RateLimiter:
-    def __init__(self, global_limit: int = 30, user_limit: int = 1):
+    """
+    Sliding-window limiter: at most ``global_limit`` grants per ``period`` overall and
+    ``user_limit`` per chat.
+
+    Nothing polls. Each chat's waiters queue FIFO and only the head of each queue sits in
+    a min-heap keyed by the time that chat may next send; a single pump task sleeps
+    exactly until the earliest head is eligible under both windows and grants it. Ties go
+    to whoever queued first. A chat's state is dropped once it has nothing queued and its
+    window has passed, so memory follows active chats, not every chat ever messaged.
+
+    ``global_limit`` may be changed while waiters are queued, and ``pause`` holds every
+    grant back, e.g. for the ``retry_after`` of a Telegram 429.
+    """
+
+    def __init__(self, global_limit: int = 30, user_limit: int = 1, period: float = 1.0):
+        self._wake = asyncio.Event()
+        self._global_limit = global_limit
+        self._paused_until = 0.0
+        self.user_limit = user_limit
+        self.period = period
+        self._sent: deque[float] = deque()
+        self._chats: dict[int, _ChatState] = {}
+        self._idle: OrderedDict[int, float] = OrderedDict()
+        # (eligible_at, arrival, chat or None, future for chat-less waiters)
+        self._heap: list[tuple[float, int, int | None, asyncio.Future | None]] = []
+        self._arrivals = itertools.count()
+        self._pump: asyncio.Task | None = None
+
+    @property
+    def global_limit(self) -> int:
+        return self._global_limit
+
+    @global_limit.setter
+    def global_limit(self, value: int) -> None:
+        self._global_limit = value
+        self._wake.set()
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Grant nothing for ``seconds``; overlapping pauses end at the latest deadline."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        return sum(len(state.waiters) for state in self._chats.values()) + sum(
+            1 for entry in self._heap if entry[2] is None
+        )
+
+    @property
+    def tracked_chats(self) -> int:
+        return len(self._chats)
+
+    async def acquire(self, user_id: int | None = None) -> float:
+        """Wait for a send slot and return its ``time.monotonic()`` grant time.
+
+        Cancelling the caller gives its place up.
+        """
+        now = time.monotonic()
+        self._evict_idle(now)
+        future = asyncio.get_running_loop().create_future()
+        if user_id is None:
+            self._push(now, None, future)
+        else:
+            state = self._chats.get(user_id)
+            if state is None:
+                state = self._chats[user_id] = _ChatState()
+            self._idle.pop(user_id, None)
+            state.waiters.append(future)
+            if not state.scheduled:
+                state.scheduled = True
+                self._push(self._ready_at(state.sent, self.user_limit, now), user_id, None)
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run(), name="notification-rate-limiter")
+        return await future
+
+    def _push(self, eligible_at: float, user_id: int | None, future: asyncio.Future | None) -> None:
+        heapq.heappush(self._heap, (eligible_at, next(self._arrivals), user_id, future))
+        self._wake.set()
+
+    def _ready_at(self, sent: deque[float], limit: int, now: float) -> float:
+        while sent and sent[0] <= now - self.period:
+            sent.popleft()
+        return sent[0] + self.period if len(sent) >= limit else now
+
+    async def _run(self) -> None:
+        while self._heap:
+            now = time.monotonic()
+            eligible_at, _arrival, user_id, future = self._heap[0]
+            start = max(eligible_at, self._ready_at(self._sent, self._global_limit, now), self._paused_until)
+            if start > now:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=start - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            if user_id is None:
+                if not future.done():
+                    self._sent.append(now)
+                    future.set_result(now)
+                    # Let the granted sender run before the next grant, so sends follow the schedule
+                    await asyncio.sleep(0)
+                continue
+
+            state = self._chats[user_id]
+            while state.waiters and state.waiters[0].done():
+                state.waiters.popleft()  # cancelled while queued
+            granted = bool(state.waiters)
+            if granted:
+                self._sent.append(now)
+                state.sent.append(now)
+                state.waiters.popleft().set_result(now)
+            if state.waiters:
+                self._push(self._ready_at(state.sent, self.user_limit, now), user_id, None)
+            else:
+                state.scheduled = False
+                self._idle[user_id] = now
+            self._evict_idle(now)
+            if granted:
+                await asyncio.sleep(0)
+
+    def _evict_idle(self, now: float) -> None:
+        while self._idle:
+            user_id, since = next(iter(self._idle.items()))
+            if since > now - self.period:
+                return
+            self._idle.popitem(last=False)
+            state = self._chats.get(user_id)
+            if state is not None and not state.waiters and not state.scheduled:
+                del self._chats[user_id]
+
+
+class SharedRateLimiter:
+    """
+    ``RateLimiter``'s API over sliding windows kept in the shared cache, so every bot
+    instance pointed at the same Redis draws from one global and one per-chat budget.
+
+    Each grant is one atomic ``reserve_slots`` call that checks and records the global
+    window, the chat's window and any pause together. Waiters for one chat queue FIFO
+    behind a local lock, and one waiter per process reserves at a time while the global
+    window is full, so instances contend once per slot rather than once per message.
+    ``pause`` is shared too: a 429 seen by one instance holds back all of them.
+    ``global_limit`` stays per instance, so AIMD on one instance only lowers its own
+    share of the window.
+    """
+
+    def __init__(
+        self,
+        cache: Any,
+        global_limit: int = 30,
+        user_limit: int = 1,
+        period: float = 1.0,
+        namespace: str = "notify",
+    ) -> None:
+        self.cache = cache
         self.global_limit = global_limit
         self.user_limit = user_limit
-        self.global_timestamps: deque[float] = deque()
-        self.user_timestamps: dict[int, deque[float]] = {}
-        self.lock = asyncio.Lock()
+        self.period = period
+        # One hash tag keeps every key of a reservation in the same Redis Cluster slot
+        self._global_key = f"{{{namespace}}}:global"
+        self._chat_prefix = f"{{{namespace}}}:chat:"
+        self._hold_key = f"{{{namespace}}}:paused"
+        self._paused_until = 0.0
+        self._gate = asyncio.Lock()
+        # chat -> [lock, callers using it]
+        self._chats: dict[int, list[Any]] = {}
+        self._waiting = 0
+        self._holds: set[asyncio.Task] = set()
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Grant nothing for ``seconds`` here and, once the cache has it, on every instance."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        task = asyncio.create_task(self.cache.hold(self._hold_key, seconds))
+        self._holds.add(task)
+        task.add_done_callback(self._holds.discard)
+
+    @property
+    def pending(self) -> int:
+        return self._waiting
+
+    @property
+    def tracked_chats(self) -> int:
+        return len(self._chats)
+
+    async def acquire(self, user_id: int | None = None) -> float:
+        """Wait for a send slot and return its ``time.monotonic()`` grant time.
 
-    async def acquire(self, user_id: int | None = None) -> None:
+        Cancelling the caller gives its place up.
+        """
+        self._waiting += 1
+        try:
+            if user_id is None:
+                return await self._reserve(None)
+            entry = self._chats.setdefault(user_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    return await self._reserve(user_id)
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._chats[user_id]
+        finally:
+            self._waiting -= 1
+
+    async def _reserve(self, user_id: int | None) -> float:
         while True:
-            async with self.lock:
-                now = time.time()
-                
-                while self.global_timestamps and now - self.global_timestamps[0] >= 1.0:
-                    self.global_timestamps.popleft()
-                
-                if user_id is not None:
-                    if user_id not in self.user_timestamps:
-                        self.user_timestamps[user_id] = deque()
-                    while self.user_timestamps[user_id] and now - self.user_timestamps[user_id][0] >= 1.0:
-                        self.user_timestamps[user_id].popleft()
-
-                can_send = True
-                if len(self.global_timestamps) >= self.global_limit:
-                    can_send = False
-                
-                if user_id is not None and len(self.user_timestamps[user_id]) >= self.user_limit:
-                    can_send = False
-                
-                if can_send:
-                    self.global_timestamps.append(now)
-                    if user_id is not None:
-                        self.user_timestamps[user_id].append(now)
-                    return
-            
-            await asyncio.sleep(0.05)
+            async with self._gate:
+                while True:
+                    wait = self._paused_until - time.monotonic()
+                    if wait <= 0:
+                        windows = [(self._global_key, self.global_limit, self.period)]
+                        if user_id is not None:
+                            windows.append((f"{self._chat_prefix}{user_id}", self.user_limit, self.period))
+                        wait, blocker = await self.cache.reserve_slots(self._hold_key, windows)
+                        if wait <= 0:
+                            return time.monotonic()
+                        if blocker == 1:
+                            break  # only this chat is full; let other chats reserve meanwhile
+                    await asyncio.sleep(wait)
+            await asyncio.sleep(wait)
+
+
+@dataclass(frozen=True)
+class _Outbound:
+    telegram_id: int | None  # None for an admin alert
+    text: str
+    enqueued_at: float
+    outcome: asyncio.Future | None = None  # resolved with the delivery result for ``deliver``
+    attempts: int = 0
+
+
+@dataclass
+class _Digest:
+    texts: list[str]
+    first_at: float
+    due_at: float
 
 
 class NotificationService:
-    def __init__(self, sender: Any | None = None) -> None:
+    """
+    Queue outgoing messages and deliver them from a pool of send workers.
+
+    ``send_user`` and ``send_admin`` only enqueue, so a cron run or handler never waits
+    on Telegram. Each worker takes the next message, waits for a ``RateLimiter`` slot
+    and sends it, so up to ``workers`` sends are in flight at once while grants still
+    follow the global and per-chat limits. Messages for one chat are granted in the
+    order they were queued. When ``max_queue`` messages are waiting, producers block
+    until a worker frees a place. ``close`` drains the queue before stopping the workers.
+
+    A Telegram 429 pauses the shared limiter for its ``retry_after`` and the message
+    goes back through the limiter. The global rate is adapted AIMD-style between
+    ``min_global_limit`` and ``max_global_limit``: halved on a 429, raised by one after
+    each full window of sends without one. Other failures are re-queued up to
+    ``max_attempts``. Chats that blocked the bot are reported to ``on_unreachable`` once
+    and skipped afterwards until ``mark_reachable``.
+
+    With ``digest_window_seconds`` set, ``send_user`` holds a chat's background notices
+    (cron release updates) for that long after the first one and queues them as a
+    single message. During ``quiet_hours`` (local ``(start, end)`` hours in ``timezone``)
+    they are held until the quiet hours end. Notices the user triggered themselves
+    (``background=False``), ``deliver`` and admin alerts are never held.
+
+    Pass a ``SharedRateLimiter`` as ``limiter`` when several instances send for the
+    same bot, so the limits hold across all of them.
+    """
+
+    def __init__(
+        self,
+        sender: Any | None = None,
+        workers: int = 8,
+        max_queue: int = 10000,
+        global_limit: int = 30,
+        user_limit: int = 1,
+        period: float = 1.0,
+        min_global_limit: int | None = None,
+        max_global_limit: int | None = None,
+        max_attempts: int = 3,
+        on_unreachable: Callable[[int], Awaitable[None]] | None = None,
+        digest_window_seconds: float = 0.0,
+        quiet_hours: tuple[int, int] | None = None,
+        timezone: tzinfo | None = None,
+        limiter: Any | None = None,
+    ) -> None:
         self.sender = sender
-        self.limiter = RateLimiter(global_limit=30, user_limit=1)
+        self.workers = workers
+        self.limiter = limiter or RateLimiter(global_limit=global_limit, user_limit=user_limit, period=period)
+        self.min_global_limit = min_global_limit or global_limit
+        self.max_global_limit = max_global_limit or global_limit
+        self.max_attempts = max_attempts
+        self.on_unreachable = on_unreachable
+        self.digest_window_seconds = digest_window_seconds
+        self.quiet_hours = quiet_hours
+        self.timezone = timezone
+        self.digested = 0
+        self.sent = 0
+        self.failed = 0
+        self.requeued = 0
+        self.flood_waits = 0
+        self.skipped_unreachable = 0
+        self._clean_sends = 0
+        self._unreachable: set[int] = set()
+        self._queue: asyncio.Queue[_Outbound] = asyncio.Queue(maxsize=max_queue)
+        self._latencies: deque[float] = deque(maxlen=1000)
+        self._tasks: list[asyncio.Task] = []
+        self._closed = False
+        self._digests: dict[int, _Digest] = {}
+        self._digest_task: asyncio.Task | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
 
-    async def send_user(self, telegram_id: int, text: str) -> None:
-        if self.sender is not None:
-            await self.limiter.acquire(user_id=telegram_id)
-            await self.sender.send_message(telegram_id, text)
+    async def send_user(self, telegram_id: int, text: str, background: bool = True) -> None:
+        """Queue a notice; pass ``background=False`` for one answering the user's own action."""
+        if self.sender is None:
+            return
+        hold = self._hold_seconds() if background else 0.0
+        if hold <= 0 or self._closed:
+            await self._enqueue(_Outbound(telegram_id, text, time.monotonic()))
+            return
+        digest = self._digests.get(telegram_id)
+        if digest is not None:
+            digest.texts.append(text)
+            return
+        now = time.monotonic()
+        self._digests[telegram_id] = _Digest([text], now, now + hold)
+        if self._digest_task is None or self._digest_task.done():
+            self._digest_task = asyncio.create_task(self._release_digests(), name="notification-digests")
 
     async def send_admin(self, text: str) -> None:
-        if self.sender is not None:
-            await self.limiter.acquire(user_id=None)
-            await self.sender.send_admin_alert(text)
+        """Queue ``text`` once per admin, so every admin send takes its own limiter slot."""
+        from clients.telegram import ADMIN_ALERT_PREFIX
+
+        if self.sender is None:
+            return
+        admin_ids = getattr(self.sender, "admin_telegram_ids", None)
+        if admin_ids is None:
+            # A sender that does not list its admins sends the alert as one message
+            await self._enqueue(_Outbound(None, text, time.monotonic()))
+            return
+        for admin_id in admin_ids:
+            await self._enqueue(_Outbound(admin_id, f"{ADMIN_ALERT_PREFIX}{text}", time.monotonic()))
+
+    async def deliver(self, telegram_id: int, text: str) -> bool:
+        """Queue a message like ``send_user`` but wait for it; ``True`` once the sender accepted it.
+
+        Raises ``RecipientUnreachableError`` when the chat blocked the bot, since retrying
+        cannot succeed.
+        """
+        if self.sender is None:
+            return False
+        outcome = asyncio.get_running_loop().create_future()
+        await self._enqueue(_Outbound(telegram_id, text, time.monotonic(), outcome))
+        return await outcome
+
+    def mark_reachable(self, telegram_id: int) -> None:
+        """The user talked to the bot again, so messages to them can be sent."""
+        self._unreachable.discard(telegram_id)
+
+    async def drain(self) -> None:
+        """Wait until every message queued so far has been sent or has failed."""
+        await self._queue.join()
+
+    async def close(self, timeout: float | None = None) -> int:
+        """Drain the queue for up to ``timeout`` seconds, then stop the workers.
+
+        Held digests are queued first, even during quiet hours, rather than lost.
+        Returns how many queued messages were abandoned.
+        """
+        self._closed = True
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+            await asyncio.gather(self._digest_task, return_exceptions=True)
+            self._digest_task = None
+        await self._queue_digests(list(self._digests))
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        abandoned = self._queue.qsize()
+        if abandoned:
+            logger.warning(f"Notification queue closed with {abandoned} messages unsent")
+        return abandoned
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth, delivery counts, rate control and queued-to-sent latency for ``/metrics``."""
+        latencies = sorted(self._latencies)
+
+        def percentile(q: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else 0.0
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "workers": len(self._tasks),
+            "awaiting_rate_limit": self.limiter.pending,
+            "global_rate_limit": self.limiter.global_limit,
+            "paused_seconds": round(self.limiter.paused_for, 1),
+            "sent": self.sent,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "flood_waits": self.flood_waits,
+            "skipped_unreachable": self.skipped_unreachable,
+            "digest_held_chats": len(self._digests),
+            "digested": self.digested,
+            "latency_p50_seconds": percentile(0.5),
+            "latency_p95_seconds": percentile(0.95),
+        }
+
+    def _hold_seconds(self) -> float:
+        hold = self.digest_window_seconds
+        if self.quiet_hours is not None:
+            hold = max(hold, quiet_hours_delay(datetime.now(self.timezone), self.quiet_hours))
+        return hold
+
+    async def _release_digests(self) -> None:
+        while self._digests:
+            now = time.monotonic()
+            due = [chat for chat, digest in self._digests.items() if digest.due_at <= now]
+            if due:
+                await self._queue_digests(due)
+                continue
+            # Holds only grow over time, so a digest opened later is never due sooner
+            await asyncio.sleep(min(digest.due_at for digest in self._digests.values()) - now)
+
+    async def _queue_digests(self, chats: list[int]) -> None:
+        for chat in chats:
+            digest = self._digests.pop(chat)
+            groups = group_for_digest(digest.texts)
+            self.digested += len(digest.texts) - len(groups)
+            for group in groups:
+                text = DIGEST_SEPARATOR.join(digest.texts[index] for index in group)
+                await self._enqueue(_Outbound(chat, text, digest.first_at))
+
+    async def _enqueue(self, message: _Outbound) -> None:
+        if message.telegram_id in self._unreachable:
+            self._skip_unreachable(message)
+            return
+        if self._closed:
+            # Shutting down: deliver inline rather than into a queue nobody drains
+            await self._deliver(message)
+            return
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._work(), name=f"notification-worker-{n}") for n in range(self.workers)
+            ]
+        await self._queue.put(message)
+
+    async def _work(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._deliver(message)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: _Outbound) -> None:
+        from clients.telegram import NotificationFloodControlError, RecipientUnreachableError
+
+        while True:
+            message = replace(message, attempts=message.attempts + 1)
+            try:
+                await self.limiter.acquire(user_id=message.telegram_id)
+                if message.telegram_id is None:
+                    await self.sender.send_admin_alert(message.text)
+                else:
+                    await self.sender.send_message(message.telegram_id, message.text)
+            except NotificationFloodControlError as e:
+                self._back_off(e.retry_after)
+                if message.attempts < self.max_attempts:
+                    continue  # back through the limiter, which is now paused
+                self._fail(message, e)
+            except RecipientUnreachableError as e:
+                await self._mark_unreachable(message, e)
+            except Exception as e:
+                if message.outcome is None and message.attempts < self.max_attempts and not self._closed:
+                    try:
+                        self._queue.put_nowait(message)
+                        self.requeued += 1
+                        return
+                    except asyncio.QueueFull:
+                        pass
+                self._fail(message, e)
+            else:
+                self._succeed(message)
+            return
+
+    def _succeed(self, message: _Outbound) -> None:
+        self.sent += 1
+        self._latencies.append(time.monotonic() - message.enqueued_at)
+        self._clean_sends += 1
+        if self._clean_sends >= self.limiter.global_limit and self.limiter.global_limit < self.max_global_limit:
+            self.limiter.global_limit += 1
+            self._clean_sends = 0
+        if message.outcome is not None and not message.outcome.done():
+            message.outcome.set_result(True)
+
+    def _fail(self, message: _Outbound, error: Exception) -> None:
+        self.failed += 1
+        logger.error(f"Notification to {message.telegram_id or 'admins'} failed: {error}")
+        if message.outcome is not None and not message.outcome.done():
+            message.outcome.set_result(False)
+
+    def _back_off(self, retry_after: float) -> None:
+        self.flood_waits += 1
+        self._clean_sends = 0
+        self.limiter.pause(retry_after)
+        lowered = max(self.min_global_limit, self.limiter.global_limit // 2)
+        if lowered != self.limiter.global_limit:
+            logger.warning(f"Telegram flood control: pausing {retry_after}s, global rate {self.limiter.global_limit} -> {lowered}/s")
+            self.limiter.global_limit = lowered
+
+    async def _mark_unreachable(self, message: _Outbound, error: Exception) -> None:
+        self._unreachable.add(message.telegram_id)
+        self._skip_unreachable(message, error)
+        if self.on_unreachable is not None:
+            try:
+                await self.on_unreachable(message.telegram_id)
+            except Exception as e:
+                logger.error(f"Could not flag {message.telegram_id} as unreachable: {e}")
+
+    def _skip_unreachable(self, message: _Outbound, error: Exception | None = None) -> None:
+        from clients.telegram import RecipientUnreachableError
+
+        self.skipped_unreachable += 1
+        if message.outcome is not None and not message.outcome.done():
+            message.outcome.set_exception(error or RecipientUnreachableError(f"{message.telegram_id} blocked the bot"))
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Sequence
 from typing import Protocol, runtime_checkable
 
 
@@ -17,6 +17,25 @@ class CachePort(Protocol):
     async def delete(self, key: str) -> None:
         ...
 
+    async def consume_tokens(self, buckets: Sequence[tuple[str, float, float]], cost: float = 1.0) -> float:
+        """
+        Atomically take ``cost`` tokens from every ``(key, capacity, refill_per_second)`` bucket.
+        Returns 0.0 when taken, otherwise the seconds until all buckets can pay (nothing is taken).
+        """
+        ...
+
+    async def reserve_slots(self, hold_key: str, windows: Sequence[tuple[str, int, float]]) -> tuple[float, int]:
+        """
+        Atomically record a grant in every ``(key, limit, period_seconds)`` sliding window.
+        Returns ``(0.0, -1)`` when granted, otherwise ``(seconds to wait, blocking window index)``
+        with nothing recorded; index -1 means ``hold_key`` is holding every grant back.
+        """
+        ...
+
+    async def hold(self, key: str, seconds: float) -> None:
+        """Make ``reserve_slots`` with this ``hold_key`` wait for at least ``seconds``."""
+        ...
+
 
 @runtime_checkable
 class DistributedLockPort(Protocol):
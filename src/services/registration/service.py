@@ -8,10 +8,12 @@ from dataclasses import dataclass
 from typing import Protocol, Any
 
 from clients.aau_portal import PortalAuthenticationError
-from crypto.cipher import AesGcmCipher, Ciphertext
+from crypto.cipher import AesGcmCipher
+from crypto.binding import credential_associated_data
 from dto.bot import RegistrationRequest, RegistrationResult
 from utils.validation import normalize_aau_undergraduate_id
 from parser.models import ProfilePageResult, GradeReport
+from services.grade_persistence.service import GradePersistenceService
 
 
 class UserWriter(Protocol):
@@ -45,6 +47,9 @@ class RegistrationService:
         audit_repository: AuditWriter | None = None,
         cache: Any | None = None,
         session_factory: Any | None = None,
+        keyring: Any | None = None,
+        persistence: GradePersistenceService | None = None,
+        audit: Any | None = None,
     ) -> None:
         self.portal_client = portal_client
         self.cipher = cipher
@@ -53,6 +58,9 @@ class RegistrationService:
         self.audit_repository = audit_repository
         self.cache = cache
         self.session_factory = session_factory
+        self.keyring = keyring
+        self.persistence = persistence or GradePersistenceService()
+        self.audit = audit
 
     async def register(self, request: RegistrationRequest) -> RegistrationOutcome:
         """
@@ -80,9 +88,9 @@ class RegistrationService:
             except PortalAuthenticationError:
                 raise
 
-            encrypted_token = self.cipher.encrypt(request.password)
-            payload = Ciphertext.from_token(encrypted_token)
-            nonce_token = base64.urlsafe_b64encode(payload.nonce).decode("ascii")
+            sealed_password = self.cipher.seal(request.password)
+            encrypted_token = sealed_password.to_token()
+            nonce_token = base64.urlsafe_b64encode(sealed_password.nonce).decode("ascii")
 
             if self.user_repository is not None:
                 await self.user_repository.add(
@@ -116,7 +124,7 @@ class RegistrationService:
             if self.session_factory is not None:
                 try:
                     from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
-                    from database.models import User, UserCredential, AuditLog, SectionSource, Department, Course, UserCourse, Assessment
+                    from database.models import User, UserCredential, AuditLog, SectionSource, Department
 
                     async with SqlAlchemyRepositoryUnitOfWork(self.session_factory) as uow:
                         db_user = await uow.users.get_by_telegram_id(request.telegram_id)
@@ -152,6 +160,16 @@ class RegistrationService:
                             db_user.section = profile.profile.section
                             db_user.section_source = SectionSource.SCRAPED
 
+                        # Everything below is (re)sealed, so this is where a user gets a data key
+                        cipher = self.cipher
+                        if self.keyring is not None:
+                            from services.key_rotation.service import ensure_user_data_key
+                            cipher = await ensure_user_data_key(self.keyring, uow.session, db_user.id, db_user.wrapped_data_key)
+                        # Stored credentials are bound to their owner's row
+                        sealed_password = cipher.seal(request.password, credential_associated_data(db_user.id))
+                        encrypted_token = sealed_password.to_token()
+                        nonce_token = base64.urlsafe_b64encode(sealed_password.nonce).decode("ascii")
+
                         cred = await uow.credentials.get_by_user_id(db_user.id)
                         if cred is None:
                             cred = UserCredential(
@@ -164,120 +182,26 @@ class RegistrationService:
                         else:
                             cred.encrypted_password = encrypted_token
                             cred.iv = nonce_token
+                            cred.is_bound = True
 
-                        audit = AuditLog(
-                            telegram_id=request.telegram_id,
-                            action="register",
-                            details={"university_id": university_id},
-                        )
-                        uow.session.add(audit)
+                        if self.audit is None:
+                            audit = AuditLog(
+                                telegram_id=request.telegram_id,
+                                action="register",
+                                details={"university_id": university_id},
+                            )
+                            uow.session.add(audit)
                     
                         # Persist Grade Reports and Assessments to DB
+                        persisted = None
                         if _grade_report:
-                            from database.models import SemesterResult, Semester
-                            from sqlalchemy import delete, select
-                        
-                            def parse_semester(label: str) -> Semester:
-                                lab = label.lower()
-                                if "2" in lab or "two" in lab or "second" in lab or " ii" in lab:
-                                    return Semester.SECOND
-                                if "3" in lab or "three" in lab or "third" in lab or "iii" in lab:
-                                    return Semester.THIRD
-                                return Semester.FIRST
-
-                            # Clear old grades to avoid duplicates/conflicts on re-registration
-                            await uow.session.execute(delete(SemesterResult).where(SemesterResult.user_id == db_user.id))
-
-                            for rep in _grade_report:
-                                sem = parse_semester(rep.semester_label)
-                            
-                                # Serialize GradeReport to JSON
-                                rep_dict = rep.model_dump()
-                                rep_json = json.dumps(rep_dict)
-                                enc_rep = self.cipher.encrypt(rep_json)
-                                rep_payload = Ciphertext.from_token(enc_rep)
-                                rep_iv = base64.urlsafe_b64encode(rep_payload.nonce).decode("ascii")
-
-                                sr = SemesterResult(
-                                    user_id=db_user.id,
-                                    academic_year=rep.academic_year,
-                                    semester=sem,
-                                    encrypted_result_detail=enc_rep,
-                                    iv=rep_iv,
-                                )
-                                uow.session.add(sr)
-                            
-                                # Save Courses, UserCourses, and Assessments
-                                for cg in rep.course_grades:
-                                    # Ensure Course exists
-                                    course_db = await uow.courses.get_by_id(cg.course_code)
-                                    if not course_db:
-                                        course_db = Course(
-                                            course_id=cg.course_code,
-                                            course_name=cg.course_name,
-                                            credit_hours=int(cg.credit_hours) if cg.credit_hours else 0,
-                                            ects=int(cg.ects) if cg.ects else 0,
-                                        )
-                                        await uow.courses.add(course_db)
-                                        await uow.session.flush()
-                                        
-                                    if dept_id:
-                                        from database.models import DepartmentCourse
-                                        dc_stmt = select(DepartmentCourse).where(
-                                            DepartmentCourse.department_id == dept_id,
-                                            DepartmentCourse.course_id == course_db.course_id
-                                        )
-                                        dc_db = await uow.session.scalar(dc_stmt)
-                                        if not dc_db:
-                                            dc_db = DepartmentCourse(
-                                                department_id=dept_id,
-                                                course_id=course_db.course_id
-                                            )
-                                            uow.session.add(dc_db)
-
-                                    # Create or update UserCourse
-                                    uc_stmt = select(UserCourse).where(
-                                        UserCourse.user_id == db_user.id,
-                                        UserCourse.course_id == course_db.course_id,
-                                        UserCourse.academic_year == rep.academic_year,
-                                        UserCourse.semester == sem
-                                    )
-                                    uc_db = await uow.session.scalar(uc_stmt)
-                                    if not uc_db:
-                                        uc_db = UserCourse(
-                                            user_id=db_user.id,
-                                            course_id=course_db.course_id,
-                                            academic_year=rep.academic_year,
-                                            semester=sem
-                                        )
-                                        uow.session.add(uc_db)
-                                        await uow.session.flush()
-
-                                    # Save Assessment reference
-                                    asm_dict = {
-                                        "reference": cg.assessment.model_dump() if cg.assessment else None,
-                                        "grade": cg.grade
-                                    }
-                                    enc_asm = self.cipher.encrypt(json.dumps(asm_dict))
-                                    asm_payload = Ciphertext.from_token(enc_asm)
-                                    asm_iv = base64.urlsafe_b64encode(asm_payload.nonce).decode("ascii")
-
-                                    asm_stmt = select(Assessment).where(Assessment.user_course_id == uc_db.id)
-                                    asm_db = await uow.session.scalar(asm_stmt)
-                                    if not asm_db:
-                                        asm_db = Assessment(
-                                            user_course_id=uc_db.id,
-                                            encrypted_assessment_detail=enc_asm,
-                                            encrypted_grade=enc_asm,
-                                            iv=asm_iv
-                                        )
-                                        uow.session.add(asm_db)
-                                    else:
-                                        asm_db.encrypted_assessment_detail = enc_asm
-                                        asm_db.encrypted_grade = enc_asm
-                                        asm_db.iv = asm_iv
+                            persisted = await self.persistence.persist(uow, db_user.id, _grade_report, cipher, dept_id)
 
                         await uow.commit()
+                    if self.audit is not None:
+                        self.audit.record(request.telegram_id, "register", {"university_id": university_id})
+                    if persisted is not None:
+                        await self.persistence.publish(persisted)
                 except Exception:
                     raise
 
@@ -0,0 +1,5 @@
+"""Audit and cron history retention package."""
+
+from .service import RetentionRunResult, RetentionService
+
+__all__ = ["RetentionRunResult", "RetentionService"]
@@ -0,0 +1,286 @@
+"""Retention for the audit trail and cron history."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_NAME = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of ``moment``'s month in UTC."""
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(start: datetime, months: int) -> datetime:
+    index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+
+@dataclass(frozen=True)
+class RetentionRunResult:
+    """Outcome of one retention pass."""
+    partitions_created: int = 0
+    partitions_dropped: int = 0
+    audit_rows_deleted: int = 0
+    audit_rows_archived: int = 0
+    cohort_scans_deleted: int = 0
+    cron_runs_deleted: int = 0
+    outbox_rows_deleted: int = 0
+    skipped: bool = False
+
+
+class RetentionService:
+    """
+    Keep ``audit_logs``, ``cron_runs`` and ``cohort_scans`` bounded.
+
+    On PostgreSQL ``audit_logs`` is range-partitioned by month: each run creates the
+    partitions for the coming months and detaches and drops whole partitions older than
+    ``audit_retention_months``, so expiry never leaves dead tuples behind. Elsewhere (or
+    before the partitioning migration) expired rows are deleted in batches instead. With
+    ``archive_dir`` set, expired rows are appended to ``audit_logs_YYYY_MM.jsonl.gz``
+    before they are removed; a run interrupted between the two may archive a row twice.
+
+    Cron history has foreign keys pointing at it, so it is not partitioned: scans and
+    runs older than ``cron_history_days`` are deleted in batches, and runs still
+    referenced by a cohort state are kept. Delivered or abandoned notification outbox
+    rows expire on the same schedule; pending ones are never removed.
+    """
+
+    def __init__(
+        self,
+        session_factory: Any,
+        lock: Any | None = None,
+        audit_retention_months: int = 12,
+        cron_history_days: int = 90,
+        batch_size: int = 1000,
+        archive_dir: str | None = None,
+        months_ahead: int = 2,
+    ) -> None:
+        self.session_factory = session_factory
+        self.lock = lock
+        self.audit_retention_months = audit_retention_months
+        self.cron_history_days = cron_history_days
+        self.batch_size = batch_size
+        self.archive_dir = archive_dir
+        self.months_ahead = months_ahead
+
+    async def run(self, now: datetime | None = None) -> RetentionRunResult:
+        """Create upcoming partitions and expire old audit and cron rows."""
+        lock_key = "lock:retention"
+        if self.lock is not None and not await self.lock.acquire_lock(lock_key, ttl_seconds=900):
+            return RetentionRunResult(skipped=True)
+
+        now = now or datetime.now(timezone.utc)
+        audit_cutoff = add_months(month_start(now), -self.audit_retention_months)
+        created = dropped = deleted = archived = 0
+        try:
+            if await self._audit_is_partitioned():
+                created = await self._create_partitions(now)
+                dropped, archived = await self._drop_partitions(audit_cutoff)
+            else:
+                deleted, archived = await self._delete_audit_rows(audit_cutoff)
+            scans, runs = await self._delete_cron_history(now - timedelta(days=self.cron_history_days))
+            outbox = await self._delete_outbox_rows(now - timedelta(days=self.cron_history_days))
+        finally:
+            if self.lock is not None:
+                await self.lock.release_lock(lock_key)
+
+        result = RetentionRunResult(
+            partitions_created=created,
+            partitions_dropped=dropped,
+            audit_rows_deleted=deleted,
+            audit_rows_archived=archived,
+            cohort_scans_deleted=scans,
+            cron_runs_deleted=runs,
+            outbox_rows_deleted=outbox,
+        )
+        if created or dropped or deleted or scans or runs or outbox:
+            logger.info(f"Retention pass finished: {result}")
+        return result
+
+    async def _audit_is_partitioned(self) -> bool:
+        from sqlalchemy import text
+
+        async with self.session_factory() as session:
+            if session.get_bind().dialect.name != "postgresql":
+                return False
+            relkind = await session.scalar(
+                text("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')")
+            )
+            return relkind == "p"
+
+    async def _create_partitions(self, now: datetime) -> int:
+        from sqlalchemy import text
+
+        created = 0
+        current = month_start(now)
+        for offset in range(self.months_ahead + 1):
+            start, end = add_months(current, offset), add_months(current, offset + 1)
+            name = f"audit_logs_{start:%Y_%m}"
+            async with self.session_factory() as session:
+                if await session.scalar(text(f"SELECT to_regclass('{name}')")) is not None:
+                    continue
+                await session.execute(text(f"CREATE TABLE {name} (LIKE audit_logs INCLUDING DEFAULTS)"))
+                if await session.scalar(text("SELECT to_regclass('audit_logs_default')")) is not None:
+                    # Rows that landed in the default partition before this month existed move with it
+                    await session.execute(
+                        text(
+                            f'WITH moved AS (DELETE FROM audit_logs_default WHERE "timestamp" >= :start '
+                            f'AND "timestamp" < :end RETURNING *) INSERT INTO {name} SELECT * FROM moved'
+                        ),
+                        {"start": start, "end": end},
+                    )
+                await session.execute(text(
+                    f"ALTER TABLE audit_logs ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                await session.commit()
+            created += 1
+        return created
+
+    async def _drop_partitions(self, cutoff: datetime) -> tuple[int, int]:
+        from sqlalchemy import text
+
+        async with self.session_factory() as session:
+            names = list(await session.scalars(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'audit_logs'::regclass"
+            )))
+        expired = []
+        for name in names:
+            match = _PARTITION_NAME.match(name)
+            if match is None:
+                continue
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            if add_months(start, 1) <= cutoff:
+                expired.append(name)
+
+        archived = 0
+        for name in sorted(expired):
+            if self.archive_dir is not None:
+                archived += await self._archive_table(name)
+            async with self.session_factory() as session:
+                await session.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+                await session.execute(text(f"DROP TABLE {name}"))
+                await session.commit()
+            logger.info(f"Dropped expired audit partition {name}")
+        return len(expired), archived
+
+    async def _archive_table(self, name: str) -> int:
+        from sqlalchemy import text
+
+        archived = 0
+        last = None
+        while True:
+            query = f'SELECT id, telegram_id, action, details, "timestamp" FROM {name}'
+            params = {"limit": self.batch_size}
+            if last is not None:
+                query += ' WHERE ("timestamp", id) > (:ts, :id)'
+                params.update(ts=last[0], id=last[1])
+            async with self.session_factory() as session:
+                rows = (await session.execute(text(f'{query} ORDER BY "timestamp", id LIMIT :limit'), params)).all()
+            if not rows:
+                return archived
+            await self._archive(rows)
+            archived += len(rows)
+            last = (rows[-1].timestamp, rows[-1].id)
+
+    async def _delete_audit_rows(self, cutoff: datetime) -> tuple[int, int]:
+        from sqlalchemy import delete, select
+        from database.models import AuditLog
+
+        deleted = archived = 0
+        while True:
+            async with self.session_factory() as session:
+                rows = (await session.execute(
+                    select(AuditLog.id, AuditLog.telegram_id, AuditLog.action, AuditLog.details, AuditLog.timestamp)
+                    .where(AuditLog.timestamp < cutoff)
+                    .order_by(AuditLog.timestamp)
+                    .limit(self.batch_size)
+                )).all()
+                if not rows:
+                    return deleted, archived
+                if self.archive_dir is not None:
+                    await self._archive(rows)
+                    archived += len(rows)
+                await session.execute(delete(AuditLog).where(AuditLog.id.in_([row.id for row in rows])))
+                await session.commit()
+            deleted += len(rows)
+            # Let other tasks use the loop between batches
+            await asyncio.sleep(0)
+
+    async def _delete_cron_history(self, cutoff: datetime) -> tuple[int, int]:
+        from sqlalchemy import exists, select
+        from database.models import CohortScan, CohortState, CronRun, CronRunStatus
+
+        scans = await self._delete_in_batches(
+            CohortScan, select(CohortScan.id).where(CohortScan.started_at < cutoff)
+        )
+        runs = await self._delete_in_batches(
+            CronRun,
+            select(CronRun.id).where(
+                CronRun.started_at < cutoff,
+                CronRun.status != CronRunStatus.RUNNING,
+                ~exists().where(CohortScan.run_id == CronRun.id),
+                ~exists().where(CohortState.last_run_id == CronRun.id),
+            ),
+        )
+        return scans, runs
+
+    async def _delete_outbox_rows(self, cutoff: datetime) -> int:
+        from sqlalchemy import select
+        from database.models import NotificationOutbox, OutboxStatus
+
+        return await self._delete_in_batches(
+            NotificationOutbox,
+            select(NotificationOutbox.id).where(
+                NotificationOutbox.status != OutboxStatus.PENDING,
+                NotificationOutbox.created_at < cutoff,
+            ),
+        )
+
+    async def _delete_in_batches(self, model: Any, ids: Any) -> int:
+        from sqlalchemy import delete
+
+        deleted = 0
+        while True:
+            async with self.session_factory() as session:
+                batch = list(await session.scalars(ids.limit(self.batch_size)))
+                if not batch:
+                    return deleted
+                await session.execute(delete(model).where(model.id.in_(batch)))
+                await session.commit()
+            deleted += len(batch)
+            await asyncio.sleep(0)
+
+    async def _archive(self, rows: list[Any]) -> None:
+        by_month: dict[str, list[str]] = defaultdict(list)
+        for row in rows:
+            stamp = row.timestamp if row.timestamp.tzinfo else row.timestamp.replace(tzinfo=timezone.utc)
+            by_month[f"{stamp.astimezone(timezone.utc):%Y_%m}"].append(json.dumps({
+                "id": str(row.id),
+                "telegram_id": row.telegram_id,
+                "action": row.action,
+                "details": row.details,
+                "timestamp": stamp.isoformat(),
+            }))
+        await asyncio.to_thread(self._append_archives, by_month)
+
+    def _append_archives(self, by_month: dict[str, list[str]]) -> None:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for month, lines in by_month.items():
+            # Appending adds a gzip member; gzip readers treat the members as one stream
+            with gzip.open(os.path.join(self.archive_dir, f"audit_logs_{month}.jsonl.gz"), "at", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
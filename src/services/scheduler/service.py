@@ -11,14 +11,17 @@ from database.models import (
     SystemSetting, SemesterResult, CronRunStatus, 
     CohortScanStatus, GradeChangeStatus, Semester
 )
-from crypto.cipher import Ciphertext
-from parser.models import GradeReport
+from crypto.binding import credential_associated_data, decrypt_bound
 from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
 from services.account_lifecycle.service import AccountLifecycleService
+from services.grade_persistence.service import GradePersistenceService
 from sqlalchemy import select, and_, delete, func
 
 logger = logging.getLogger(__name__)
 
+def _release_message(subject: str) -> str:
+    return f"🎉 <b>Grade Released!</b>\n\nYour grade for <b>{subject}</b> has been released. Use /grades to check it."
+
 @dataclass(frozen=True)
 class SchedulerRunResult:
     """Result of a single scheduler execution run."""
@@ -37,38 +40,25 @@ class SchedulerService:
         portal_client: Any | None = None,
         session_factory: Any | None = None,
         cipher: Any | None = None,
+        refresh_limiter: Any | None = None,
+        keyring: Any | None = None,
+        persistence: GradePersistenceService | None = None,
+        outbox: Any | None = None,
+        alerts: Any | None = None,
     ) -> None:
         self.lock = lock
         self.notification_service = notification_service
         self.portal_client = portal_client
         self.session_factory = session_factory
         self.cipher = cipher
-
-    def _parse_semester(self, label: str) -> Semester:
-        lab = label.lower()
-        if "2" in lab or "two" in lab or "second" in lab or " ii" in lab:
-            return Semester.SECOND
-        if "3" in lab or "three" in lab or "third" in lab or "iii" in lab:
-            return Semester.THIRD
-        return Semester.FIRST
-
-    async def _detect_grade_diff(self, old_reports: list[GradeReport], new_reports: list[GradeReport]) -> tuple[list[str], set[str]]:
-        """Returns a list of course codes that have newly released grades, and a set of all currently graded courses."""
-        old_grades = {}
-        for rep in old_reports:
-            for cg in rep.course_grades:
-                if cg.grade and cg.grade.strip() and cg.grade.strip().upper() != "N/A":
-                    old_grades[cg.course_code] = cg.grade
-
-        new_released = []
-        all_graded = set()
-        for rep in new_reports:
-            for cg in rep.course_grades:
-                if cg.grade and cg.grade.strip() and cg.grade.strip().upper() != "N/A":
-                    all_graded.add(f"{cg.course_name} ({cg.course_code})")
-                    if cg.course_code not in old_grades:
-                        new_released.append(f"{cg.course_name} ({cg.course_code})")
-        return new_released, all_graded
+        self.refresh_limiter = refresh_limiter
+        self.keyring = keyring
+        # Staged release notices are woken for delivery by the persistence subscriber
+        self.persistence = persistence or GradePersistenceService(
+            on_change=outbox.grades_changed if outbox is not None else None
+        )
+        self.outbox = outbox
+        self.alerts = alerts
 
     async def _scrape_user_and_detect(self, uow: SqlAlchemyRepositoryUnitOfWork, user: User, current_year: str, current_semester: Semester) -> tuple[list[str], set[str]]:
         """Scrapes a user, updates DB, and returns a list of newly released subjects and all currently graded subjects."""
@@ -78,43 +68,44 @@ class SchedulerService:
         cred = await uow.credentials.get_by_user_id(user.id)
         if not cred:
             return [], set()
+        encrypted_password, password_bound = cred.encrypted_password, cred.is_bound
+        # End the read transaction so no pooled connection is held while this task waits
+        # for portal budget or on the portal; the write below opens a fresh one
+        await uow.commit()
+
+        # Scheduled scrapes share the global portal budget with manual refreshes
+        if self.refresh_limiter is not None and not await self.refresh_limiter.acquire_scheduled():
+            return [], set()
             
+        # Rows are sealed with the user's data key when they have one; issuing keys is left
+        # to the paths that re-seal the whole grade graph (registration, manual refresh).
+        cipher = self.cipher
+        if self.keyring is not None:
+            cipher = self.keyring.cipher_for(user.id, user.wrapped_data_key)
+
         try:
-            password = self.cipher.decrypt(cred.encrypted_password)
+            password = decrypt_bound(cipher, encrypted_password, credential_associated_data(user.id), password_bound)
             _profile, new_reports = await self.portal_client.scrape(user.university_id, password, user.university_id)
         except Exception as e:
             logger.warning(f"Scrape failed for user {user.telegram_id}: {e}")
-            return []
-
-        # Load old reports
-        db_results = await uow.semester_results.get_by_user_id(user.id)
-        old_reports = []
-        for res in db_results:
-            try:
-                old_reports.append(GradeReport.model_validate_json(self.cipher.decrypt(res.encrypted_result_detail)))
-            except:
-                pass
-
-        new_released, all_graded = await self._detect_grade_diff(old_reports, new_reports)
+            from clients.aau_portal import PortalSchemaChangedError
+            if isinstance(e, PortalSchemaChangedError) and self.alerts is not None:
+                await self.alerts.schema_changed(e, "the scheduled grade scan")
+            return [], set()
 
-        # Save new reports back
-        await uow.semester_results.delete_by_user_id(user.id)
-        for rep in new_reports:
-            rep_json = json.dumps(rep.model_dump())
-            enc_rep = self.cipher.encrypt(rep_json)
-            rep_payload = Ciphertext.from_token(enc_rep)
-            rep_iv = base64.urlsafe_b64encode(rep_payload.nonce).decode("ascii")
-            sr = SemesterResult(
-                user_id=user.id,
-                academic_year=rep.academic_year,
-                semester=self._parse_semester(rep.semester_label),
-                encrypted_result_detail=enc_rep,
-                iv=rep_iv,
-            )
-            await uow.semester_results.add(sr)
-        
+        # Unchanged terms are skipped by digest; changed ones are written with their courses and assessments
+        persisted = await self.persistence.persist(uow, user.id, new_reports, cipher, user.department_id)
+        notify = self.outbox is not None and persisted.released and user.is_reachable
+        if notify:
+            # Committed with the grades, so a crash after this point cannot lose the message
+            from services.notification.outbox import idempotency_key
+            await self.outbox.stage(uow, [
+                (user.telegram_id, _release_message(subj), idempotency_key("grade_released", user.telegram_id, subj))
+                for subj in persisted.released
+            ])
         await uow.commit()
-        return new_released, all_graded
+        await self.persistence.publish(persisted)
+        return list(persisted.released), set(persisted.graded)
 
     async def run_once(self) -> SchedulerRunResult:
         """
@@ -234,8 +225,8 @@ class SchedulerService:
                         semester=state.semester,
                         section=state.section,
                         representative_user_id=None,
-                        status=CohortScanStatus.IN_PROGRESS,
-                        grade_change=GradeChangeStatus.NONE
+                        status=CohortScanStatus.SCANNING_USERS,
+                        grade_change=GradeChangeStatus.NO_CHANGE
                     )
                     uow.session.add(scan)
                     await uow.commit()
@@ -256,7 +247,7 @@ class SchedulerService:
                             newly_graded_users_per_subject.setdefault(subj, []).append(u.telegram_id)
                     
                     if all_new_subjects:
-                        scan.grade_change = GradeChangeStatus.DETECTED
+                        scan.grade_change = GradeChangeStatus.GRADE_RELEASED
                         state.last_grade_change_at = datetime.now(timezone.utc)
                         await uow.commit()
                         
@@ -268,12 +259,12 @@ class SchedulerService:
                             got_it_newly = newly_graded_users_per_subject.get(subj, [])
                             
                             for u in cohort_users_list:
+                                if not u.is_reachable:
+                                    continue  # blocked the bot; grades are still kept current
                                 if u.telegram_id in got_it_newly:
-                                    if self.notification_service:
-                                        await self.notification_service.send_user(
-                                            u.telegram_id,
-                                            f"🎉 <b>Grade Released!</b>\n\nYour grade for <b>{subj}</b> has been released. Use /grades to check it."
-                                        )
+                                    # With an outbox the message was staged alongside the grade
+                                    if self.notification_service and self.outbox is None:
+                                        await self.notification_service.send_user(u.telegram_id, _release_message(subj))
                                 elif subj not in user_graded_subjects.get(u.telegram_id, set()):
                                     if self.notification_service:
                                         await self.notification_service.send_user(
@@ -295,7 +286,11 @@ class SchedulerService:
                         for sib in sibling_cohorts.all():
                             sib_users = await uow.session.scalars(
                                 select(User).where(
-                                    and_(User.department_id == sib.department_id, User.section == sib.section)
+                                    and_(
+                                        User.department_id == sib.department_id,
+                                        User.section == sib.section,
+                                        User.is_reachable == True
+                                    )
                                 )
                             )
                             for su in sib_users.all():
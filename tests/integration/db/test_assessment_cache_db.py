@@ -0,0 +1,125 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from crypto.binding import assessment_associated_data
+from crypto.cipher import AesGcmCipher
+from crypto.payload_codec import open_payload
+from database.models import Base, User, UserCredential, UserCourse, Assessment
+from parser.models import (
+    AssessmentDetails,
+    AssessmentDetailsResult,
+    AssessmentReference,
+    AssessmentScore,
+    CourseGrade,
+    GradeReport,
+    GradeReportSummary,
+)
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.grades.service import GradeReadService
+
+
+def _report(academic_year: str, year_id: str, grade: str) -> GradeReport:
+    return GradeReport(
+        academic_year=academic_year,
+        year_label="Year II",
+        semester_label="Semester I",
+        course_grades=(
+            CourseGrade(
+                course_number=1,
+                course_name="Calculus",
+                course_code="MATH-1011",
+                credit_hours=3.0,
+                ects=5.0,
+                grade=grade,
+                assessment=AssessmentReference(academic_year_id=year_id, semester_id="1", course_id="55"),
+            ),
+        ),
+        summary=GradeReportSummary(sgp=6.0, sgpa=2.0, cgp=6.0, cgpa=2.0, academic_status="Pass"),
+    )
+
+
+def _details(total: float) -> AssessmentDetailsResult:
+    return AssessmentDetailsResult(
+        assessment=AssessmentDetails(
+            course_name="Calculus",
+            scores=(AssessmentScore(sequence=1, name="Final Exam (100%)", score=total),),
+            total_mark=total,
+            total_possible=100,
+        )
+    )
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def retake_service(sqlite_session_factory):
+    """A user who took MATH-1011 twice; each attempt has its own portal reference."""
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    portal = AsyncMock()
+    service = GradeReadService(session_factory=sqlite_session_factory, cipher=cipher, portal_client=portal)
+
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = User(telegram_id=77, university_id="UGR/7777/15")
+        uow.session.add(user)
+        await uow.session.flush()
+        uow.session.add(UserCredential(user_id=user.id, encrypted_password=cipher.encrypt("pw"), iv="iv", is_bound=False))
+        await service._persist_reports(
+            uow, user.id, None, [_report("2022/2023", "21", "F"), _report("2023/2024", "22", "B")]
+        )
+        await uow.commit()
+    return service, portal
+
+
+@pytest.mark.asyncio
+async def test_assessment_drilldown_targets_the_exact_retake_row(retake_service, sqlite_session_factory):
+    service, portal = retake_service
+    portal.scrape_assessment = AsyncMock(return_value=_details(71))
+    retake_ref = AssessmentReference(academic_year_id="22", semester_id="1", course_id="55")
+
+    first = await service.read_assessment(77, "MATH-1011", retake_ref)
+    second = await service.read_assessment(77, "MATH-1011", retake_ref)
+
+    assert "71" in first and first == second
+    assert portal.scrape_assessment.await_count == 1
+
+    async with sqlite_session_factory() as session:
+        rows = (await session.execute(
+            select(UserCourse.user_id, UserCourse.academic_year, UserCourse.semester, Assessment.encrypted_assessment_detail)
+            .join(Assessment, Assessment.user_course_id == UserCourse.id)
+        )).all()
+    cached = {
+        year: "assessment" in open_payload(
+            service.cipher, detail, assessment_associated_data(user_id, year, semester)
+        )
+        for user_id, year, semester, detail in rows
+    }
+    assert cached == {"2022/2023": False, "2023/2024": True}
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_cached_details_while_reference_is_unchanged(retake_service, sqlite_session_factory):
+    service, portal = retake_service
+    portal.scrape_assessment = AsyncMock(return_value=_details(64))
+    ref = AssessmentReference(academic_year_id="21", semester_id="1", course_id="55")
+    await service.read_assessment(77, "MATH-1011", ref)
+
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = await uow.users.get_by_telegram_id(77)
+        await service._persist_reports(
+            uow, user.id, None, [_report("2022/2023", "21", "F"), _report("2023/2024", "22", "B")]
+        )
+        await uow.commit()
+
+    assert "64" in await service.read_assessment(77, "MATH-1011", ref)
+    assert portal.scrape_assessment.await_count == 1
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from database.models import AuditLog, Base
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.audit import BufferedAuditWriter
+
+
+@pytest_asyncio.fixture
+async def sqlite_engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def _actions(session_factory) -> list[str]:
+    async with session_factory() as session:
+        return list(await session.scalars(select(AuditLog.action).order_by(AuditLog.timestamp)))
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_with_one_insert(sqlite_engine):
+    session_factory = async_sessionmaker(sqlite_engine, expire_on_commit=False)
+    writer = BufferedAuditWriter(session_factory, batch_size=5, flush_interval_seconds=60)
+    inserts = []
+    event.listen(
+        sqlite_engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT") else None,
+    )
+
+    for i in range(5):
+        writer.record(i, f"event-{i}", {"n": i})
+    for _ in range(50):
+        if not writer.pending:
+            break
+        await asyncio.sleep(0.01)
+    await writer.flush()
+
+    assert await _actions(session_factory) == [f"event-{i}" for i in range(5)]
+    assert len(inserts) == 1
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_flushes_on_interval_and_close(sqlite_engine):
+    session_factory = async_sessionmaker(sqlite_engine, expire_on_commit=False)
+    writer = BufferedAuditWriter(session_factory, batch_size=100, flush_interval_seconds=0.05)
+
+    writer.record(1, "manual_scrape")
+    await asyncio.sleep(0.2)
+    assert await _actions(session_factory) == ["manual_scrape"]
+
+    writer.record(1, "manual_scrape_failed")
+    await writer.close()
+    assert await _actions(session_factory) == ["manual_scrape", "manual_scrape_failed"]
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_events_for_the_next_attempt(sqlite_engine):
+    session_factory = async_sessionmaker(sqlite_engine, expire_on_commit=False)
+    writer = BufferedAuditWriter(session_factory, batch_size=100, flush_interval_seconds=60)
+    writer.record(1, "register")
+    writer.record(2, "register")
+
+    async with sqlite_engine.begin() as conn:
+        await conn.run_sync(AuditLog.__table__.drop)
+    assert await writer.flush() == 0
+    assert writer.pending == 2
+
+    async with sqlite_engine.begin() as conn:
+        await conn.run_sync(AuditLog.__table__.create)
+    await writer.close()
+    assert await _actions(session_factory) == ["register", "register"]
+
+
+@pytest.mark.asyncio
+async def test_record_now_commits_or_rolls_back_with_the_caller(sqlite_engine):
+    session_factory = async_sessionmaker(sqlite_engine, expire_on_commit=False)
+    writer = BufferedAuditWriter(session_factory)
+
+    async with SqlAlchemyRepositoryUnitOfWork(session_factory) as uow:
+        await writer.record_now(uow, 7, "account_deletion_requested", {"confirmed": True})
+        await uow.rollback()
+    async with SqlAlchemyRepositoryUnitOfWork(session_factory) as uow:
+        await writer.record_now(uow, 7, "account_deletion_requested", {"confirmed": True})
+        await uow.commit()
+
+    assert writer.pending == 0
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(AuditLog)) == 1
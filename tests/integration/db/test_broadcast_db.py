@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from clients.telegram import RecipientUnreachableError
+from database.models import Base, BroadcastJob, BroadcastStatus, User
+from dto.bot import BroadcastRequest
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.admin.service import AdminService
+from services.broadcast import BroadcastService
+from services.notification import NotificationService
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+class _Sender:
+    """Records sends and progress edits; chats in ``blocked`` refuse messages."""
+
+    def __init__(self, blocked: set[int] | None = None) -> None:
+        self.blocked = blocked or set()
+        self.sent: list[int] = []
+        self.edits: list[str] = []
+
+    async def send_message(self, telegram_id: int, text: str) -> None:
+        if telegram_id in self.blocked:
+            raise RecipientUnreachableError("Forbidden: bot was blocked by the user")
+        self.sent.append(telegram_id)
+
+    async def send_admin_alert(self, text: str) -> None:
+        pass
+
+    async def edit_message(self, telegram_id: int, message_id: int, text: str) -> None:
+        self.edits.append(text)
+
+
+async def _add_users(session_factory, telegram_ids, reachable=True) -> None:
+    async with session_factory() as session:
+        await session.execute(insert(User), [
+            {"telegram_id": telegram_id, "university_id": f"UGR/{telegram_id}/15", "is_reachable": reachable}
+            for telegram_id in telegram_ids
+        ])
+        await session.commit()
+
+
+async def _job(session_factory, job_id) -> BroadcastJob:
+    async with session_factory() as session:
+        return await session.get(BroadcastJob, job_id)
+
+
+async def _wait_for(broadcasts: BroadcastService) -> None:
+    for _ in range(200):
+        if not broadcasts.running:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("broadcast did not finish")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_skip_unreachable_users(sqlite_session_factory):
+    await _add_users(sqlite_session_factory, [5, 1, 9, 3, 7])
+    await _add_users(sqlite_session_factory, [4], reachable=False)
+
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        assert await uow.users.count_reachable() == 5
+        assert await uow.users.list_reachable_telegram_ids(None, 2) == [1, 3]
+        assert await uow.users.list_reachable_telegram_ids(3, 2) == [5, 7]
+        assert await uow.users.list_reachable_telegram_ids(7, 2) == [9]
+
+
+@pytest.mark.asyncio
+async def test_admin_broadcast_streams_every_page_and_reports_progress(sqlite_session_factory):
+    await _add_users(sqlite_session_factory, range(1, 26))
+    sender = _Sender(blocked={13})
+    notifications = NotificationService(sender, global_limit=1000)
+    broadcasts = BroadcastService(
+        sqlite_session_factory, notifications, notifier=sender, page_size=10, progress_interval_seconds=0
+    )
+    admin = AdminService(notifier=sender, notifications=notifications, broadcasts=broadcasts)
+
+    result = await admin.broadcast(BroadcastRequest(admin_telegram_id=1, message="Hi", status_message_id=77))
+    assert result.recipients == 25
+    await _wait_for(broadcasts)
+
+    assert sorted(sender.sent) == [n for n in range(1, 26) if n != 13]
+    job = await _job(sqlite_session_factory, result.job_id)
+    assert (job.status, job.cursor, job.sent, job.failed) == (BroadcastStatus.COMPLETED, 25, 24, 1)
+    assert [edit.split("\n")[2].split()[0] for edit in sender.edits] == ["0/25", "10/25", "20/25", "25/25", "25/25"]
+    assert sender.edits[-1].startswith("✅ <b>Broadcast finished</b>")
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_broadcast_resumes_from_its_cursor(sqlite_session_factory):
+    await _add_users(sqlite_session_factory, range(1, 11))
+    now = datetime.now(timezone.utc)
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        # A process died after recording the first page; its lease has run out
+        job = BroadcastJob(
+            admin_telegram_id=1, body="Hi", total=10, cursor=4, sent=4, status_message_id=5,
+            lease_until=now - timedelta(seconds=1),
+        )
+        live = BroadcastJob(admin_telegram_id=1, body="Other", total=10, lease_until=now + timedelta(minutes=5))
+        await uow.broadcast_jobs.add(job)
+        await uow.broadcast_jobs.add(live)
+        await uow.commit()
+
+    sender = _Sender()
+    notifications = NotificationService(sender, global_limit=1000)
+    broadcasts = BroadcastService(sqlite_session_factory, notifications, notifier=sender, page_size=4)
+    assert await broadcasts.resume() == 1
+    await _wait_for(broadcasts)
+
+    assert sorted(sender.sent) == [5, 6, 7, 8, 9, 10]
+    resumed = await _job(sqlite_session_factory, job.id)
+    assert (resumed.status, resumed.sent) == (BroadcastStatus.COMPLETED, 10)
+    assert (await _job(sqlite_session_factory, live.id)).status == BroadcastStatus.RUNNING
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_the_job_and_close_releases_the_lease(sqlite_session_factory):
+    await _add_users(sqlite_session_factory, range(1, 101))
+    sender = _Sender()
+    notifications = NotificationService(sender, global_limit=20, period=0.1)
+    broadcasts = BroadcastService(sqlite_session_factory, notifications, notifier=sender, page_size=10)
+
+    cancelled = await broadcasts.start(1, "Hi", status_message_id=5)
+    await asyncio.sleep(0.05)
+    assert await broadcasts.cancel_running() == 1
+    await _wait_for(broadcasts)
+    assert (await _job(sqlite_session_factory, cancelled.job_id)).status == BroadcastStatus.CANCELLED
+    assert sender.edits[-1].startswith("🛑")
+    assert len(sender.sent) < 100
+
+    stopped = await broadcasts.start(1, "Again")
+    await asyncio.sleep(0.05)
+    await broadcasts.close()
+    job = await _job(sqlite_session_factory, stopped.job_id)
+    assert job.status == BroadcastStatus.RUNNING
+    # The next process can take it over straight away instead of waiting out the lease
+    resumed = BroadcastService(sqlite_session_factory, notifications)
+    assert await resumed.resume() == 1
+    # Stop the resumed job before the fixture disposes the database under it
+    await resumed.close()
+    await notifications.close(timeout=0.1)
@@ -0,0 +1,81 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from crypto.cipher import AesGcmCipher
+from database.models import Assessment, Base, Semester, SemesterResult, User, UserCourse
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.grade_persistence import GradePersistenceService, parse_semester
+
+from tests.integration.db.test_assessment_cache_db import _report
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _persist(session_factory, persistence, cipher, reports):
+    async with SqlAlchemyRepositoryUnitOfWork(session_factory) as uow:
+        user = await uow.users.get_by_telegram_id(3)
+        if user is None:
+            user = User(telegram_id=3, university_id="UGR/3333/15")
+            uow.session.add(user)
+            await uow.session.flush()
+        result = await persistence.persist(uow, user.id, reports, cipher)
+        await uow.commit()
+    await persistence.publish(result)
+    return result
+
+
+async def _count(session_factory, model) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+def test_parse_semester_labels() -> None:
+    assert parse_semester("Semester I") is Semester.FIRST
+    assert parse_semester("Semester II") is Semester.SECOND
+    assert parse_semester("Third semester") is Semester.THIRD
+
+
+@pytest.mark.asyncio
+async def test_persist_writes_the_course_graph_and_only_publishes_real_changes(sqlite_session_factory):
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    on_change = AsyncMock()
+    persistence = GradePersistenceService(on_change=on_change)
+    transcript = [_report("2022/2023", "21", "A"), _report("2023/2024", "22", "")]
+
+    first = await _persist(sqlite_session_factory, persistence, cipher, transcript)
+    assert (first.written, first.unchanged, first.removed) == (2, 0, 0)
+    assert first.released == ("Calculus (MATH-1011)",)
+    assert await _count(sqlite_session_factory, UserCourse) == 2
+    assert await _count(sqlite_session_factory, Assessment) == 2
+
+    again = await _persist(sqlite_session_factory, persistence, cipher, transcript)
+    assert (again.written, again.unchanged, again.released) == (0, 2, ())
+    assert on_change.await_count == 1
+
+    dropped = await _persist(sqlite_session_factory, persistence, cipher, transcript[:1])
+    assert (dropped.written, dropped.unchanged, dropped.removed) == (0, 1, 1)
+    assert await _count(sqlite_session_factory, SemesterResult) == 1
+    assert on_change.await_count == 2
+    assert on_change.await_args.args[0] is dropped
+
+
+@pytest.mark.asyncio
+async def test_failing_subscriber_does_not_fail_the_write(sqlite_session_factory):
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    persistence = GradePersistenceService(on_change=AsyncMock(side_effect=RuntimeError("down")))
+
+    result = await _persist(sqlite_session_factory, persistence, cipher, [_report("2023/2024", "22", "B")])
+
+    assert result.written == 1
+    assert await _count(sqlite_session_factory, SemesterResult) == 1
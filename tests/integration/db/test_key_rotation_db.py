@@ -0,0 +1,267 @@
+import base64
+
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from clients.cache_adapter import InMemoryCache
+from crypto.binding import credential_associated_data, decrypt_bound, semester_result_associated_data
+from crypto.cipher import AesGcmCipher
+from crypto.envelope import EnvelopeKeyring
+from crypto.payload_codec import open_payload, seal_payload
+from database.models import Assessment, Base, Semester, SemesterResult, SystemSetting, User, UserCredential
+from dto.bot import GradeReadRequest
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.grades.service import GradeReadService, assessment_reference_digest
+from services.key_rotation.reencrypt import PayloadReencryptionService
+from services.key_rotation.service import DataKeyRewrapService, ensure_user_data_key
+
+from tests.integration.db.test_assessment_cache_db import _report
+
+
+def _key() -> bytes:
+    return base64.urlsafe_b64decode(AesGcmCipher.generate_key())
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def file_session_factory(tmp_path):
+    """A file database, so concurrent sessions each get their own connection as on PostgreSQL."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _add_user(session_factory, keyring, telegram_id: int, with_data_key: bool = True) -> None:
+    async with session_factory() as session:
+        user = User(telegram_id=telegram_id, university_id=f"UGR/{telegram_id}/15")
+        session.add(user)
+        await session.flush()
+        cipher = keyring.master
+        if with_data_key:
+            cipher = await ensure_user_data_key(keyring, session, user.id, None)
+        # Sealed before associated data was bound
+        session.add(UserCredential(
+            user_id=user.id, encrypted_password=cipher.encrypt(f"pw-{telegram_id}"), iv="iv", is_bound=False
+        ))
+        await session.commit()
+
+
+async def _passwords(session_factory, keyring) -> dict[int, str]:
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(
+                User.id,
+                User.telegram_id,
+                User.wrapped_data_key,
+                UserCredential.encrypted_password,
+                UserCredential.is_bound,
+            )
+            .join(UserCredential, UserCredential.user_id == User.id)
+        )
+        return {
+            row.telegram_id: decrypt_bound(
+                keyring.cipher_for(row.id, row.wrapped_data_key),
+                row.encrypted_password,
+                credential_associated_data(row.id),
+                row.is_bound,
+            )
+            for row in rows
+        }
+
+
+@pytest.mark.asyncio
+async def test_rewrap_job_moves_data_keys_to_the_new_master_in_batches(sqlite_session_factory):
+    old_key, new_key = _key(), _key()
+    old_ring = EnvelopeKeyring(old_key)
+    for telegram_id in range(1, 6):
+        await _add_user(sqlite_session_factory, old_ring, telegram_id)
+    await _add_user(sqlite_session_factory, old_ring, 6, with_data_key=False)
+
+    new_ring = EnvelopeKeyring(new_key, retired_keys=[old_key])
+    job = DataKeyRewrapService(sqlite_session_factory, new_ring, lock=InMemoryCache(), batch_size=2)
+    result = await job.run()
+
+    assert (result.rewrapped, result.failed, result.batches) == (5, 0, 3)
+    assert (await job.run()).rewrapped == 0
+    async with sqlite_session_factory() as session:
+        key_ids = set(await session.scalars(select(User.data_key_id).where(User.wrapped_data_key.is_not(None))))
+    assert key_ids == {new_ring.master_key_id}
+
+    # Payload rows were untouched, yet readable without the old master for data-key users
+    expected = {telegram_id: f"pw-{telegram_id}" for telegram_id in range(1, 7)}
+    assert await _passwords(sqlite_session_factory, new_ring) == expected
+    new_only = EnvelopeKeyring(new_key)
+    async with sqlite_session_factory() as session:
+        rows = (await session.execute(
+            select(User.id, User.wrapped_data_key, UserCredential.encrypted_password)
+            .join(UserCredential, UserCredential.user_id == User.id)
+            .where(User.wrapped_data_key.is_not(None))
+        )).all()
+    assert len(rows) == 5
+    for row in rows:
+        new_only.cipher_for(row.id, row.wrapped_data_key).decrypt(row.encrypted_password)
+
+
+@pytest.mark.asyncio
+async def test_manual_refresh_issues_a_data_key_to_a_legacy_user(sqlite_session_factory):
+    keyring = EnvelopeKeyring(_key())
+    await _add_user(sqlite_session_factory, keyring, 42, with_data_key=False)
+    portal = AsyncMock()
+    portal.scrape = AsyncMock(return_value=(None, [_report("2023/2024", "22", "B")]))
+    service = GradeReadService(
+        session_factory=sqlite_session_factory,
+        cipher=keyring.master,
+        portal_client=portal,
+        keyring=keyring,
+    )
+
+    fresh = await service.read(GradeReadRequest(telegram_id=42, force_refresh=True))
+    keyring.cache.clear()
+    stored = await service.read(GradeReadRequest(telegram_id=42))
+
+    assert "Grade: <b>B</b>" in fresh.message and stored.message == fresh.message
+    async with sqlite_session_factory() as session:
+        user = await session.scalar(select(User).where(User.telegram_id == 42))
+        row = (await session.execute(select(SemesterResult))).scalar_one()
+        # The issued key is never replaced by a second writer
+        again = await ensure_user_data_key(keyring, session, user.id, None)
+    blob = row.encrypted_result_detail
+    ad = semester_result_associated_data(user.id, row.academic_year, row.semester)
+    assert user.data_key_id == keyring.master_key_id
+    assert open_payload(keyring.cipher_for(user.id, user.wrapped_data_key), blob, ad)["academic_year"] == "2023/2024"
+    assert open_payload(again, blob, ad)["academic_year"] == "2023/2024"
+    with pytest.raises(ValueError):
+        open_payload(keyring.master, blob, ad)
+
+
+@pytest.mark.asyncio
+async def test_reencryption_pass_is_resumable_and_leaves_rows_readable_by_the_new_key_only(file_session_factory):
+    old_key, new_key = _key(), _key()
+    old_ring = EnvelopeKeyring(old_key)
+    await _add_user(file_session_factory, old_ring, 1, with_data_key=False)
+    await _add_user(file_session_factory, old_ring, 2, with_data_key=False)
+    legacy_service = GradeReadService(session_factory=file_session_factory, cipher=old_ring.master)
+    async with file_session_factory() as session:
+        users = list(await session.scalars(select(User).order_by(User.telegram_id)))
+    async with SqlAlchemyRepositoryUnitOfWork(file_session_factory) as uow:
+        for user in users:
+            await legacy_service._persist_reports(uow, user.id, None, [_report("2023/2024", "22", "B")])
+        await uow.commit()
+
+    new_ring = EnvelopeKeyring.from_base64_keys(
+        [base64.urlsafe_b64encode(new_key).decode(), base64.urlsafe_b64encode(old_key).decode()]
+    )
+    job = PayloadReencryptionService(file_session_factory, new_ring, lock=InMemoryCache(), batch_size=1)
+
+    partial = await job.run(max_batches=1)
+    assert not partial.completed
+    assert [report.reencrypted for report in partial.tables] == [1, 1, 1]
+    async with file_session_factory() as session:
+        cursor = await session.scalar(
+            select(SystemSetting.value).where(SystemSetting.key == "reencrypt:user_credentials:cursor")
+        )
+    assert cursor == str(min(user.id for user in users))
+
+    rest = await job.run()
+    assert rest.completed and [report.reencrypted for report in rest.tables] == [1, 1, 1]
+    assert (await job.run()).skipped
+
+    new_only = EnvelopeKeyring(new_key)
+    assert await _passwords(file_session_factory, new_only) == {1: "pw-1", 2: "pw-2"}
+    async with file_session_factory() as session:
+        results = list(await session.scalars(select(SemesterResult)))
+        assessments = (await session.execute(
+            select(Assessment.reference_digest, Assessment.encrypted_grade, Assessment.encrypted_assessment_detail)
+        )).all()
+    for result in results:
+        ad = semester_result_associated_data(result.user_id, result.academic_year, result.semester)
+        # Re-sealed rows are bound to their row, so only the bound open succeeds
+        assert new_only.master.decrypt_for_rotation(result.encrypted_result_detail, ad)[1] is False
+        assert open_payload(new_only.master, result.encrypted_result_detail, ad)["academic_year"] == "2023/2024"
+        assert result.content_digest is not None
+    reference = _report("2023/2024", "22", "B").course_grades[0].assessment
+    assert {row.reference_digest for row in assessments} == {
+        assessment_reference_digest(new_only.master, user.id, reference) for user in users
+    }
+    assert all(row.encrypted_grade == row.encrypted_assessment_detail for row in assessments)
+
+
+@pytest.mark.asyncio
+async def test_reencryption_never_overwrites_a_row_changed_since_it_was_read(sqlite_session_factory):
+    keyring = EnvelopeKeyring(_key())
+    await _add_user(sqlite_session_factory, keyring, 9, with_data_key=False)
+    job = PayloadReencryptionService(sqlite_session_factory, keyring)
+    async with sqlite_session_factory() as session:
+        cred = await session.scalar(select(UserCredential))
+        current = cred.encrypted_password
+        await job._write_credentials(session, [
+            {"b_id": cred.user_id, "b_old": "what-the-job-read-earlier", "b_value": "stale", "b_iv": "iv"},
+        ])
+        await session.commit()
+        await session.refresh(cred)
+    assert cred.encrypted_password == current
+
+
+@pytest.mark.asyncio
+async def test_binding_pass_runs_without_a_rotated_key_and_ends_the_unbound_fallback(sqlite_session_factory):
+    keyring = EnvelopeKeyring(_key())
+    await _add_user(sqlite_session_factory, keyring, 1, with_data_key=False)
+    await _add_user(sqlite_session_factory, keyring, 2, with_data_key=False)
+    async with sqlite_session_factory() as session:
+        first, second = list(await session.scalars(select(User).order_by(User.telegram_id)))
+        legacy_password = await session.scalar(
+            select(UserCredential.encrypted_password).where(UserCredential.user_id == first.id)
+        )
+        legacy_result = seal_payload(keyring.master, _report("2023/2024", "22", "B"))
+        for user in (first, second):
+            session.add(SemesterResult(
+                user_id=user.id,
+                academic_year="2023/2024",
+                semester=Semester.FIRST,
+                encrypted_result_detail=legacy_result,
+                iv="iv",
+                is_bound=False,
+            ))
+        await session.commit()
+
+    job = PayloadReencryptionService(sqlite_session_factory, keyring, lock=InMemoryCache())
+    result = await job.run()
+    assert result.completed and not result.skipped
+    assert [report.reencrypted for report in result.tables] == [2, 2, 0]
+    assert (await job.run()).skipped
+    assert await _passwords(sqlite_session_factory, keyring) == {1: "pw-1", 2: "pw-2"}
+
+    # A pre-binding blob moved into another user's (now bound) row no longer opens
+    async with sqlite_session_factory() as session:
+        await session.execute(
+            update(UserCredential).where(UserCredential.user_id == second.id).values(encrypted_password=legacy_password)
+        )
+        await session.execute(
+            update(SemesterResult).where(SemesterResult.user_id == second.id).values(encrypted_result_detail=legacy_result)
+        )
+        await session.commit()
+        moved = await session.scalar(select(SemesterResult).where(SemesterResult.user_id == second.id))
+    with pytest.raises(ValueError):
+        await _passwords(sqlite_session_factory, keyring)
+    assert moved.is_bound
+    with pytest.raises(ValueError):
+        open_payload(
+            keyring.master,
+            moved.encrypted_result_detail,
+            semester_result_associated_data(second.id, moved.academic_year, moved.semester),
+            moved.is_bound,
+        )
@@ -0,0 +1,245 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from bootstrap import build_application_services
+from clients.telegram import RecipientUnreachableError
+from config import Settings
+from crypto.binding import credential_associated_data
+from crypto.cipher import AesGcmCipher
+from database.models import Base, NotificationOutbox, OutboxStatus, Semester, User, UserCredential
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.account_lifecycle.service import AccountLifecycleService
+from services.grades.service import GradeReadService
+from services.notification import NotificationOutboxRelay, NotificationService, idempotency_key
+from services.notification.service import DIGEST_SEPARATOR
+from services.scheduler.service import SchedulerService
+
+from tests.integration.db.test_assessment_cache_db import _report
+
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+class _Deliveries:
+    """Stands in for NotificationService.deliver; chats in ``failing`` are refused."""
+
+    def __init__(self, failing: set[int] | None = None) -> None:
+        self.failing = failing or set()
+        self.sent: list[tuple[int, str]] = []
+
+    async def deliver(self, telegram_id: int, text: str) -> bool:
+        if telegram_id in self.failing:
+            return False
+        self.sent.append((telegram_id, text))
+        return True
+
+
+async def _rows(session_factory) -> dict[int, NotificationOutbox]:
+    async with session_factory() as session:
+        return {row.telegram_id: row for row in await session.scalars(select(NotificationOutbox))}
+
+
+async def _stage(session_factory, relay, messages, commit=True):
+    async with SqlAlchemyRepositoryUnitOfWork(session_factory) as uow:
+        await relay.stage(uow, messages)
+        if commit:
+            await uow.commit()
+
+
+@pytest.mark.asyncio
+async def test_staging_is_idempotent_and_rolls_back_with_its_transaction(sqlite_session_factory):
+    relay = NotificationOutboxRelay(sqlite_session_factory, _Deliveries())
+    key = idempotency_key("grade_released", 1, "Calculus (MATH-1011)")
+
+    await _stage(sqlite_session_factory, relay, [(1, "first", key)])
+    await _stage(sqlite_session_factory, relay, [(1, "again", key)])
+    await _stage(sqlite_session_factory, relay, [(2, "never committed", "other")], commit=False)
+
+    rows = await _rows(sqlite_session_factory)
+    assert list(rows) == [1]
+    assert (rows[1].body, rows[1].status, rows[1].attempts) == ("first", OutboxStatus.PENDING, 0)
+
+
+@pytest.mark.asyncio
+async def test_drain_marks_sent_and_backs_off_failures(sqlite_session_factory):
+    deliveries = _Deliveries(failing={2})
+    relay = NotificationOutboxRelay(
+        sqlite_session_factory, deliveries, max_attempts=3, retry_base_seconds=10, lease_seconds=60
+    )
+    await _stage(sqlite_session_factory, relay, [(1, "hello", "k1"), (2, "blocked", "k2")])
+
+    first = await relay.drain_once(now=NOW)
+    assert (first.claimed, first.sent, first.retried) == (2, 1, 1)
+    assert deliveries.sent == [(1, "hello")]
+    rows = await _rows(sqlite_session_factory)
+    assert rows[1].status == OutboxStatus.SENT
+    assert (rows[2].status, rows[2].attempts, rows[2].last_error) == (OutboxStatus.PENDING, 1, "send failed")
+
+    # Not due again until the backoff has passed; the delay doubles per attempt
+    assert (await relay.drain_once(now=NOW + timedelta(seconds=9))).claimed == 0
+    assert (await relay.drain_once(now=NOW + timedelta(seconds=10))).retried == 1
+    last = await relay.drain_once(now=NOW + timedelta(seconds=30))
+    assert last.failed == 1
+    assert (await _rows(sqlite_session_factory))[2].status == OutboxStatus.FAILED
+
+
+@pytest.mark.asyncio
+async def test_rows_for_one_chat_in_a_batch_go_out_as_one_message(sqlite_session_factory):
+    deliveries = _Deliveries()
+    relay = NotificationOutboxRelay(sqlite_session_factory, deliveries)
+    await _stage(sqlite_session_factory, relay, [(1, "Calculus", "k1"), (2, "Physics", "k2"), (1, "Drawing", "k3")])
+
+    result = await relay.drain_once(now=NOW)
+    assert (result.claimed, result.sent) == (3, 3)
+    assert len(deliveries.sent) == 2
+    merged = dict(deliveries.sent)
+    assert sorted(merged[1].split(DIGEST_SEPARATOR)) == ["Calculus", "Drawing"]
+    assert merged[2] == "Physics"
+
+
+@pytest.mark.asyncio
+async def test_claimed_rows_are_leased(sqlite_session_factory):
+    relay = NotificationOutboxRelay(sqlite_session_factory, _Deliveries())
+    await _stage(sqlite_session_factory, relay, [(1, "hello", "k1")])
+
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        assert len(await uow.notification_outbox.claim_due(NOW, 10, lease_seconds=60)) == 1
+        assert await uow.notification_outbox.claim_due(NOW + timedelta(seconds=59), 10, lease_seconds=60) == []
+        # A relay that died mid-send loses its lease and the row is delivered again
+        assert len(await uow.notification_outbox.claim_due(NOW + timedelta(seconds=60), 10, lease_seconds=60)) == 1
+
+
+@pytest.mark.asyncio
+async def test_woken_relay_delivers_through_the_notification_queue_and_stops(sqlite_session_factory):
+    sender = AsyncMock()
+    notifications = NotificationService(sender, global_limit=100)
+    relay = NotificationOutboxRelay(sqlite_session_factory, notifications)
+    await _stage(sqlite_session_factory, relay, [(chat, f"m{chat}", f"k{chat}") for chat in range(5)])
+
+    relay.wake()
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if relay._task.done():
+            break
+
+    assert relay._task.done()
+    assert {row.status for row in (await _rows(sqlite_session_factory)).values()} == {OutboxStatus.SENT}
+    assert sender.send_message.await_count == 5
+    await relay.close()
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_cron_stages_release_messages_with_the_grade_write(sqlite_session_factory):
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = User(telegram_id=5, university_id="UGR/5555/15")
+        uow.session.add(user)
+        await uow.session.flush()
+        uow.session.add(UserCredential(
+            user_id=user.id, encrypted_password=cipher.encrypt("pw", credential_associated_data(user.id)), iv="iv"
+        ))
+        await GradeReadService(cipher=cipher)._persist_reports(uow, user.id, None, [_report("2022/2023", "21", "")])
+        await uow.commit()
+
+    portal = AsyncMock()
+    portal.scrape = AsyncMock(return_value=(None, [_report("2022/2023", "21", "A")]))
+    relay = NotificationOutboxRelay(sqlite_session_factory, _Deliveries())
+    relay.wake = lambda: None  # leave the row for the assertions below
+    scheduler = SchedulerService(
+        portal_client=portal, session_factory=sqlite_session_factory, cipher=cipher, outbox=relay
+    )
+    for _ in range(2):
+        async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+            user = await uow.users.get_by_telegram_id(5)
+            await scheduler._scrape_user_and_detect(uow, user, "2022/2023", Semester.FIRST)
+
+    rows = await _rows(sqlite_session_factory)
+    assert list(rows) == [5]
+    assert "Grade Released" in rows[5].body
+    assert rows[5].status == OutboxStatus.PENDING
+
+
+@pytest.mark.asyncio
+async def test_blocked_recipient_fails_its_row_at_once_and_is_flagged(sqlite_session_factory):
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        uow.session.add(User(telegram_id=9, university_id="UGR/9999/15"))
+        await uow.commit()
+
+    sender = AsyncMock()
+    sender.send_message.side_effect = RecipientUnreachableError("Forbidden: bot was blocked by the user")
+    notifications = NotificationService(sender, global_limit=100)
+    lifecycle = AccountLifecycleService(session_factory=sqlite_session_factory, notifications=notifications)
+    notifications.on_unreachable = lifecycle.mark_unreachable
+    relay = NotificationOutboxRelay(sqlite_session_factory, notifications, max_attempts=8)
+    await _stage(sqlite_session_factory, relay, [(9, "hello", "k9")])
+
+    result = await relay.drain_once(now=NOW)
+    assert (result.failed, result.retried) == (1, 0)
+    assert (await _rows(sqlite_session_factory))[9].status == OutboxStatus.FAILED
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        assert (await uow.users.get_by_telegram_id(9)).is_reachable is False
+        assert await uow.users.set_reachable(9, False) is False  # already flagged
+
+    # Talking to the bot again clears the flag in both places
+    await lifecycle.bump_last_used(9)
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        assert (await uow.users.get_by_telegram_id(9)).is_reachable is True
+    sender.send_message.side_effect = None
+    assert await notifications.deliver(9, "welcome back") is True
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_bootstrapped_cron_delivers_a_release_through_the_persistence_subscriber(sqlite_session_factory):
+    bot = Bot(token="123:FAKE")
+    services = build_application_services(
+        Settings(encryption_key=AesGcmCipher.generate_key(), redis_url=None),
+        bot=bot,
+        session_factory=sqlite_session_factory,
+    )
+    cipher = services.scheduler.cipher
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = User(telegram_id=5, university_id="UGR/5555/15")
+        uow.session.add(user)
+        await uow.session.flush()
+        uow.session.add(UserCredential(
+            user_id=user.id, encrypted_password=cipher.encrypt("pw", credential_associated_data(user.id)), iv="iv"
+        ))
+        await services.grades._persist_reports(uow, user.id, None, [_report("2022/2023", "21", "")])
+        await uow.commit()
+
+    deliveries = _Deliveries()
+    services.notification.deliver = deliveries.deliver
+    services.scheduler.portal_client = AsyncMock()
+    services.scheduler.portal_client.scrape = AsyncMock(return_value=(None, [_report("2022/2023", "21", "A")]))
+
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = await uow.users.get_by_telegram_id(5)
+        await services.scheduler._scrape_user_and_detect(uow, user, "2022/2023", Semester.FIRST)
+
+    # Nothing else wakes the relay: the changed term reached it through on_change
+    for _ in range(100):
+        if (await _rows(sqlite_session_factory))[5].status == OutboxStatus.SENT:
+            break
+        await asyncio.sleep(0.01)
+    assert [(telegram_id, "Grade Released" in text) for telegram_id, text in deliveries.sent] == [(5, True)]
+    await services.scheduler.outbox.close()
+    await services.notification.close()
+    await bot.session.close()
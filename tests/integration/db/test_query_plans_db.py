@@ -0,0 +1,222 @@
+"""Query-plan regression tests for the hot read paths on real PostgreSQL.
+
+Seeds every table at realistic row counts, runs each repository method (and the
+scheduler's cohort queries) once, then EXPLAINs every statement it issued with the
+same parameters. A sequential scan on any table means a hot query lost its index.
+
+Requires Docker. Skipped if Docker is unavailable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import and_, event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.models import Base, CohortState, Semester, SemesterResult, User, UserCourse, UserCredential
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+
+try:
+    from testcontainers.postgres import PostgresContainer  # type: ignore[import-untyped]
+    HAS_TESTCONTAINERS = True
+except ImportError:
+    HAS_TESTCONTAINERS = False
+
+SKIP_DOCKER = os.environ.get("SKIP_DOCKER_TESTS", "").lower() in ("1", "true", "yes")
+
+pytestmark = pytest.mark.skipif(
+    not HAS_TESTCONTAINERS or SKIP_DOCKER,
+    reason="Requires testcontainers[postgres] and Docker",
+)
+
+
+USERS = 20_000
+DEPARTMENTS = 50
+SECTIONS = 4
+TERMS = 4
+COURSES = 6
+COHORT_TERMS = 40
+AUDIT_EVENTS = 100_000
+
+# The newest cohort term seeded below: t = COHORT_TERMS - 1
+CURRENT_YEAR = f"{2000 + (COHORT_TERMS - 1) // 2}/{2001 + (COHORT_TERMS - 1) // 2}"
+CURRENT_SEMESTER = Semester.SECOND
+
+_TERM_YEAR = "(2016 + t / 2) || '/' || (2017 + t / 2)"
+_TERM_SEMESTER = "(ARRAY['FIRST', 'SECOND'])[t % 2 + 1]::semester"
+
+SEED_SQL = [
+    "INSERT INTO campuses (campus_id, full_name) VALUES ('C', 'Campus')",
+    f"INSERT INTO departments (department_id, full_name, campus_id) "
+    f"SELECT 'D' || d, 'Department ' || d, 'C' FROM generate_series(1, {DEPARTMENTS}) d",
+    f"INSERT INTO courses (course_id, course_name, credit_hours, ects) "
+    f"SELECT 'C-' || c, 'Course ' || c, 3, 5 FROM generate_series(1, {TERMS * COURSES}) c",
+    f"INSERT INTO users (id, telegram_id, university_id, department_id, role, section, "
+    f"is_credential_valid, last_used, created_at) "
+    f"SELECT gen_random_uuid(), n, 'UGR/' || n || '/15', 'D' || (n % {DEPARTMENTS} + 1), 'USER', "
+    f"'S' || (n % {SECTIONS} + 1), true, now() - random() * interval '365 days', now() "
+    f"FROM generate_series(1, {USERS}) n",
+    "INSERT INTO user_credentials (user_id, encrypted_password, iv, algorithm, is_valid, failed_attempts, updated_at) "
+    "SELECT id, 'x', 'iv', 'AES-256-GCM', random() > 0.1, 0, now() FROM users",
+    f"INSERT INTO semester_results (id, user_id, academic_year, semester, encrypted_result_detail, iv, content_digest) "
+    f"SELECT gen_random_uuid(), u.id, {_TERM_YEAR}, {_TERM_SEMESTER}, decode('00', 'hex'), 'iv', md5(u.id::text || t) "
+    f"FROM users u CROSS JOIN generate_series(0, {TERMS * 2 - 1}) t",
+    f"INSERT INTO user_courses (id, user_id, course_id, academic_year, semester) "
+    f"SELECT gen_random_uuid(), u.id, 'C-' || (t * {COURSES} + c + 1), {_TERM_YEAR}, {_TERM_SEMESTER} "
+    f"FROM users u CROSS JOIN generate_series(0, {TERMS - 1}) t CROSS JOIN generate_series(0, {COURSES - 1}) c",
+    "INSERT INTO assessments (id, user_course_id, encrypted_assessment_detail, encrypted_grade, iv, "
+    "reference_digest, updated_at) "
+    "SELECT gen_random_uuid(), id, decode('00', 'hex'), decode('00', 'hex'), 'iv', md5(id::text), now() "
+    "FROM user_courses",
+    f"INSERT INTO cohort_states (department_id, academic_year, semester, section, last_probe_at, status, "
+    f"users_checked, total_users, updated_at) "
+    f"SELECT 'D' || d, (2000 + t / 2) || '/' || (2001 + t / 2), {_TERM_SEMESTER}, 'S' || s, "
+    f"now() - random() * interval '6 hours', 'COMPLETED', 0, 0, now() "
+    f"FROM generate_series(1, {DEPARTMENTS}) d CROSS JOIN generate_series(0, {COHORT_TERMS - 1}) t "
+    f"CROSS JOIN generate_series(1, {SECTIONS}) s",
+    f"INSERT INTO audit_logs (id, telegram_id, action, details, timestamp) "
+    f"SELECT gen_random_uuid(), n % {USERS} + 1, 'manual_scrape', NULL, now() - random() * interval '365 days' "
+    f"FROM generate_series(1, {AUDIT_EVENTS}) n",
+]
+
+
+def _make_async_url(sync_url: str) -> str:
+    """Convert testcontainers sync URL to asyncpg URL."""
+    return sync_url.replace("postgresql://", "postgresql+asyncpg://", 1).replace(
+        "psycopg2://", "asyncpg://", 1
+    )
+
+
+async def _seed(url: str) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in SEED_SQL:
+            await conn.exec_driver_sql(statement)
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+    await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def postgres_url():
+    """Start a real PostgreSQL container and seed it once for the module."""
+    with PostgresContainer("postgres:15-alpine") as container:
+        url = _make_async_url(container.get_connection_url())
+        asyncio.run(_seed(url))
+        yield url
+
+
+def _seq_scans(node: dict) -> list[str]:
+    found = [node.get("Relation Name", "?")] if node["Node Type"] == "Seq Scan" else []
+    for child in node.get("Plans", []):
+        found += _seq_scans(child)
+    return found
+
+
+async def _cohort_users(uow, sample):
+    return await uow.session.scalars(
+        select(User).join(User.credential).where(
+            and_(
+                User.department_id == sample.department_id,
+                User.section == sample.section,
+                UserCredential.is_valid == True,
+            )
+        )
+    )
+
+
+async def _eligible_cohorts(uow, sample):
+    two_hours_ago = datetime.now(timezone.utc) - timedelta(hours=2)
+    return await uow.session.scalars(
+        select(CohortState).where(
+            and_(
+                CohortState.academic_year == CURRENT_YEAR,
+                CohortState.semester == CURRENT_SEMESTER,
+                (CohortState.last_probe_at == None) | (CohortState.last_probe_at < two_hours_ago),
+            )
+        )
+    )
+
+
+async def _stored_digests(uow, sample):
+    return await uow.session.execute(
+        select(SemesterResult.id, SemesterResult.academic_year, SemesterResult.semester, SemesterResult.content_digest)
+        .where(SemesterResult.user_id == sample.id)
+    )
+
+
+HOT_PATHS = {
+    "users.get_by_id": lambda uow, s: uow.users.get_by_id(s.id),
+    "users.get_by_telegram_id": lambda uow, s: uow.users.get_by_telegram_id(s.telegram_id),
+    "users.get_by_university_id": lambda uow, s: uow.users.get_by_university_id(s.university_id),
+    "users.get_inactive_users": lambda uow, s: uow.users.get_inactive_users(
+        datetime.now(timezone.utc) - timedelta(days=360)
+    ),
+    "credentials.get_by_user_id": lambda uow, s: uow.credentials.get_by_user_id(s.id),
+    "semester_results.get_by_user_id": lambda uow, s: uow.semester_results.get_by_user_id(s.id),
+    "semester_results.delete_by_user_id": lambda uow, s: uow.semester_results.delete_by_user_id(s.id),
+    "user_courses.get_by_user_id": lambda uow, s: uow.user_courses.get_by_user_id(s.id),
+    "user_courses.delete_by_user_id": lambda uow, s: uow.user_courses.delete_by_user_id(s.id),
+    "assessments.get_by_user_course_id": lambda uow, s: uow.assessments.get_by_user_course_id(s.user_course_id),
+    "grade_graph.upsert_user_courses": lambda uow, s: uow.grade_graph.upsert_user_courses(
+        s.id, [("C-1", "2016/2017", Semester.FIRST), ("C-7", "2016/2017", Semester.SECOND)]
+    ),
+    "audit_logs.list_for_user": lambda uow, s: uow.audit_logs.list_for_user(
+        s.telegram_id, since=datetime.now(timezone.utc) - timedelta(days=30)
+    ),
+    "grade_persistence.stored_digests": _stored_digests,
+    "scheduler.cohort_users": _cohort_users,
+    "scheduler.eligible_cohorts": _eligible_cohorts,
+}
+
+
+@pytest.mark.parametrize("name", list(HOT_PATHS))
+def test_hot_query_avoids_sequential_scans(postgres_url: str, name: str) -> None:
+    async def scenario() -> dict[str, list[str]]:
+        engine = create_async_engine(postgres_url)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        statements: list[tuple[str, object]] = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        scans = {}
+        async with SqlAlchemyRepositoryUnitOfWork(session_factory) as uow:
+            sample = (await uow.session.execute(
+                select(User.id, User.telegram_id, User.university_id, User.department_id, User.section)
+                .order_by(User.telegram_id)
+                .offset(USERS // 2)
+                .limit(1)
+            )).one()
+            user_course_id = await uow.session.scalar(
+                select(UserCourse.id).where(UserCourse.user_id == sample.id).limit(1)
+            )
+            sample = SimpleNamespace(**sample._asdict(), user_course_id=user_course_id)
+
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                await HOT_PATHS[name](uow, sample)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            conn = await uow.session.connection()
+            for statement, parameters in statements:
+                raw = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar()
+                plan = json.loads(raw) if isinstance(raw, str) else raw
+                seq = _seq_scans(plan[0]["Plan"])
+                if seq:
+                    scans[statement] = seq
+            await uow.rollback()
+        await engine.dispose()
+        assert statements, f"{name} issued no SQL"
+        return scans
+
+    scans = asyncio.run(scenario())
+    assert not scans, f"{name} plans a sequential scan: {scans}"
@@ -1,9 +1,11 @@
 import pytest
 import pytest_asyncio
+from sqlalchemy import event, func, select, update
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from database.models import Base, User, Campus
+from database.models import Assessment, Base, User, Campus, Department, DepartmentCourse, Semester
 from repositories.sqlalchemy.user_repository import SqlAlchemyUserRepository
 from repositories.sqlalchemy.campus_repository import SqlAlchemyCampusRepository
+from repositories.sqlalchemy.grade_graph_repository import SqlAlchemyGradeGraphRepository
 
 @pytest_asyncio.fixture
 async def sqlite_engine():
@@ -53,3 +55,61 @@ async def test_user_repository_creates_and_fetches_with_relations(sqlite_session
     assert fetched is not None
     assert fetched.university_id == "UGR/123/12"
     assert fetched.department_id is None
+
+
+async def _grade_graph(repo, user_id, courses: int, reference_digest: str):
+    keys = [(f"C-{i}", "2023/2024", Semester.FIRST) for i in range(courses)]
+    await repo.add_missing_courses([
+        {"course_id": key[0], "course_name": f"Course {key[0]}", "credit_hours": 3, "ects": 5} for key in keys
+    ])
+    await repo.link_department_courses("SITE", [key[0] for key in keys])
+    user_course_ids = await repo.upsert_user_courses(user_id, keys)
+    assessment_ids = await repo.upsert_assessments([
+        {
+            "user_course_id": user_course_ids[key],
+            "encrypted_assessment_detail": b"detail-" + reference_digest.encode(),
+            "encrypted_grade": b"grade-" + reference_digest.encode(),
+            "iv": "iv",
+            "reference_digest": reference_digest,
+        }
+        for key in keys
+    ])
+    return user_course_ids, assessment_ids
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("on_conflict", [True, False])
+async def test_grade_graph_upserts_are_idempotent_and_keep_cached_details(sqlite_engine, sqlite_session, on_conflict):
+    sqlite_session.add_all([Campus(campus_id="C1", full_name="Campus One"), User(telegram_id=1, university_id="UGR/1/12")])
+    sqlite_session.add(Department(department_id="SITE", campus_id="C1", full_name="Software"))
+    await sqlite_session.commit()
+    user = await SqlAlchemyUserRepository(sqlite_session).get_by_telegram_id(1)
+    repo = SqlAlchemyGradeGraphRepository(sqlite_session)
+    if not on_conflict:
+        repo._insert = lambda table: None
+
+    statements = []
+    event.listen(sqlite_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    first = await _grade_graph(repo, user.id, 40, "ref-1")
+    # The ON CONFLICT path costs the same handful of statements for any transcript size
+    if on_conflict:
+        assert len(statements) <= 5
+    await sqlite_session.commit()
+
+    # Detailed scores fetched by a drilldown must survive a refresh with the same reference
+    await sqlite_session.execute(update(Assessment).values(encrypted_assessment_detail=b"scraped-detail"))
+    await sqlite_session.commit()
+
+    second = await _grade_graph(repo, user.id, 40, "ref-1")
+    await sqlite_session.commit()
+    assert second == first
+    assert len(first[0]) == len(first[1]) == 40
+    assert await sqlite_session.scalar(select(func.count()).select_from(DepartmentCourse)) == 40
+
+    details = set(await sqlite_session.scalars(select(Assessment.encrypted_assessment_detail)))
+    assert details == {b"scraped-detail"}
+    await _grade_graph(repo, user.id, 40, "ref-2")
+    await sqlite_session.commit()
+    sqlite_session.expire_all()
+    rows = (await sqlite_session.execute(select(Assessment.encrypted_assessment_detail, Assessment.encrypted_grade))).all()
+    assert {tuple(row) for row in rows} == {(b"detail-ref-2", b"grade-ref-2")}
@@ -0,0 +1,160 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from clients.cache_adapter import InMemoryCache
+from database.models import (
+    AuditLog,
+    Base,
+    CohortScan,
+    CohortScanStatus,
+    CohortState,
+    CronRun,
+    CronRunStatus,
+    GradeChangeStatus,
+    NotificationOutbox,
+    OutboxStatus,
+    Semester,
+)
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.retention import RetentionService
+from services.retention.service import add_months, month_start
+
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+def _scan(run_id, started_at):
+    return CohortScan(
+        run_id=run_id,
+        department_id="SITE",
+        academic_year="2025/2026",
+        semester=Semester.FIRST,
+        section="1",
+        status=CohortScanStatus.COMPLETED,
+        grade_change=GradeChangeStatus.NO_CHANGE,
+        started_at=started_at,
+    )
+
+
+def test_month_arithmetic_crosses_years() -> None:
+    assert month_start(NOW) == datetime(2026, 10, 1, tzinfo=timezone.utc)
+    assert add_months(month_start(NOW), -12) == datetime(2025, 10, 1, tzinfo=timezone.utc)
+    assert add_months(month_start(NOW), 3) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_expired_audit_rows_are_archived_and_deleted_in_batches(sqlite_session_factory, tmp_path):
+    async with sqlite_session_factory() as session:
+        session.add_all(
+            AuditLog(telegram_id=i, action="manual_scrape", details={"n": i}, timestamp=NOW - timedelta(days=400 + i))
+            for i in range(5)
+        )
+        session.add(AuditLog(telegram_id=9, action="register", timestamp=NOW - timedelta(days=30)))
+        await session.commit()
+
+    service = RetentionService(sqlite_session_factory, audit_retention_months=12, batch_size=2, archive_dir=str(tmp_path))
+    result = await service.run(now=NOW)
+
+    assert (result.audit_rows_deleted, result.audit_rows_archived, result.partitions_dropped) == (5, 5, 0)
+    async with sqlite_session_factory() as session:
+        assert list(await session.scalars(select(AuditLog.action))) == ["register"]
+    archived = []
+    for path in sorted(tmp_path.iterdir()):
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            archived += [json.loads(line) for line in fh]
+    assert sorted(row["telegram_id"] for row in archived) == [0, 1, 2, 3, 4]
+    # Three batches appended to one month's archive as separate gzip members
+    assert [path.name for path in tmp_path.iterdir()] == ["audit_logs_2025_09.jsonl.gz"]
+
+
+@pytest.mark.asyncio
+async def test_cron_history_keeps_runs_still_in_use(sqlite_session_factory):
+    old = NOW - timedelta(days=120)
+    async with sqlite_session_factory() as session:
+        expired, referenced, running, recent = (
+            CronRun(status=CronRunStatus.COMPLETED, started_at=old),
+            CronRun(status=CronRunStatus.COMPLETED, started_at=old),
+            CronRun(status=CronRunStatus.RUNNING, started_at=old),
+            CronRun(status=CronRunStatus.COMPLETED, started_at=NOW - timedelta(days=1)),
+        )
+        session.add_all([expired, referenced, running, recent])
+        await session.flush()
+        session.add_all([_scan(expired.id, old), _scan(recent.id, NOW - timedelta(days=1))])
+        session.add(CohortState(
+            department_id="SITE", academic_year="2025/2026", semester=Semester.FIRST, section="1",
+            last_run_id=referenced.id,
+        ))
+        await session.commit()
+        kept = {referenced.id, running.id, recent.id}
+
+    result = await RetentionService(sqlite_session_factory, cron_history_days=90, batch_size=1).run(now=NOW)
+
+    assert (result.cohort_scans_deleted, result.cron_runs_deleted) == (1, 1)
+    async with sqlite_session_factory() as session:
+        assert set(await session.scalars(select(CronRun.id))) == kept
+        assert len(list(await session.scalars(select(CohortScan.id)))) == 1
+
+
+@pytest.mark.asyncio
+async def test_outbox_keeps_pending_rows(sqlite_session_factory):
+    old = NOW - timedelta(days=120)
+    async with sqlite_session_factory() as session:
+        session.add_all([
+            NotificationOutbox(idempotency_key="sent", telegram_id=1, body="x", status=OutboxStatus.SENT, created_at=old),
+            NotificationOutbox(idempotency_key="failed", telegram_id=2, body="x", status=OutboxStatus.FAILED, created_at=old),
+            NotificationOutbox(idempotency_key="pending", telegram_id=3, body="x", created_at=old),
+            NotificationOutbox(idempotency_key="recent", telegram_id=4, body="x", status=OutboxStatus.SENT),
+        ])
+        await session.commit()
+
+    result = await RetentionService(sqlite_session_factory, cron_history_days=90).run(now=NOW)
+
+    assert result.outbox_rows_deleted == 2
+    async with sqlite_session_factory() as session:
+        assert set(await session.scalars(select(NotificationOutbox.idempotency_key))) == {"pending", "recent"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_run_is_skipped(sqlite_session_factory):
+    cache = InMemoryCache()
+    await cache.acquire_lock("lock:retention", ttl_seconds=60)
+
+    result = await RetentionService(sqlite_session_factory, lock=cache).run(now=NOW)
+
+    assert result.skipped
+
+
+@pytest.mark.asyncio
+async def test_audit_lookups_by_user_and_window(sqlite_session_factory):
+    async with sqlite_session_factory() as session:
+        session.add_all([
+            AuditLog(telegram_id=1, action="register", timestamp=NOW - timedelta(days=10)),
+            AuditLog(telegram_id=1, action="manual_scrape", timestamp=NOW - timedelta(days=2)),
+            AuditLog(telegram_id=1, action="manual_scrape", timestamp=NOW - timedelta(days=1)),
+            AuditLog(telegram_id=2, action="manual_scrape", timestamp=NOW - timedelta(days=1)),
+        ])
+        await session.commit()
+
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        recent = await uow.audit_logs.list_for_user(1, since=NOW - timedelta(days=5))
+        everything = await uow.audit_logs.list_for_user(1, limit=2)
+        scrapes = await uow.audit_logs.list_between(NOW - timedelta(days=3), NOW, action="manual_scrape")
+
+        assert [row.action for row in recent] == ["manual_scrape", "manual_scrape"]
+        assert [row.timestamp for row in everything] == [row.timestamp for row in recent]
+        assert sorted(row.telegram_id for row in scrapes) == [1, 1, 2]
@@ -0,0 +1,126 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from crypto.binding import credential_associated_data
+from crypto.cipher import AesGcmCipher
+from crypto.payload_codec import open_payloads_async
+from database.models import Base, Semester, SemesterResult, User, UserCredential
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.grades.service import GradeReadService
+from services.scheduler.service import SchedulerService
+
+from tests.integration.db.test_assessment_cache_db import _report
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _stored(session_factory) -> dict[str, tuple]:
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(
+                SemesterResult.academic_year,
+                SemesterResult.id,
+                SemesterResult.encrypted_result_detail,
+                SemesterResult.content_digest,
+            )
+        )
+        return {row.academic_year: tuple(row[1:]) for row in rows}
+
+
+def _second_term(grade: str):
+    report = _report("2023/2024", "22", grade)
+    course = report.course_grades[0].model_copy(update={"course_code": "MATH-2041", "course_name": "Linear Algebra"})
+    return report.model_copy(update={"course_grades": (course,)})
+
+
+@pytest.mark.asyncio
+async def test_cron_diff_only_decrypts_and_rewrites_changed_terms(sqlite_session_factory):
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = User(telegram_id=5, university_id="UGR/5555/15")
+        uow.session.add(user)
+        await uow.session.flush()
+        uow.session.add(UserCredential(
+            user_id=user.id, encrypted_password=cipher.encrypt("pw", credential_associated_data(user.id)), iv="iv"
+        ))
+        await GradeReadService(cipher=cipher)._persist_reports(
+            uow, user.id, None, [_report("2022/2023", "21", "A"), _second_term("")]
+        )
+        await uow.commit()
+    before = await _stored(sqlite_session_factory)
+
+    portal = AsyncMock()
+    portal.scrape = AsyncMock(return_value=(None, [_report("2022/2023", "21", "A"), _second_term("B")]))
+    scheduler = SchedulerService(portal_client=portal, session_factory=sqlite_session_factory, cipher=cipher)
+    opened = AsyncMock(side_effect=open_payloads_async)
+    with patch("services.grade_persistence.service.open_payloads_async", opened):
+        async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+            user = await uow.users.get_by_telegram_id(5)
+            new_released, _all_graded = await scheduler._scrape_user_and_detect(uow, user, "2023/2024", Semester.FIRST)
+
+    assert new_released == ["Linear Algebra (MATH-2041)"]
+    # Only the changed term was opened for the diff
+    assert len(opened.await_args.args[1]) == 1
+    after = await _stored(sqlite_session_factory)
+    assert after["2022/2023"] == before["2022/2023"]
+    assert after["2023/2024"][0] == before["2023/2024"][0]
+    assert after["2023/2024"][1:] != before["2023/2024"][1:]
+
+    # A second pass with nothing new opens nothing and reports nothing
+    opened.reset_mock()
+    with patch("services.grade_persistence.service.open_payloads_async", opened):
+        async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+            user = await uow.users.get_by_telegram_id(5)
+            new_released, _all_graded = await scheduler._scrape_user_and_detect(uow, user, "2023/2024", Semester.FIRST)
+    assert new_released == []
+    opened.assert_not_awaited()
+    assert await _stored(sqlite_session_factory) == after
+
+
+@pytest.mark.asyncio
+async def test_cron_waits_for_portal_budget_and_the_portal_outside_a_transaction(sqlite_session_factory):
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+        user = User(telegram_id=6, university_id="UGR/6666/15")
+        uow.session.add(user)
+        await uow.session.flush()
+        uow.session.add(UserCredential(
+            user_id=user.id, encrypted_password=cipher.encrypt("pw", credential_associated_data(user.id)), iv="iv"
+        ))
+        await uow.commit()
+
+    seen: list[tuple[str, bool]] = []
+    async with SqlAlchemyRepositoryUnitOfWork(sqlite_session_factory) as uow:
+
+        async def acquire_scheduled() -> bool:
+            seen.append(("budget", uow.session.in_transaction()))
+            return True
+
+        async def scrape(*_args):
+            seen.append(("portal", uow.session.in_transaction()))
+            return None, [_report("2022/2023", "21", "A")]
+
+        limiter = AsyncMock()
+        limiter.acquire_scheduled = acquire_scheduled
+        portal = AsyncMock()
+        portal.scrape = scrape
+        scheduler = SchedulerService(
+            portal_client=portal, session_factory=sqlite_session_factory, cipher=cipher, refresh_limiter=limiter
+        )
+        user = await uow.users.get_by_telegram_id(6)
+        await scheduler._scrape_user_and_detect(uow, user, "2022/2023", Semester.FIRST)
+
+    # No pooled connection is pinned while the task sleeps on the budget or the portal
+    assert seen == [("budget", False), ("portal", False)]
+    assert set(await _stored(sqlite_session_factory)) == {"2022/2023"}
@@ -94,7 +94,7 @@ class DummyLifecycleService:
 
 @dataclass
 class DummyNotificationService:
-    async def send_user(self, telegram_id: int, text: str) -> None:
+    async def send_user(self, telegram_id: int, text: str, background: bool = True) -> None:
         return None
 
     async def send_admin(self, text: str) -> None:
@@ -549,6 +549,12 @@ def test_full_database_registration_and_grade_read_service_e2e() -> None:
             async def add(self, *args, **kwargs): pass
             async def delete_by_user_id(self, *args, **kwargs): pass
 
+        class DummyGradeGraphRepo:
+            async def add_missing_courses(self, *args, **kwargs): pass
+            async def link_department_courses(self, *args, **kwargs): pass
+            async def upsert_user_courses(self, user_id, keys): return {key: f"uc-{i}" for i, key in enumerate(keys)}
+            async def upsert_assessments(self, rows): return {row["user_course_id"]: None for row in rows}
+
         class DummyUOW:
             def __init__(self):
                 self.session = DummySession()
@@ -559,6 +565,7 @@ def test_full_database_registration_and_grade_read_service_e2e() -> None:
                 self.assessments = DummyRepo()
                 self.user_courses = DummyRepo()
                 self.departments = DummyRepo()
+                self.grade_graph = DummyGradeGraphRepo()
                 
             async def __aenter__(self):
                 return self
@@ -593,7 +600,7 @@ def test_full_database_registration_and_grade_read_service_e2e() -> None:
             import base64
             iv_token = base64.urlsafe_b64encode(payload.nonce).decode("ascii")
 
-            cred_obj = SimpleNamespace(user_id="user-uuid-1", encrypted_password=encrypted, iv=iv_token)
+            cred_obj = SimpleNamespace(user_id="user-uuid-1", encrypted_password=encrypted, iv=iv_token, is_bound=False)
             stored_users[999] = user_obj
             stored_creds["user-uuid-1"] = cred_obj
 
@@ -605,3 +612,62 @@ def test_full_database_registration_and_grade_read_service_e2e() -> None:
 
     asyncio.run(scenario())
 
+
+
+def test_webhook_endpoint_checks_the_secret_and_bounds_concurrent_updates() -> None:
+    async def scenario() -> None:
+        settings = Settings(webhook_url="https://bot.example.com", webhook_secret="hook-secret", update_concurrency=2)
+        dispatcher = Dispatcher()
+        bot = Bot(token="123:FAKE")
+        release = asyncio.Event()
+        handled: list[int] = []
+        running = peak = 0
+
+        @dispatcher.message()
+        async def slow(message: Message) -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            handled.append(message.message_id)
+            running -= 1
+
+        app = build_http_app(settings, dispatcher=dispatcher, bot=bot)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[attr-defined]
+        url = f"http://127.0.0.1:{port}{settings.webhook_path}"
+
+        def update(n: int) -> dict:
+            message = _make_message(f"hello {n}").model_copy(update={"message_id": n})
+            return Update(update_id=n, message=message).model_dump(mode="json", exclude_none=True)
+
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=update(0)) as response:
+                assert response.status == 401
+            async with session.post(
+                url, json=update(0), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}
+            ) as response:
+                assert response.status == 401
+
+            async def post(n: int) -> int:
+                async with session.post(
+                    url, json=update(n), headers={"X-Telegram-Bot-Api-Secret-Token": "hook-secret"}
+                ) as response:
+                    return response.status
+
+            posts = [asyncio.create_task(post(n)) for n in range(1, 5)]
+            await asyncio.sleep(0.2)
+            # Two updates hold both slots; the other two requests wait for one
+            assert sum(task.done() for task in posts) == 2
+            release.set()
+            assert await asyncio.gather(*posts) == [200] * 4
+
+        await runner.cleanup()  # waits for the updates still being handled
+        assert sorted(handled) == [1, 2, 3, 4]
+        assert peak == 2
+        await bot.session.close()
+
+    asyncio.run(scenario())
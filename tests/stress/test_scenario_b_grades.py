@@ -175,7 +175,7 @@ def test_scenario_b_pagination_under_load() -> None:
             )
             from types import SimpleNamespace
             enc_data = cipher.encrypt(rep.model_dump_json())
-            reports.append(SimpleNamespace(encrypted_result_detail=enc_data))
+            reports.append(SimpleNamespace(academic_year=rep.academic_year, semester="FIRST", encrypted_result_detail=enc_data, is_bound=False))
 
         def uow_factory():
             return DummyUOW(reports)
@@ -4,8 +4,8 @@ Verifies that the notification service respects Telegram's rate limits:
 - Global: ~30 messages/second
 - Per-chat: 1 message/second
 
-If the notification service does NOT yet implement throttling, these tests
-document the gap and XFail to indicate future work needed.
+and that several bot instances sharing one cache (``SharedRateLimiter``) stay within
+those limits together, including when they take turns serving the same chats.
 """
 
 from __future__ import annotations
@@ -14,9 +14,8 @@ import asyncio
 import time
 from collections import defaultdict
 
-import pytest
-
-from services.notification.service import NotificationService
+from clients.cache_adapter import InMemoryCache
+from services.notification.service import NotificationService, SharedRateLimiter
 
 from tests.stress.conftest import MockNotificationSender, StressMetrics
 
@@ -55,10 +54,6 @@ def _count_per_chat_per_second(calls: list[tuple[int, float]]) -> dict[int, list
     return result
 
 
-@pytest.mark.xfail(
-    reason="Notification throttling not yet implemented — documenting the gap",
-    strict=False,
-)
 def test_scenario_e_global_rate_limit() -> None:
     """Send 100 notifications rapidly and verify ≤30 per second."""
 
@@ -75,6 +70,7 @@ def test_scenario_e_global_rate_limit() -> None:
             tasks.append(service.send_user(60000 + i, f"Notification {i}"))
 
         await asyncio.gather(*tasks)
+        await service.drain()
         metrics.end_time = time.perf_counter()
 
         # Analyze call distribution
@@ -95,10 +91,6 @@ def test_scenario_e_global_rate_limit() -> None:
     asyncio.run(scenario())
 
 
-@pytest.mark.xfail(
-    reason="Per-chat throttling not yet implemented — documenting the gap",
-    strict=False,
-)
 def test_scenario_e_per_chat_rate_limit() -> None:
     """Send multiple notifications to the same user and verify ≤1 per second."""
 
@@ -113,6 +105,7 @@ def test_scenario_e_per_chat_rate_limit() -> None:
             for i in range(10)
         ]
         await asyncio.gather(*tasks)
+        await service.drain()
 
         # Analyze per-chat distribution
         per_chat = _count_per_chat_per_second(sender.calls)
@@ -148,6 +141,7 @@ def test_scenario_e_notification_throughput_without_throttle() -> None:
             t0 = time.perf_counter()
             await service.send_user(80000 + i, f"Message {i}")
             metrics.record_latency(time.perf_counter() - t0)
+        await service.drain()
 
         metrics.end_time = time.perf_counter()
 
@@ -159,3 +153,103 @@ def test_scenario_e_notification_throughput_without_throttle() -> None:
         print(f"  [WARNING] Telegram limit is 30/sec -- throttling needed if burst > 30")
 
     asyncio.run(scenario())
+
+
+INSTANCES = 4
+SHARED_GLOBAL_LIMIT = 200
+SHARED_PERIOD = 0.2
+SHARED_DISTINCT_CHATS = 1500
+SHARED_BUSY_CHATS = 20
+MESSAGES_PER_SHARED_BUSY_CHAT = 5
+
+
+class _RecordingCache(InMemoryCache):
+    """Records every granted reservation per window key, on the clock the windows are kept on."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.granted: dict[str, list[float]] = defaultdict(list)
+
+    async def reserve_slots(self, hold_key: str, windows) -> tuple[float, int]:
+        wait, blocker = await super().reserve_slots(hold_key, windows)
+        if wait <= 0:
+            for key, _limit, _period in windows:
+                self.granted[key].append(self._windows[key][0][-1])
+        return wait, blocker
+
+
+def _max_in_window(times: list[float], period: float) -> int:
+    times = sorted(times)
+    best = start = 0
+    for end, t in enumerate(times):
+        # The slack only absorbs float rounding
+        while t - times[start] >= period - 1e-6:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def test_scenario_e_shared_limiters_hold_limits_across_instances() -> None:
+    """Four limiters on one cache grant no more than one limiter's budget between them."""
+
+    async def scenario() -> None:
+        cache = _RecordingCache()
+        limiters = [
+            SharedRateLimiter(cache, global_limit=SHARED_GLOBAL_LIMIT, user_limit=1, period=SHARED_PERIOD)
+            for _ in range(INSTANCES)
+        ]
+        granted = 0
+
+        async def send(instance: int, chat: int) -> None:
+            nonlocal granted
+            await limiters[instance].acquire(chat)
+            granted += 1
+
+        chats = list(range(SHARED_DISTINCT_CHATS)) + [
+            100_000 + chat for chat in range(SHARED_BUSY_CHATS) for _ in range(MESSAGES_PER_SHARED_BUSY_CHAT)
+        ]
+        t0 = time.perf_counter()
+        # Round-robin, so a busy chat's messages are spread over every instance
+        await asyncio.gather(*(send(n % INSTANCES, chat) for n, chat in enumerate(chats)))
+        elapsed = time.perf_counter() - t0
+
+        # Judged on the reservation times: the limiter's own monotonic grant time is read
+        # after the reservation returns, and a GC pause in between would skew it
+        global_times = cache.granted.pop("{notify}:global")
+        worst_global = _max_in_window(global_times, SHARED_PERIOD)
+        worst_chat = max(_max_in_window(times, SHARED_PERIOD) for times in cache.granted.values())
+        ideal = SHARED_DISTINCT_CHATS / (SHARED_GLOBAL_LIMIT / SHARED_PERIOD) + (
+            MESSAGES_PER_SHARED_BUSY_CHAT - 1
+        ) * SHARED_PERIOD
+
+        print(
+            f"\nScenario E (shared): {len(chats)} sends over {INSTANCES} instances | "
+            f"{elapsed:.2f}s wall (ideal {ideal:.2f}s) | worst window {worst_global}/{SHARED_GLOBAL_LIMIT} "
+            f"global, {worst_chat}/1 per chat"
+        )
+
+        assert granted == len(global_times) == len(chats)
+        assert worst_global <= SHARED_GLOBAL_LIMIT
+        assert worst_chat <= 1
+        assert elapsed < ideal * 2
+        assert all(limiter.pending == 0 and limiter.tracked_chats == 0 for limiter in limiters)
+
+    asyncio.run(scenario())
+
+
+def test_scenario_e_pause_on_one_instance_holds_back_the_others() -> None:
+    """A 429 seen by one instance pauses every instance sharing the cache."""
+
+    async def scenario() -> None:
+        cache = InMemoryCache()
+        first, second = (SharedRateLimiter(cache, global_limit=100) for _ in range(2))
+
+        first.pause(0.3)
+        await asyncio.sleep(0)  # let the hold reach the cache
+        t0 = time.monotonic()
+        granted = await second.acquire(1)
+
+        assert second.paused_for == 0.0
+        assert granted - t0 >= 0.25
+
+    asyncio.run(scenario())
@@ -0,0 +1,122 @@
+"""Stress Scenario F: Connection Pool Under Concurrent Force Refreshes.
+
+Runs 50 concurrent force refreshes against a pooled file-backed SQLite engine
+(pool_size=5, max_overflow=10 like production) while a slow portal holds each
+scrape open. A probe keeps checking out a connection throughout. Verifies that:
+1. Every refresh completes and persists its grades
+2. Pool checkout wait stays flat because no session is held during portal I/O
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import time
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from crypto.cipher import AesGcmCipher, Ciphertext
+from database.models import Base, SemesterResult, User, UserCredential
+from dto.bot import GradeReadRequest
+from services.grades.service import GradeReadService
+
+from tests.stress.conftest import MockPortalClient, MockCache, StressMetrics
+
+
+CONCURRENT_REFRESHES = 50
+PORTAL_LATENCY_SECONDS = 0.5
+PROBE_INTERVAL_SECONDS = 0.025
+MAX_P95_CHECKOUT_WAIT_SECONDS = 0.1
+
+
+async def _seed_users(session_factory: async_sessionmaker, cipher: AesGcmCipher) -> None:
+    async with session_factory() as session:
+        for idx in range(CONCURRENT_REFRESHES):
+            token = cipher.encrypt("password")
+            user = User(telegram_id=60000 + idx, university_id=f"UGR/{6000 + idx}/16")
+            session.add(user)
+            await session.flush()
+            session.add(UserCredential(
+                user_id=user.id,
+                encrypted_password=token,
+                iv=base64.urlsafe_b64encode(Ciphertext.from_token(token).nonce).decode("ascii"),
+                is_bound=False,
+            ))
+        await session.commit()
+
+
+async def _probe_checkout(engine, metrics: StressMetrics, stop: asyncio.Event) -> None:
+    """Repeatedly time how long it takes to check a connection out of the pool."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        async with engine.connect() as conn:
+            metrics.record_latency(time.perf_counter() - t0)
+            await conn.execute(text("SELECT 1"))
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+
+
+def test_scenario_f_refresh_does_not_hold_pool_connections(tmp_path) -> None:
+    """Force refreshes release their session while the portal is slow."""
+
+    async def scenario() -> None:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'refresh_pool.db'}",
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        await _seed_users(session_factory, cipher)
+
+        service = GradeReadService(
+            cache=MockCache(),
+            session_factory=session_factory,
+            cipher=cipher,
+            portal_client=MockPortalClient(latency_seconds=PORTAL_LATENCY_SECONDS),
+        )
+
+        refresh_metrics = StressMetrics()
+        probe_metrics = StressMetrics()
+        stop_probe = asyncio.Event()
+
+        async def refresh(idx: int) -> None:
+            request = GradeReadRequest(telegram_id=60000 + idx, force_refresh=True, page_index=0)
+            t0 = time.perf_counter()
+            try:
+                result = await service.read(request)
+                assert result.report is not None, result.message
+                refresh_metrics.record_latency(time.perf_counter() - t0)
+            except Exception as exc:
+                refresh_metrics.record_error(exc)
+
+        probe_task = asyncio.create_task(_probe_checkout(engine, probe_metrics, stop_probe))
+        refresh_metrics.start_time = probe_metrics.start_time = time.perf_counter()
+        await asyncio.gather(*(refresh(i) for i in range(CONCURRENT_REFRESHES)))
+        refresh_metrics.end_time = probe_metrics.end_time = time.perf_counter()
+        stop_probe.set()
+        await probe_task
+
+        async with session_factory() as session:
+            stored = await session.scalar(select(func.count()).select_from(SemesterResult))
+        await engine.dispose()
+
+        print(refresh_metrics.summary(f"Scenario F: {CONCURRENT_REFRESHES} concurrent force refreshes"))
+        print(probe_metrics.summary("Scenario F: pool checkout wait (probe)"))
+
+        assert refresh_metrics.error_count == 0, f"Errors: {refresh_metrics.errors[:5]}"
+        assert refresh_metrics.success_count == CONCURRENT_REFRESHES
+        assert stored == CONCURRENT_REFRESHES
+        assert probe_metrics.success_count > 0
+        # Holding a session across the scrape would queue the probe behind 15
+        # connections pinned for the whole portal latency.
+        assert probe_metrics.percentile(95) < MAX_P95_CHECKOUT_WAIT_SECONDS, (
+            f"P95 checkout wait {probe_metrics.percentile(95) * 1000:.1f}ms"
+        )
+
+    asyncio.run(scenario())
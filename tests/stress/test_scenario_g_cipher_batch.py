@@ -0,0 +1,120 @@
+"""Stress Scenario G: Batched Encryption at 10k-Record Scale.
+
+Seals and opens 10,000 grade payloads through the batched cipher API and compares
+it with the per-record path it replaced (encrypt, re-parse the token, re-encode the
+nonce). Verifies that:
+1. Every record round-trips and carries its own nonce
+2. The batched path is at least as fast as the per-record path
+3. Offloaded batches stall the event loop far less than running them inline
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+
+from crypto.cipher import AesGcmCipher, Ciphertext
+from crypto.payload_codec import open_payloads_async, seal_payloads, seal_payloads_async
+from parser.models import AssessmentReference, CourseGrade, GradeReport, GradeReportSummary
+
+
+RECORDS = 10_000
+
+
+def _payloads() -> list[dict]:
+    report = GradeReport(
+        academic_year="2023/2024",
+        year_label="Year III",
+        semester_label="Semester I",
+        course_grades=tuple(
+            CourseGrade(
+                course_number=i,
+                course_name=f"Course {i}",
+                course_code=f"SECT-30{i:02d}",
+                credit_hours=3.0,
+                ects=5.0,
+                grade="A",
+                assessment=AssessmentReference(academic_year_id="1", semester_id="1", course_id=f"{100 + i}"),
+            )
+            for i in range(6)
+        ),
+        summary=GradeReportSummary(sgp=12.0, sgpa=4.0, cgp=12.0, cgpa=4.0, academic_status="Pass"),
+    ).model_dump(mode="json")
+    return [dict(report, academic_year=f"{2000 + i % 25}/{2001 + i % 25}") for i in range(RECORDS)]
+
+
+def test_scenario_g_batched_cipher_throughput() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    texts = [json.dumps(payload) for payload in _payloads()]
+    plaintexts = [text.encode("utf-8") for text in texts]
+
+    t0 = time.perf_counter()
+    for text in texts:
+        token = cipher.encrypt(text)
+        base64.urlsafe_b64encode(Ciphertext.from_token(token).nonce).decode("ascii")
+    per_record = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sealed = cipher.encrypt_many(plaintexts)
+    ivs = [base64.urlsafe_b64encode(nonce).decode("ascii") for _blob, nonce in sealed]
+    batched = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    opened = cipher.decrypt_many([blob for blob, _nonce in sealed])
+    batched_open = time.perf_counter() - t0
+
+    print(
+        f"\nScenario G: {RECORDS} records | per-record encrypt {per_record * 1000:.0f}ms "
+        f"({RECORDS / per_record:.0f}/s) | encrypt_many {batched * 1000:.0f}ms ({RECORDS / batched:.0f}/s) "
+        f"| decrypt_many {batched_open * 1000:.0f}ms ({RECORDS / batched_open:.0f}/s)"
+    )
+
+    assert opened == plaintexts
+    assert len(set(ivs)) == RECORDS
+    assert all(blob[:AesGcmCipher.NONCE_SIZE] == nonce for blob, nonce in sealed)
+    # Generous margin for noisy CI timing; locally the batch is markedly faster.
+    assert batched < per_record * 1.2
+
+    sealed_payloads = seal_payloads(cipher, _payloads()[:100])
+    assert all(blob[:AesGcmCipher.NONCE_SIZE] == base64.urlsafe_b64decode(iv) for blob, iv in sealed_payloads)
+
+
+def test_scenario_g_offloaded_batches_keep_loop_responsive() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        payloads = _payloads()
+        # Inline, the loop would be blocked for the whole batch
+        t0 = time.perf_counter()
+        seal_payloads(cipher, payloads)
+        inline_stall = time.perf_counter() - t0
+        stalls: list[float] = []
+        done = asyncio.Event()
+
+        async def ticker() -> None:
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                stalls.append(now - last - 0.005)
+                last = now
+
+        tick_task = asyncio.create_task(ticker())
+        sealed = await seal_payloads_async(cipher, payloads)
+        opened = await open_payloads_async(cipher, [blob for blob, _iv in sealed])
+        done.set()
+        await tick_task
+
+        p95_stall = sorted(stalls)[int(len(stalls) * 0.95)]
+        print(
+            f"\nScenario G: event loop stall during 2x{RECORDS} offloaded records: "
+            f"P95 {p95_stall * 1000:.1f}ms, max {max(stalls) * 1000:.1f}ms (inline batch: {inline_stall * 1000:.0f}ms)"
+        )
+
+        assert opened == payloads
+        # Offloaded work still shares the GIL (JSON encoding, GC pauses), so judge the
+        # typical stall rather than the single worst one.
+        assert p95_stall < inline_stall / 10
+
+    asyncio.run(scenario())
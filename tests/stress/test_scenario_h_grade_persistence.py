@@ -0,0 +1,105 @@
+"""Stress Scenario H: Grade Persistence Write Path.
+
+Persists full transcripts (8 terms x 6 courses) for 50 users through
+GradePersistenceService on SQLite, then repeats the pass with nothing changed and
+with one new grade per user. Verifies that:
+1. SQL statements per transcript stay flat no matter how many courses it holds
+2. An unchanged transcript costs one digest lookup and no writes
+3. A single changed term is the only one rewritten, and its release is reported
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from crypto.cipher import AesGcmCipher
+from database.models import Base, User
+from parser.models import AssessmentReference, CourseGrade, GradeReport, GradeReportSummary
+from repositories.sqlalchemy.unit_of_work import SqlAlchemyRepositoryUnitOfWork
+from services.grade_persistence import GradePersistenceService
+
+
+USERS = 50
+TERMS = 8
+COURSES = 6
+
+
+def _transcript(released: int = 0) -> list[GradeReport]:
+    reports = []
+    for term in range(TERMS):
+        year = f"{2016 + term // 2}/{2017 + term // 2}"
+        last = term == TERMS - 1
+        reports.append(GradeReport(
+            academic_year=year,
+            year_label=f"Year {term // 2 + 1}",
+            semester_label="Semester I" if term % 2 == 0 else "Semester II",
+            course_grades=tuple(
+                CourseGrade(
+                    course_number=i,
+                    course_name=f"Course {term}-{i}",
+                    course_code=f"C-{term}{i:02d}",
+                    credit_hours=3.0,
+                    ects=5.0,
+                    grade="" if last and i >= released else "A",
+                    assessment=AssessmentReference(academic_year_id=str(term), semester_id="1", course_id=f"{term}{i}"),
+                )
+                for i in range(COURSES)
+            ),
+            summary=GradeReportSummary(sgp=12.0, sgpa=4.0, cgp=12.0, cgpa=4.0, academic_status="Pass"),
+        ))
+    return reports
+
+
+def test_scenario_h_grade_persistence_write_path() -> None:
+    async def scenario() -> None:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        persistence = GradePersistenceService()
+
+        async with session_factory() as session:
+            users = [User(telegram_id=i, university_id=f"UGR/{i:04d}/15") for i in range(USERS)]
+            session.add_all(users)
+            await session.commit()
+            user_ids = [user.id for user in users]
+
+        statements: list[str] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        async def run_pass(reports: list[GradeReport]) -> tuple[float, int, list]:
+            statements.clear()
+            results = []
+            t0 = time.perf_counter()
+            for user_id in user_ids:
+                async with SqlAlchemyRepositoryUnitOfWork(session_factory) as uow:
+                    results.append(await persistence.persist(uow, user_id, reports, cipher))
+                    await uow.commit()
+            return time.perf_counter() - t0, len(statements), results
+
+        initial_s, initial_stmts, _ = await run_pass(_transcript())
+        unchanged_s, unchanged_stmts, unchanged = await run_pass(_transcript())
+        changed_s, changed_stmts, changed = await run_pass(_transcript(released=1))
+        await engine.dispose()
+
+        print(
+            f"\nScenario H: {USERS} users x {TERMS * COURSES} courses | "
+            f"initial {initial_s * 1000:.0f}ms ({initial_stmts / USERS:.1f} stmts/user) | "
+            f"unchanged {unchanged_s * 1000:.0f}ms ({unchanged_stmts / USERS:.1f} stmts/user) | "
+            f"one new grade {changed_s * 1000:.0f}ms ({changed_stmts / USERS:.1f} stmts/user)"
+        )
+
+        # Roughly five round-trips per course before; now a fixed handful per transcript
+        assert initial_stmts / USERS <= 6
+        assert all(result.written == 0 and result.unchanged == TERMS for result in unchanged)
+        assert unchanged_stmts / USERS <= 2
+        assert all(result.written == 1 and result.released == ("Course 7-0 (C-700)",) for result in changed)
+        assert changed_stmts / USERS <= 8
+        assert unchanged_s < initial_s
+
+    asyncio.run(scenario())
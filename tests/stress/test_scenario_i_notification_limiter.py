@@ -0,0 +1,77 @@
+"""Stress Scenario I: Notification Rate Limiter Under a Release-Day Queue.
+
+Queues 10,000 sends at once (9,000 distinct chats plus 100 chats with ten messages
+each) behind a limiter scaled to 10,000 grants/second instead of Telegram's real
+30/s, so the run takes a few seconds rather than minutes. Verifies that:
+1. No window ever holds more grants than the global or per-chat limit
+2. The queue drains close to the ideal rate, with little CPU spent waiting
+3. Per-chat state is gone once the chats go idle
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+
+from services.notification.service import RateLimiter
+
+
+GLOBAL_LIMIT = 2000
+PERIOD = 0.2
+DISTINCT_CHATS = 9000
+BUSY_CHATS = 100
+MESSAGES_PER_BUSY_CHAT = 10
+
+
+def _max_in_window(times: list[float], period: float) -> int:
+    times = sorted(times)
+    best = start = 0
+    for end, t in enumerate(times):
+        # Grant times come from the limiter itself; the slack only absorbs float rounding
+        while t - times[start] >= period - 1e-6:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def test_scenario_i_limiter_drains_10k_queued_sends() -> None:
+    async def scenario() -> None:
+        limiter = RateLimiter(global_limit=GLOBAL_LIMIT, user_limit=1, period=PERIOD)
+        grants: list[tuple[int, float]] = []
+
+        async def send(chat: int) -> None:
+            grants.append((chat, await limiter.acquire(chat)))
+
+        chats = list(range(DISTINCT_CHATS)) + [
+            100_000 + chat for chat in range(BUSY_CHATS) for _ in range(MESSAGES_PER_BUSY_CHAT)
+        ]
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        await asyncio.gather(*(send(chat) for chat in chats))
+        elapsed, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+
+        per_chat: dict[int, list[float]] = defaultdict(list)
+        for chat, t in grants:
+            per_chat[chat].append(t)
+        worst_global = _max_in_window([t for _, t in grants], PERIOD)
+        worst_chat = max(_max_in_window(times, PERIOD) for times in per_chat.values())
+        # Busy chats queued behind the distinct ones, then need (messages - 1) more windows
+        ideal = DISTINCT_CHATS / (GLOBAL_LIMIT / PERIOD) + (MESSAGES_PER_BUSY_CHAT - 1) * PERIOD
+
+        await asyncio.sleep(PERIOD * 1.5)
+        await limiter.acquire(None)
+
+        print(
+            f"\nScenario I: {len(chats)} queued sends | {elapsed:.2f}s wall (ideal {ideal:.2f}s) | "
+            f"{cpu:.2f}s CPU | worst window {worst_global}/{GLOBAL_LIMIT} global, {worst_chat}/1 per chat | "
+            f"{limiter.tracked_chats} chats tracked after idle"
+        )
+
+        assert len(grants) == len(chats)
+        assert worst_global <= GLOBAL_LIMIT
+        assert worst_chat <= 1
+        assert elapsed < ideal * 1.5
+        assert limiter.tracked_chats == 0
+        assert limiter.pending == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,99 @@
+"""Stress Scenario J: Admin Broadcast to 20,000 Users.
+
+Streams one broadcast to 20,000 users on SQLite through BroadcastService and the
+queued NotificationService, with the limiter scaled to 20,000 sends/second instead
+of Telegram's 30/s (where the same job takes about 11 minutes). Verifies that:
+1. Every reachable user gets the message exactly once, blocked users are skipped
+2. The job keeps pace with the rate limit; paging the ids costs little on top
+3. The cursor and counts committed per page add up to the whole audience
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.models import Base, BroadcastJob, BroadcastStatus, User
+from services.broadcast import BroadcastService
+from services.notification import NotificationService
+
+
+USERS = 20_000
+BLOCKED = 500
+PAGE_SIZE = 500
+GLOBAL_LIMIT = 2000
+PERIOD = 0.1
+
+
+class _CountingSender:
+    def __init__(self) -> None:
+        self.sent: list[int] = []
+
+    async def send_message(self, telegram_id: int, text: str) -> None:
+        self.sent.append(telegram_id)
+
+    async def send_admin_alert(self, text: str) -> None:
+        pass
+
+    async def edit_message(self, telegram_id: int, message_id: int, text: str) -> None:
+        pass
+
+
+def test_scenario_j_broadcast_streams_20k_users() -> None:
+    async def scenario() -> None:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session:
+            await session.execute(insert(User), [
+                {"telegram_id": 1_000_000 + n, "university_id": f"UGR/{n}/15", "is_reachable": n >= BLOCKED}
+                for n in range(USERS)
+            ])
+            await session.commit()
+
+        statements = 0
+
+        def count(*_args) -> None:
+            nonlocal statements
+            statements += 1
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+        sender = _CountingSender()
+        notifications = NotificationService(sender, workers=16, global_limit=GLOBAL_LIMIT, period=PERIOD)
+        broadcasts = BroadcastService(session_factory, notifications, notifier=sender, page_size=PAGE_SIZE)
+
+        t0 = time.perf_counter()
+        progress = await broadcasts.start(1, "Exam timetable is out", status_message_id=1)
+        while broadcasts.running:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - t0
+        await notifications.close()
+
+        async with session_factory() as session:
+            job = await session.get(BroadcastJob, progress.job_id)
+        await engine.dispose()
+
+        audience = USERS - BLOCKED
+        ideal = audience / (GLOBAL_LIMIT / PERIOD)
+        pages = -(-audience // PAGE_SIZE)
+        print(
+            f"\nScenario J: {audience} recipients in {pages} pages | {elapsed:.2f}s wall (ideal {ideal:.2f}s) | "
+            f"{statements} SQL statements | {audience / elapsed:.0f} sends/s"
+        )
+
+        assert progress.total == audience
+        assert len(sender.sent) == len(set(sender.sent)) == audience
+        assert min(sender.sent) == 1_000_000 + BLOCKED
+        assert (job.status, job.sent, job.failed, job.cursor) == (
+            BroadcastStatus.COMPLETED, audience, 0, 1_000_000 + USERS - 1
+        )
+        # A page read and a progress write per page, not per user
+        assert statements <= pages * 4 + 10
+        assert elapsed < ideal * 1.5 + 0.5
+
+    asyncio.run(scenario())
@@ -0,0 +1,201 @@
+"""Stress Scenario K: Update Delivery by Long Polling vs Webhook.
+
+Replays the recorded updates in tests/fixtures/telegram/updates.json, cycled to 2,000
+updates from 200 chats arriving at 1,000/second, through both ways the bot can
+receive them: long polling against a fake Bot API session (one simulated round trip
+per getUpdates batch) and the webhook endpoint mounted by ``build_http_app`` over
+real local HTTP. Handlers only sleep, so the run measures delivery, not handler
+work. Verifies that:
+1. Every update is handled exactly once in both modes
+2. Neither mode runs more than UPDATE_CONCURRENCY handlers at once
+3. Both keep up with the arrival rate; arrival-to-handler latency is printed per mode
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import DeleteWebhook, GetMe, GetUpdates
+from aiogram.types import CallbackQuery, Message, Update, User
+from aiohttp import web
+
+from bootstrap import build_http_app
+from config import Settings
+
+from tests.stress.conftest import StressMetrics
+
+
+UPDATES = 2000
+CHATS = 200
+ARRIVALS_PER_SECOND = 1000
+HANDLER_SECONDS = 0.01
+ROUND_TRIP_SECONDS = 0.02
+UPDATE_CONCURRENCY = 32
+SECRET = "bench-secret"
+
+
+def _recorded_updates() -> list[dict[str, Any]]:
+    """The fixture cycled to ``UPDATES`` updates with fresh ids, spread over ``CHATS`` chats."""
+    recorded = json.loads((Path("tests/fixtures/telegram") / "updates.json").read_text(encoding="utf-8"))
+    updates = []
+    for n in range(UPDATES):
+        update = copy.deepcopy(recorded[n % len(recorded)])
+        update["update_id"] = n + 1
+        chat = 10_000 + n % CHATS
+        event = update.get("message") or update["callback_query"]
+        event["from"]["id"] = chat
+        message = update.get("message") or update["callback_query"]["message"]
+        message["chat"]["id"] = chat
+        updates.append(update)
+    return updates
+
+
+class _Handled:
+    def __init__(self) -> None:
+        self.started: dict[int, float] = {}
+        self.running = 0
+        self.peak = 0
+        self.done = asyncio.Event()
+
+    def dispatcher(self) -> Dispatcher:
+        dispatcher = Dispatcher()
+
+        async def handle(update_id: int) -> None:
+            self.started[update_id] = time.perf_counter()
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await asyncio.sleep(HANDLER_SECONDS)
+            self.running -= 1
+            if len(self.started) == UPDATES and self.running == 0:
+                self.done.set()
+
+        @dispatcher.message()
+        async def on_message(message: Message, event_update: Update) -> None:
+            await handle(event_update.update_id)
+
+        @dispatcher.callback_query()
+        async def on_callback(query: CallbackQuery, event_update: Update) -> None:
+            await handle(event_update.update_id)
+
+        return dispatcher
+
+
+class _ReplaySession(BaseSession):
+    """Bot API stand-in that answers getUpdates with the updates that have arrived so far."""
+
+    def __init__(self, updates: list[dict[str, Any]], arrivals: list[float]) -> None:
+        super().__init__()
+        self.updates = updates
+        self.arrivals = arrivals
+
+    async def make_request(self, bot: Bot, method: Any, timeout: int | None = None) -> Any:
+        if isinstance(method, GetMe):
+            return User(id=1, is_bot=True, first_name="Bench", username="bench_bot")
+        if isinstance(method, DeleteWebhook):
+            return True
+        assert isinstance(method, GetUpdates)
+        start = max(0, (method.offset or 1) - 1)
+        if start >= len(self.updates):
+            await asyncio.sleep(ROUND_TRIP_SECONDS)
+            return []
+        # Long poll: the request waits at Telegram until an update arrives
+        await asyncio.sleep(max(0.0, self.arrivals[start] - time.perf_counter()))
+        await asyncio.sleep(ROUND_TRIP_SECONDS / 2)
+        now = time.perf_counter()
+        end = start
+        while end < len(self.updates) and end - start < (method.limit or 100) and self.arrivals[end] <= now:
+            end += 1
+        return [Update.model_validate(update, context={"bot": bot}) for update in self.updates[start:end]]
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> Any:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+def _report(mode: str, handled: _Handled, arrivals: list[float]) -> StressMetrics:
+    metrics = StressMetrics(start_time=arrivals[0], end_time=max(handled.started.values()) + HANDLER_SECONDS)
+    for update_id, started in handled.started.items():
+        metrics.record_latency(started - arrivals[update_id - 1])
+    print(metrics.summary(f"Scenario K: {UPDATES} updates by {mode} (peak {handled.peak} handlers)"))
+    return metrics
+
+
+def _check(handled: _Handled, metrics: StressMetrics) -> None:
+    assert sorted(handled.started) == list(range(1, UPDATES + 1))
+    assert handled.peak <= UPDATE_CONCURRENCY
+    # The replay alone takes UPDATES / ARRIVALS_PER_SECOND; either mode should keep up with it
+    assert metrics.total_time < UPDATES / ARRIVALS_PER_SECOND * 1.5
+
+
+def test_scenario_k_long_polling_replay() -> None:
+    async def scenario() -> None:
+        updates = _recorded_updates()
+        handled = _Handled()
+        dispatcher = handled.dispatcher()
+        t0 = time.perf_counter() + 0.1
+        arrivals = [t0 + n / ARRIVALS_PER_SECOND for n in range(UPDATES)]
+        bot = Bot(token="123:FAKE", session=_ReplaySession(updates, arrivals))
+
+        polling = asyncio.create_task(
+            dispatcher.start_polling(
+                bot,
+                tasks_concurrency_limit=UPDATE_CONCURRENCY,
+                handle_signals=False,
+                close_bot_session=False,
+            )
+        )
+        await asyncio.wait_for(handled.done.wait(), timeout=30)
+        await dispatcher.stop_polling()
+        await polling
+
+        _check(handled, _report("long polling", handled, arrivals))
+
+    asyncio.run(scenario())
+
+
+def test_scenario_k_webhook_replay() -> None:
+    async def scenario() -> None:
+        updates = _recorded_updates()
+        handled = _Handled()
+        settings = Settings(
+            webhook_url="https://bot.example.com", webhook_secret=SECRET, update_concurrency=UPDATE_CONCURRENCY
+        )
+        bot = Bot(token="123:FAKE")
+        runner = web.AppRunner(build_http_app(settings, dispatcher=handled.dispatcher(), bot=bot))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[attr-defined]
+        url = f"http://127.0.0.1:{port}{settings.webhook_path}"
+
+        # Telegram keeps at most max_connections requests open, as set by main.py
+        connector = aiohttp.TCPConnector(limit=min(100, UPDATE_CONCURRENCY))
+        async with aiohttp.ClientSession(connector=connector) as session:
+            t0 = time.perf_counter() + 0.1
+            arrivals = [t0 + n / ARRIVALS_PER_SECOND for n in range(UPDATES)]
+
+            async def deliver(n: int) -> None:
+                await asyncio.sleep(max(0.0, arrivals[n] - time.perf_counter()))
+                async with session.post(
+                    url, json=updates[n], headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+                ) as response:
+                    assert response.status == 200
+
+            await asyncio.gather(*(deliver(n) for n in range(UPDATES)))
+            await asyncio.wait_for(handled.done.wait(), timeout=30)
+
+        await runner.cleanup()
+        await bot.session.close()
+        _check(handled, _report("webhook", handled, arrivals))
+
+    asyncio.run(scenario())
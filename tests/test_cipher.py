@@ -61,6 +61,37 @@ def test_ciphertext_token_round_trip() -> None:
     assert restored == payload
 
 
+def test_digest_is_deterministic_and_keyed() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    other = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+
+    assert cipher.digest("user:21:1:55") == cipher.digest("user:21:1:55")
+    assert cipher.digest("user:21:1:55") != cipher.digest("user:22:1:55")
+    assert cipher.digest("user:21:1:55") != other.digest("user:21:1:55")
+    assert len(cipher.digest("user:21:1:55")) == 64
+
+
 def test_reject_invalid_key_size() -> None:
     with pytest.raises(ValueError, match="requires a 32-byte key"):
         AesGcmCipher(b"too-short-key")
+
+
+def test_encrypt_many_returns_blob_and_nonce_pairs() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    plaintexts = [f"record-{i}".encode() for i in range(50)]
+
+    sealed = cipher.encrypt_many(plaintexts)
+
+    assert all(blob[:AesGcmCipher.NONCE_SIZE] == nonce for blob, nonce in sealed)
+    assert len({nonce for _blob, nonce in sealed}) == len(plaintexts)
+    assert cipher.decrypt_many([blob for blob, _nonce in sealed]) == plaintexts
+
+
+def test_decrypt_many_strict_and_lenient() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    (blob, _nonce), = cipher.encrypt_many([b"grade"])
+    legacy_token = cipher.encrypt("legacy")
+
+    assert cipher.decrypt_many([blob, legacy_token, b"tampered-bytes"], strict=False) == [b"grade", b"legacy", None]
+    with pytest.raises(ValueError):
+        cipher.decrypt_many([blob, b"tampered-bytes"])
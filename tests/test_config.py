@@ -24,3 +24,34 @@ def test_settings_rejects_invalid_port(monkeypatch):
         assert False, "Settings() should have raised ValueError for invalid port"
     except ValueError as exc:
         assert "PORT must be a positive integer" in str(exc)
+
+
+def test_settings_parses_quiet_hours(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "bot-token")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+    monkeypatch.setenv("NOTIFICATION_QUIET_HOURS", "22-7")
+    assert Settings().quiet_hours == (22, 7)
+
+    monkeypatch.setenv("NOTIFICATION_QUIET_HOURS", "late")
+    try:
+        Settings()
+        assert False, "Settings() should have rejected NOTIFICATION_QUIET_HOURS"
+    except ValueError as exc:
+        assert "NOTIFICATION_QUIET_HOURS" in str(exc)
+
+
+def test_settings_builds_webhook_endpoint_and_checks_its_secret(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "bot-token")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+    assert Settings().webhook_endpoint is None
+
+    monkeypatch.setenv("WEBHOOK_URL", "https://bot.example.com/")
+    monkeypatch.setenv("WEBHOOK_SECRET", "s3cret_token-1")
+    assert Settings().webhook_endpoint == "https://bot.example.com/telegram/webhook"
+
+    monkeypatch.setenv("WEBHOOK_SECRET", "not allowed!")
+    try:
+        Settings()
+        assert False, "Settings() should have rejected WEBHOOK_SECRET"
+    except ValueError as exc:
+        assert "WEBHOOK_SECRET" in str(exc)
@@ -0,0 +1,82 @@
+"""Tests for per-user data keys and the unwrapped key cache."""
+
+from __future__ import annotations
+
+import base64
+import uuid
+
+import pytest
+
+from crypto.cipher import AesGcmCipher
+from crypto.envelope import DataKeyCache, EnvelopeKeyring
+
+
+def _key() -> bytes:
+    return base64.urlsafe_b64decode(AesGcmCipher.generate_key())
+
+
+def test_data_key_round_trip_and_binding_to_user() -> None:
+    keyring = EnvelopeKeyring(_key())
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+
+    cipher, wrapped = keyring.new_data_key(alice)
+    token = cipher.encrypt("portal-password")
+
+    keyring.cache.clear()
+    assert keyring.cipher_for(alice, wrapped).decrypt(token) == "portal-password"
+    assert keyring.wrapped_key_id(wrapped) == keyring.master_key_id
+    # A wrapped key copied onto another user's row does not unwrap
+    with pytest.raises(ValueError):
+        keyring.cipher_for(bob, wrapped)
+    # The master key alone cannot read data-key rows
+    with pytest.raises(ValueError):
+        keyring.master.decrypt(token)
+
+
+def test_data_key_cipher_reads_rows_sealed_by_the_master_key() -> None:
+    keyring = EnvelopeKeyring(_key())
+    user_id = uuid.uuid4()
+    legacy = keyring.master.encrypt_bytes(b"sealed before data keys")
+
+    cipher = keyring.cipher_for(user_id, keyring.new_data_key(user_id)[1])
+
+    assert keyring.cipher_for(user_id, None) is keyring.master
+    assert cipher.decrypt_many([legacy, cipher.encrypt_bytes(b"new")]) == [b"sealed before data keys", b"new"]
+
+
+def test_rotation_rewraps_keys_without_changing_them() -> None:
+    old_key, new_key = _key(), _key()
+    user_id = uuid.uuid4()
+    old_ring = EnvelopeKeyring(old_key)
+    cipher, wrapped = old_ring.new_data_key(user_id)
+    blob = cipher.encrypt_bytes(b"grade row")
+
+    new_ring = EnvelopeKeyring(new_key, retired_keys=[old_key])
+    assert new_ring.needs_rewrap(wrapped)
+    assert new_ring.cipher_for(user_id, wrapped).decrypt_bytes(blob) == b"grade row"
+
+    rewrapped = new_ring.rewrap(user_id, wrapped)
+    assert not new_ring.needs_rewrap(rewrapped)
+    # After the old key is dropped, the re-wrapped key still opens existing rows
+    final_ring = EnvelopeKeyring(new_key)
+    assert final_ring.cipher_for(user_id, rewrapped).decrypt_bytes(blob) == b"grade row"
+    with pytest.raises(ValueError, match="unknown master key"):
+        final_ring.unwrap(user_id, wrapped)
+
+
+def test_data_key_cache_is_bounded_and_expires() -> None:
+    now = [0.0]
+    cache = DataKeyCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 3)
@@ -0,0 +1,118 @@
+import base64
+import json
+
+import pytest
+
+from crypto.binding import semester_result_associated_data
+from crypto.cipher import AesGcmCipher
+from crypto.payload_codec import (
+    FORMAT_ZLIB_JSON,
+    decode_payload,
+    encode_payload,
+    open_payload,
+    open_payloads,
+    payload_digest,
+    seal_payload,
+    seal_payloads,
+)
+from database.models import Semester
+from parser.models import AssessmentReference, CourseGrade, GradeReport, GradeReportSummary
+
+
+def _report(courses: int = 8) -> GradeReport:
+    return GradeReport(
+        academic_year="2023/2024",
+        year_label="Year III",
+        semester_label="Semester I",
+        course_grades=tuple(
+            CourseGrade(
+                course_number=i,
+                course_name=f"Software Engineering Topic {i}",
+                course_code=f"SECT-30{i:02d}",
+                credit_hours=3.0,
+                ects=5.0,
+                grade="A",
+                assessment=AssessmentReference(academic_year_id="14", semester_id="2", course_id=f"{900 + i}"),
+            )
+            for i in range(courses)
+        ),
+        summary=GradeReportSummary(sgp=12.0, sgpa=4.0, cgp=12.0, cgpa=4.0, academic_status="Pass"),
+    )
+
+
+def test_payload_round_trip_carries_version_byte() -> None:
+    report = _report()
+    raw = encode_payload(report)
+
+    assert raw[0] == FORMAT_ZLIB_JSON
+    assert GradeReport.model_validate(decode_payload(raw)) == report
+    assert decode_payload(encode_payload({"reference": None, "grade": "B+"})) == {"reference": None, "grade": "B+"}
+
+
+def test_legacy_json_payloads_stay_readable() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    report = _report()
+    legacy_token = cipher.encrypt(json.dumps(report.model_dump()))
+
+    # Text token as stored before the column change, and the bytes the migration decodes it to
+    assert GradeReport.model_validate(open_payload(cipher, legacy_token)) == report
+    migrated = base64.urlsafe_b64decode(legacy_token)
+    assert GradeReport.model_validate(open_payload(cipher, migrated)) == report
+
+
+def test_sealed_payload_is_smaller_than_legacy_token() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    report = _report()
+
+    sealed = seal_payload(cipher, report)
+    legacy_token = cipher.encrypt(json.dumps(report.model_dump()))
+
+    assert isinstance(sealed, bytes)
+    assert len(sealed) * 3 < len(legacy_token)
+    assert GradeReport.model_validate(open_payload(cipher, sealed)) == report
+
+
+def test_unknown_version_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        decode_payload(b"\x7f garbage")
+    with pytest.raises(ValueError):
+        decode_payload(b"")
+
+
+def test_bound_payload_cannot_be_moved_to_another_row() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    report = _report()
+    own = semester_result_associated_data("user-1", "2023/2024", Semester.FIRST)
+    other_user = semester_result_associated_data("user-2", "2023/2024", Semester.FIRST)
+    other_term = semester_result_associated_data("user-1", "2023/2024", Semester.SECOND)
+
+    sealed = seal_payload(cipher, report, own)
+
+    assert GradeReport.model_validate(open_payload(cipher, sealed, own)) == report
+    for wrong in (other_user, other_term, None):
+        with pytest.raises(ValueError):
+            open_payload(cipher, sealed, wrong)
+    # A blob sealed before binding existed only opens in a row still flagged as unbound
+    unbound = seal_payload(cipher, report)
+    assert open_payloads(cipher, [unbound, sealed], [own, other_user], [False, False]) == [
+        report.model_dump(mode="json"), None
+    ]
+    assert open_payloads(cipher, [unbound], [other_user]) == [None]
+    with pytest.raises(ValueError):
+        open_payload(cipher, unbound, other_user)
+
+
+def test_payload_digest_tracks_content_and_row() -> None:
+    cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    own = semester_result_associated_data("user-1", "2023/2024", Semester.FIRST)
+    report = _report()
+    changed = report.model_copy(update={"course_grades": report.course_grades[:-1]})
+
+    digest = payload_digest(cipher, report, own)
+    (blob, _iv), = seal_payloads(cipher, [report], [own])
+
+    assert digest == payload_digest(cipher, decode_payload(cipher.decrypt_bytes(blob, own)), own)
+    assert digest != payload_digest(cipher, changed, own)
+    assert digest != payload_digest(cipher, report, semester_result_associated_data("user-2", "2023/2024", Semester.FIRST))
+    other_key = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+    assert digest != payload_digest(other_key, report, own)
@@ -0,0 +1,71 @@
+"""Unit tests for deduplicated admin alerts."""
+
+from __future__ import annotations
+
+import asyncio
+
+from clients.aau_portal import PortalSchemaChangedError, SchemaChangeDiagnostic
+from services.notification.alerts import AdminAlertAggregator, schema_signature
+
+
+class _Admins:
+    def __init__(self) -> None:
+        self.alerts: list[str] = []
+
+    async def send_admin(self, text: str) -> None:
+        self.alerts.append(text)
+
+
+def _schema_error(selector: str, snippet: str) -> PortalSchemaChangedError:
+    return PortalSchemaChangedError(
+        "grade table missing",
+        SchemaChangeDiagnostic("grade", "grade table", selector, "no table", html_snippet=snippet),
+    )
+
+
+def test_signature_ignores_the_html_and_the_message() -> None:
+    first = _schema_error("table#grades", "<td>Student A</td>")
+    second = _schema_error("table#grades", "<td>Student B</td>")
+    assert schema_signature(first) == schema_signature(second) == "schema:grade|grade table|table#grades"
+    assert schema_signature(PortalSchemaChangedError("bare")) == "schema:PortalSchemaChangedError"
+
+
+def test_repeats_are_counted_into_one_summary_per_window() -> None:
+    async def scenario() -> None:
+        admins = _Admins()
+        alerts = AdminAlertAggregator(admins, window_seconds=0.05)
+
+        # A portal redesign seen by 200 users, plus one unrelated failure
+        for n in range(200):
+            await alerts.schema_changed(_schema_error("table#grades", f"<td>{n}</td>"), "a grades refresh")
+        await alerts.schema_changed(_schema_error("div.profile", "<div/>"), "registration")
+        assert len(admins.alerts) == 2
+        assert "&lt;td&gt;0&lt;/td&gt;" in admins.alerts[0]
+
+        await asyncio.sleep(0.08)
+        assert len(admins.alerts) == 3
+        assert "Repeated 199 more time(s)" in admins.alerts[2]
+        assert "table#grades" in admins.alerts[2] and "<td>" not in admins.alerts[2]
+
+        # Quiet windows are dropped, so the next occurrence alerts straight away
+        await asyncio.sleep(0.12)
+        assert alerts.stats()["open_windows"] == 0
+        assert await alerts.schema_changed(_schema_error("table#grades", ""), "a grades refresh") is True
+        await alerts.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_sends_the_pending_summaries() -> None:
+    async def scenario() -> None:
+        admins = _Admins()
+        alerts = AdminAlertAggregator(admins, window_seconds=60)
+        for _ in range(3):
+            await alerts.alert("portal-down", "Portal unreachable")
+        await alerts.close()
+
+        assert admins.alerts[0] == "Portal unreachable"
+        assert admins.alerts[1].startswith("🔁 <b>Repeated 2 more time(s) in the last 1 min</b>")
+        assert alerts.stats() == {"sent": 2, "suppressed": 2, "open_windows": 0}
+
+    asyncio.run(scenario())
@@ -0,0 +1,194 @@
+"""Unit tests for stale-while-revalidate force refresh and background job supervision."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from crypto.cipher import AesGcmCipher
+from database.models import Semester
+from dto.bot import GradeReadRequest
+from parser.models import (
+    AssessmentReference,
+    CourseGrade,
+    GradeReport,
+    GradeReportSummary,
+    ProfilePageResult,
+    StudentProfileData,
+)
+from services.background.service import BackgroundJobSupervisor
+from services.grades.service import GradeReadService, REFRESHING_MARKER, REFRESH_UNAVAILABLE_MARKER
+
+
+def _report(grade: str) -> GradeReport:
+    return GradeReport(
+        academic_year="2023/2024",
+        year_label="Year III",
+        semester_label="Semester I",
+        course_grades=(
+            CourseGrade(
+                course_number=1,
+                course_name="Software Engineering",
+                course_code="SECT-3082",
+                credit_hours=3.0,
+                ects=5.0,
+                grade=grade,
+                assessment=AssessmentReference(academic_year_id="1", semester_id="1", course_id="101"),
+            ),
+        ),
+        summary=GradeReportSummary(sgp=12.0, sgpa=4.0, cgp=12.0, cgpa=4.0, academic_status="Pass"),
+    )
+
+
+def _profile() -> ProfilePageResult:
+    return ProfilePageResult(
+        profile=StudentProfileData(full_name="Test", student_id="UGR/1234/16", department="SITE", year_level="Year III")
+    )
+
+
+def _mock_uow(cipher: AesGcmCipher, stored: list[GradeReport]) -> AsyncMock:
+    mock_user = SimpleNamespace(id="user-1", telegram_id=5, university_id="UGR/1234/16", department_id=None)
+    mock_cred = SimpleNamespace(user_id="user-1", encrypted_password=cipher.encrypt("pw"), is_valid=True, is_bound=False)
+
+    mock_uow = AsyncMock()
+    mock_uow.__aenter__ = AsyncMock(return_value=mock_uow)
+    mock_uow.__aexit__ = AsyncMock(return_value=False)
+    mock_uow.users = AsyncMock()
+    mock_uow.users.get_by_telegram_id = AsyncMock(return_value=mock_user)
+    mock_uow.credentials = AsyncMock()
+    mock_uow.credentials.get_by_user_id = AsyncMock(return_value=mock_cred)
+    mock_uow.courses = AsyncMock()
+    mock_uow.courses.get_by_id = AsyncMock(return_value=SimpleNamespace(course_id="SECT-3082"))
+    mock_uow.session = MagicMock()
+    mock_uow.session.scalars = AsyncMock(return_value=[
+        SimpleNamespace(
+            user_id="user-1",
+            academic_year=rep.academic_year,
+            semester=Semester.FIRST,
+            encrypted_result_detail=cipher.encrypt(json.dumps(rep.model_dump())),
+            is_bound=False,
+        )
+        for rep in stored
+    ])
+    mock_uow.session.scalar = AsyncMock(return_value=None)
+    mock_uow.session.execute = AsyncMock()
+    mock_uow.session.flush = AsyncMock()
+    return mock_uow
+
+
+def _refresh_request() -> GradeReadRequest:
+    return GradeReadRequest(telegram_id=5, force_refresh=True, page_index=0)
+
+
+def test_stale_while_revalidate_returns_stored_page_then_edits_with_fresh() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        portal = AsyncMock()
+        portal.scrape = AsyncMock(return_value=(_profile(), [_report("A+")]))
+        supervisor = BackgroundJobSupervisor()
+        updates = []
+
+        async def on_refreshed(result) -> None:
+            updates.append(result)
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [_report("B")])):
+            service = GradeReadService(
+                cipher=cipher,
+                portal_client=portal,
+                session_factory=MagicMock(),
+                background=supervisor,
+                stale_while_revalidate=True,
+            )
+            result = await service.read_stale_while_revalidate(_refresh_request(), on_refreshed)
+
+            assert result.refreshing is True
+            assert result.message.startswith(REFRESHING_MARKER)
+            assert "Grade: <b>B</b>" in result.message
+            assert supervisor.pending == 1
+
+            await supervisor.shutdown()
+
+        assert portal.scrape.await_count == 1
+        assert len(updates) == 1
+        assert updates[0].refreshing is False
+        assert "Grade: <b>A+</b>" in updates[0].message
+
+    asyncio.run(scenario())
+
+
+def test_stale_while_revalidate_reports_failure_over_stored_page() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        portal = AsyncMock()
+        portal.scrape = AsyncMock(side_effect=TimeoutError("Portal timed out"))
+        supervisor = BackgroundJobSupervisor()
+        updates = []
+
+        async def on_refreshed(result) -> None:
+            updates.append(result)
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [_report("B")])):
+            service = GradeReadService(
+                cipher=cipher,
+                portal_client=portal,
+                session_factory=MagicMock(),
+                background=supervisor,
+                stale_while_revalidate=True,
+            )
+            await service.read_stale_while_revalidate(_refresh_request(), on_refreshed)
+            await supervisor.shutdown()
+
+        assert len(updates) == 1
+        assert updates[0].message.startswith(REFRESH_UNAVAILABLE_MARKER)
+        assert "Grade: <b>B</b>" in updates[0].message
+        assert updates[0].report is not None
+
+    asyncio.run(scenario())
+
+
+def test_stale_while_revalidate_blocks_when_nothing_is_stored() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        portal = AsyncMock()
+        portal.scrape = AsyncMock(return_value=(_profile(), [_report("A")]))
+        supervisor = BackgroundJobSupervisor()
+        on_refreshed = AsyncMock()
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [])):
+            service = GradeReadService(
+                cipher=cipher,
+                portal_client=portal,
+                session_factory=MagicMock(),
+                background=supervisor,
+                stale_while_revalidate=True,
+            )
+            result = await service.read_stale_while_revalidate(_refresh_request(), on_refreshed)
+
+        assert result.refreshing is False
+        assert "Grade: <b>A</b>" in result.message
+        assert supervisor.pending == 0
+        on_refreshed.assert_not_awaited()
+
+    asyncio.run(scenario())
+
+
+def test_supervisor_logs_failures_and_cancels_on_shutdown() -> None:
+    async def scenario() -> None:
+        supervisor = BackgroundJobSupervisor(shutdown_timeout_seconds=0.05)
+        never = asyncio.Event()
+
+        async def failing() -> None:
+            raise RuntimeError("boom")
+
+        failed = supervisor.submit("failing", failing)
+        stuck = supervisor.submit("stuck", never.wait)
+        await asyncio.sleep(0)
+        await supervisor.shutdown()
+
+        assert failed.done() and failed.exception() is None
+        assert stuck.cancelled()
+        assert supervisor.submit("late", failing) is None
+
+    asyncio.run(scenario())
@@ -34,7 +34,10 @@ class TestDatabaseErrorPaths:
         mock_user = SimpleNamespace(id="user-1", telegram_id=123, university_id="UGR/1234/16")
         mock_db_result = SimpleNamespace(
             user_id="user-1",
-            encrypted_result_detail=cipher.encrypt("this is not json {{{")
+            academic_year="1",
+            semester="FIRST",
+            encrypted_result_detail=cipher.encrypt("this is not json {{{"),
+            is_bound=False,
         )
 
         mock_uow = AsyncMock()
@@ -53,9 +56,9 @@ class TestDatabaseErrorPaths:
         assert "No grades available" in result.message
 
     def test_force_refresh_honors_cooldown(self) -> None:
-        """When force_refresh=True and cooldown is active, fallback to DB."""
+        """When force_refresh=True and the refresh bucket is empty, fallback to DB."""
         cache = AsyncMock()
-        cache.get = AsyncMock(return_value="1")  # cooldown active
+        cache.consume_tokens = AsyncMock(return_value=600.0)  # bucket empty for 10 more minutes
 
         from crypto.cipher import AesGcmCipher
         cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
@@ -75,7 +78,8 @@ class TestDatabaseErrorPaths:
                 service.read(GradeReadRequest(telegram_id=123, page_index=0, force_refresh=True))
             )
 
-        cache.get.assert_any_call("cooldown:scrape:123")
+        cache.consume_tokens.assert_awaited_once()
+        cache.get.assert_not_awaited()
         assert "No grades available" in result.message
 
 
@@ -94,6 +98,7 @@ class TestPortalScrapeErrorPaths:
         mock_cred = SimpleNamespace(
             user_id="user-1",
             encrypted_password=cipher.encrypt("password123"),
+            is_bound=False,
         )
 
         mock_uow = AsyncMock()
@@ -143,6 +148,7 @@ class TestPortalScrapeErrorPaths:
         mock_cred = SimpleNamespace(
             user_id="user-1",
             encrypted_password=cipher.encrypt("pass"),
+            is_bound=False,
         )
 
         mock_uow = AsyncMock()
@@ -230,8 +236,8 @@ class TestPaginationEdgeCases:
         mock_uow.users.get_by_telegram_id = AsyncMock(return_value=mock_user)
         mock_uow.session = AsyncMock()
         mock_uow.session.scalars = AsyncMock(return_value=[
-            SimpleNamespace(user_id="user-1", encrypted_result_detail=cipher.encrypt(json.dumps(rep1.model_dump()))),
-            SimpleNamespace(user_id="user-1", encrypted_result_detail=cipher.encrypt(json.dumps(rep2.model_dump()))),
+            SimpleNamespace(user_id="user-1", academic_year="1", semester="FIRST", encrypted_result_detail=cipher.encrypt(json.dumps(rep1.model_dump())), is_bound=False),
+            SimpleNamespace(user_id="user-1", academic_year="1", semester="FIRST", encrypted_result_detail=cipher.encrypt(json.dumps(rep2.model_dump())), is_bound=False),
         ])
 
         with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=mock_uow):
@@ -259,8 +265,8 @@ class TestPaginationEdgeCases:
         mock_uow.users.get_by_telegram_id = AsyncMock(return_value=mock_user)
         mock_uow.session = AsyncMock()
         mock_uow.session.scalars = AsyncMock(return_value=[
-            SimpleNamespace(user_id="user-1", encrypted_result_detail=cipher.encrypt(json.dumps(rep1.model_dump()))),
-            SimpleNamespace(user_id="user-1", encrypted_result_detail=cipher.encrypt(json.dumps(rep2.model_dump()))),
+            SimpleNamespace(user_id="user-1", academic_year="1", semester="FIRST", encrypted_result_detail=cipher.encrypt(json.dumps(rep1.model_dump())), is_bound=False),
+            SimpleNamespace(user_id="user-1", academic_year="1", semester="FIRST", encrypted_result_detail=cipher.encrypt(json.dumps(rep2.model_dump())), is_bound=False),
         ])
 
         with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=mock_uow):
@@ -0,0 +1,173 @@
+"""Unit tests for single-flight coalescing of grade reads and refreshes."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from clients.cache_adapter import InMemoryCache
+from crypto.cipher import AesGcmCipher
+from dto.bot import GradeReadRequest
+from services.grades.service import GradeReadService, REFRESH_IN_PROGRESS_MESSAGE
+from services.grades.singleflight import SingleFlight
+
+from tests.unit.test_grade_refresh_modes import _mock_uow, _profile, _report
+
+
+def test_singleflight_shares_result_and_exception_then_forgets_key() -> None:
+    async def scenario() -> None:
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def work() -> str:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "done"
+
+        waiters = [asyncio.create_task(flights.do("k", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flights.in_flight == 1
+        release.set()
+        assert await asyncio.gather(*waiters) == ["done"] * 5
+        assert calls == 1
+        assert flights.in_flight == 0
+
+        async def failing() -> str:
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        failures = await asyncio.gather(
+            flights.do("k", failing), flights.do("k", failing), return_exceptions=True
+        )
+        assert all(isinstance(exc, RuntimeError) for exc in failures)
+        assert await flights.do("k", work) == "done"
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_hands_the_call_to_a_follower() -> None:
+    async def scenario() -> None:
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def work() -> str:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return f"call {calls}"
+
+        leader = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flights.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await asyncio.sleep(0)
+        assert flights.in_flight == 1 and not any(task.done() for task in followers)
+        release.set()
+        # One follower re-ran the work and the others shared its result
+        assert await asyncio.gather(*followers) == ["call 2"] * 3
+        assert calls == 2
+        assert flights.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_force_refreshes_share_one_scrape() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        portal = AsyncMock()
+
+        async def slow_scrape(*_args):
+            await asyncio.sleep(0.05)
+            return _profile(), [_report("A"), _report("B")]
+
+        portal.scrape = AsyncMock(side_effect=slow_scrape)
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [])):
+            service = GradeReadService(
+                cache=InMemoryCache(),
+                cipher=cipher,
+                portal_client=portal,
+                session_factory=MagicMock(),
+            )
+            results = await asyncio.gather(
+                service.read(GradeReadRequest(telegram_id=5, force_refresh=True, page_index=0)),
+                service.read(GradeReadRequest(telegram_id=5, force_refresh=True, page_index=0)),
+                service.read(GradeReadRequest(telegram_id=5, force_refresh=True, page_index=1)),
+            )
+
+        assert portal.scrape.await_count == 1
+        assert [r.current_page for r in results] == [0, 0, 1]
+        assert all(r.report is not None for r in results)
+
+    asyncio.run(scenario())
+
+
+def test_refresh_waits_for_leader_in_another_process() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        cache = InMemoryCache()
+        portal = AsyncMock()
+        # Another process holds the scrape lock and publishes its outcome on release.
+        await cache.acquire_lock("lock:scrape:5", ttl_seconds=60)
+
+        async def remote_leader() -> None:
+            await asyncio.sleep(0.05)
+            await cache.set("refresh:status:5", "ok", ttl_seconds=60)
+            await cache.release_lock("lock:scrape:5")
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [_report("A+")])):
+            service = GradeReadService(
+                cache=cache,
+                cipher=cipher,
+                portal_client=portal,
+                session_factory=MagicMock(),
+                refresh_poll_interval_seconds=0.01,
+            )
+            leader = asyncio.create_task(remote_leader())
+            result = await service.read(GradeReadRequest(telegram_id=5, force_refresh=True, page_index=0))
+            await leader
+
+        portal.scrape.assert_not_awaited()
+        assert "Grade: <b>A+</b>" in result.message
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("status", [None, "failed"])
+def test_refresh_wait_times_out_or_reports_remote_failure(status: str | None) -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        cache = InMemoryCache()
+        await cache.acquire_lock("lock:scrape:5", ttl_seconds=60)
+        if status is not None:
+            await cache.set("refresh:status:5", status, ttl_seconds=60)
+            await cache.release_lock("lock:scrape:5")
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [_report("A")])):
+            service = GradeReadService(
+                cache=cache,
+                cipher=cipher,
+                portal_client=AsyncMock(),
+                session_factory=MagicMock(),
+                refresh_wait_seconds=0.03,
+                refresh_poll_interval_seconds=0.01,
+            )
+            result = await service.read(GradeReadRequest(telegram_id=5, force_refresh=True, page_index=0))
+
+        if status is None:
+            assert result.message == REFRESH_IN_PROGRESS_MESSAGE
+        else:
+            assert result.report is None
+            assert "No grades available yet" in result.message
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+"""Unit tests for the event-driven notification rate limiter."""
+
+from __future__ import annotations
+
+import asyncio
+
+from services.notification.service import RateLimiter
+
+
+async def _granted(limiter: RateLimiter, user_id: int | None, label: str, log: list) -> None:
+    log.append((label, await limiter.acquire(user_id)))
+
+
+def test_per_chat_sends_are_spaced_by_the_window() -> None:
+    async def scenario() -> None:
+        limiter = RateLimiter(global_limit=100, user_limit=1, period=0.05)
+        log: list = []
+        await asyncio.gather(*(_granted(limiter, 1, str(i), log) for i in range(4)))
+
+        assert [label for label, _ in log] == ["0", "1", "2", "3"]
+        gaps = [b - a for (_, a), (_, b) in zip(log, log[1:])]
+        assert all(gap >= 0.045 for gap in gaps), gaps
+
+    asyncio.run(scenario())
+
+
+def test_global_window_grants_in_arrival_order() -> None:
+    async def scenario() -> None:
+        limiter = RateLimiter(global_limit=3, user_limit=1, period=0.05)
+        log: list = []
+        await asyncio.gather(*(_granted(limiter, chat, str(chat), log) for chat in range(9)))
+
+        assert [label for label, _ in log] == [str(chat) for chat in range(9)]
+        times = [t for _, t in log]
+        # Any four consecutive grants span at least one window
+        assert all(times[i + 3] - times[i] >= 0.045 for i in range(len(times) - 3))
+
+    asyncio.run(scenario())
+
+
+def test_throttled_chat_does_not_hold_up_other_chats() -> None:
+    async def scenario() -> None:
+        limiter = RateLimiter(global_limit=100, user_limit=1, period=0.1)
+        log: list = []
+        await asyncio.gather(
+            _granted(limiter, 1, "a1", log),
+            _granted(limiter, 1, "a2", log),
+            _granted(limiter, 2, "b1", log),
+            _granted(limiter, None, "admin", log),
+        )
+
+        assert [label for label, _ in log] == ["a1", "b1", "admin", "a2"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_slot() -> None:
+    async def scenario() -> None:
+        limiter = RateLimiter(global_limit=100, user_limit=1, period=0.05)
+        log: list = []
+        await limiter.acquire(1)
+        doomed = asyncio.create_task(_granted(limiter, 1, "cancelled", log))
+        await asyncio.sleep(0)
+        survivor = asyncio.create_task(_granted(limiter, 1, "next", log))
+        doomed.cancel()
+        await survivor
+
+        assert [label for label, _ in log] == ["next"]
+        assert limiter.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_chats_are_evicted_after_their_window() -> None:
+    async def scenario() -> None:
+        limiter = RateLimiter(global_limit=1000, user_limit=1, period=0.02)
+        await asyncio.gather(*(limiter.acquire(chat) for chat in range(50)))
+        assert limiter.tracked_chats == 50
+
+        await asyncio.sleep(0.05)
+        await limiter.acquire(999)
+
+        assert limiter.tracked_chats == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,335 @@
+"""Unit tests for the queued notification dispatcher."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from clients.telegram import ADMIN_ALERT_PREFIX, NotificationFloodControlError, RecipientUnreachableError
+from services.admin.service import AdminService
+from services.notification.service import DIGEST_SEPARATOR, NotificationService, group_for_digest, quiet_hours_delay
+
+
+class _SlowSender:
+    def __init__(self, latency: float = 0.0, gate: asyncio.Event | None = None) -> None:
+        self.latency = latency
+        self.gate = gate
+        self.calls: list[tuple[int, str]] = []
+
+    async def send_message(self, telegram_id: int, text: str) -> None:
+        if self.gate is not None:
+            await self.gate.wait()
+        await asyncio.sleep(self.latency)
+        if text == "boom":
+            raise RuntimeError("telegram down")
+        self.calls.append((telegram_id, text))
+
+    async def send_admin_alert(self, text: str) -> None:
+        self.calls.append((0, text))
+
+
+def test_send_returns_before_delivery_and_workers_pipeline_slow_sends() -> None:
+    async def scenario() -> None:
+        sender = _SlowSender(latency=0.1)
+        service = NotificationService(sender, workers=10, global_limit=1000, period=0.05)
+
+        started = time.perf_counter()
+        for chat in range(20):
+            await service.send_user(chat, f"m{chat}")
+        assert time.perf_counter() - started < 0.05
+        assert sender.calls == []
+
+        await service.drain()
+        # Ten sends in flight at a time: two rounds of 0.1s, not twenty
+        assert time.perf_counter() - started < 0.5
+        assert sorted(chat for chat, _ in sender.calls) == list(range(20))
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_one_chat_keeps_its_order_across_workers() -> None:
+    async def scenario() -> None:
+        sender = _SlowSender()
+        service = NotificationService(sender, workers=4, period=0.02)
+        for n in range(6):
+            await service.send_user(7, f"m{n}")
+        await service.send_admin("alert")
+        await service.drain()
+
+        assert [text for chat, text in sender.calls if chat == 7] == [f"m{n}" for n in range(6)]
+        assert (0, "alert") in sender.calls
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_blocks_producers() -> None:
+    async def scenario() -> None:
+        gate = asyncio.Event()
+        service = NotificationService(_SlowSender(gate=gate), workers=1, max_queue=2, global_limit=100)
+        for chat in range(3):
+            await service.send_user(chat, "x")  # one taken by the worker, two queued
+        await asyncio.sleep(0.01)
+
+        blocked = asyncio.create_task(service.send_user(99, "x"))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        assert service.queue_depth == 2
+
+        gate.set()
+        await blocked
+        await service.drain()
+        assert service.sent == 4
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_drains_then_reports_what_it_abandoned() -> None:
+    async def scenario() -> None:
+        sender = _SlowSender()
+        service = NotificationService(sender, workers=2, global_limit=100)
+        for chat in range(5):
+            await service.send_user(chat, "x")
+        assert await service.close(timeout=1.0) == 0
+        assert len(sender.calls) == 5
+
+        # After close, sends go out inline
+        await service.send_user(42, "late")
+        assert sender.calls[-1] == (42, "late")
+
+        stuck = NotificationService(_SlowSender(gate=asyncio.Event()), workers=1, global_limit=100)
+        for chat in range(3):
+            await stuck.send_user(chat, "x")
+        assert await stuck.close(timeout=0.05) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failures_and_latency_show_up_in_metrics() -> None:
+    async def scenario() -> None:
+        service = NotificationService(_SlowSender(latency=0.01), workers=2, global_limit=100)
+        await service.send_user(1, "ok")
+        await service.send_user(2, "boom")
+        await service.drain()
+
+        stats = service.stats()
+        assert (stats["sent"], stats["failed"], stats["queue_depth"]) == (1, 1, 0)
+        assert stats["latency_p95_seconds"] >= 0.01
+
+        snapshot = await AdminService(notifications=service).metrics_snapshot()
+        assert snapshot.details["notifications"]["sent"] == 1
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+class _FlakySender:
+    """Raises the queued errors in turn before accepting each message."""
+
+    def __init__(self, errors: list[Exception] | None = None) -> None:
+        self.errors = errors or []
+        self.calls: list[tuple[int, str, float]] = []
+
+    async def send_message(self, telegram_id: int, text: str) -> None:
+        if self.errors:
+            raise self.errors.pop(0)
+        self.calls.append((telegram_id, text, time.monotonic()))
+
+    async def send_admin_alert(self, text: str) -> None:
+        self.calls.append((0, text, time.monotonic()))
+
+
+def test_flood_control_pauses_every_worker_and_halves_the_rate() -> None:
+    async def scenario() -> None:
+        sender = _FlakySender([NotificationFloodControlError(0.2)])
+        service = NotificationService(
+            sender, workers=4, global_limit=40, min_global_limit=10, max_global_limit=40, period=0.05
+        )
+        started = time.monotonic()
+        for chat in range(4):
+            await service.send_user(chat, f"m{chat}")
+        await service.drain()
+
+        # The 429'd message is retried, and nothing at all went out during the pause
+        assert sorted(chat for chat, _, _ in sender.calls) == [0, 1, 2, 3]
+        assert min(at for _, _, at in sender.calls) - started >= 0.2
+        stats = service.stats()
+        assert (stats["sent"], stats["failed"], stats["flood_waits"]) == (4, 0, 1)
+        assert stats["global_rate_limit"] == 20
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_rate_recovers_one_step_per_clean_window_up_to_the_ceiling() -> None:
+    async def scenario() -> None:
+        service = NotificationService(
+            _FlakySender(), workers=2, global_limit=2, min_global_limit=1, max_global_limit=3, period=0.01
+        )
+        for chat in range(12):
+            await service.send_user(chat, "x")
+        await service.drain()
+        assert service.limiter.global_limit == 3
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_sends_are_requeued_until_attempts_run_out() -> None:
+    async def scenario() -> None:
+        sender = _FlakySender([RuntimeError("timeout")])
+        service = NotificationService(sender, workers=1, global_limit=100, max_attempts=2)
+        await service.send_user(1, "retried")
+        await service.drain()
+        assert [text for _, text, _ in sender.calls] == ["retried"]
+
+        sender.errors = [RuntimeError("timeout")] * 2
+        await service.send_user(2, "dropped")
+        await service.drain()
+        stats = service.stats()
+        assert (stats["sent"], stats["failed"], stats["requeued"]) == (1, 1, 2)
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_blocked_chats_are_reported_once_and_skipped_until_reachable() -> None:
+    async def scenario() -> None:
+        flagged: list[int] = []
+
+        async def on_unreachable(telegram_id: int) -> None:
+            flagged.append(telegram_id)
+
+        sender = _FlakySender([RecipientUnreachableError("bot was blocked by the user")])
+        service = NotificationService(sender, workers=1, global_limit=100, on_unreachable=on_unreachable)
+        await service.send_user(5, "first")
+        await service.drain()
+        await service.send_user(5, "second")
+        try:
+            await service.deliver(5, "third")
+        except RecipientUnreachableError:
+            pass
+        else:
+            raise AssertionError("deliver should report the blocked chat")
+        await service.drain()
+
+        assert flagged == [5]
+        assert sender.calls == []
+        assert service.stats()["skipped_unreachable"] == 3
+
+        service.mark_reachable(5)
+        assert await service.deliver(5, "welcome back") is True
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_digest_coalesces_a_chats_messages_within_the_window() -> None:
+    async def scenario() -> None:
+        sender = _SlowSender()
+        service = NotificationService(sender, global_limit=100, digest_window_seconds=0.05)
+        for subject in ("Calculus", "Physics", "Drawing"):
+            await service.send_user(1, f"Update for {subject}")
+        await service.send_user(2, "Only one")
+        await service.send_admin("alert")
+        await service.drain()
+        assert sender.calls == [(0, "alert")]  # admin alerts are not held
+
+        await asyncio.sleep(0.08)
+        await service.drain()
+        assert sorted(sender.calls)[1:] == [
+            (1, DIGEST_SEPARATOR.join(f"Update for {s}" for s in ("Calculus", "Physics", "Drawing"))),
+            (2, "Only one"),
+        ]
+        assert service.stats()["digested"] == 2
+
+        # Held digests are sent rather than dropped on shutdown
+        await service.send_user(3, "late")
+        await service.close()
+        assert sender.calls[-1] == (3, "late")
+
+    asyncio.run(scenario())
+
+
+def test_admin_alerts_take_one_limiter_slot_per_admin() -> None:
+    async def scenario() -> None:
+        sender = _SlowSender()
+        sender.admin_telegram_ids = [11, 12, 13]
+        service = NotificationService(sender, global_limit=100)
+        slots: list[int | None] = []
+        acquire = service.limiter.acquire
+
+        async def counting_acquire(user_id: int | None = None) -> float:
+            slots.append(user_id)
+            return await acquire(user_id=user_id)
+        service.limiter.acquire = counting_acquire
+
+        await service.send_admin("portal down")
+        await service.drain()
+        assert sorted(slots) == [11, 12, 13]
+        assert sorted(sender.calls) == [(admin, f"{ADMIN_ALERT_PREFIX}portal down") for admin in (11, 12, 13)]
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def _quiet_now() -> tuple[int, int]:
+    """Quiet hours that have just begun."""
+    hour = datetime.now().hour
+    return hour, (hour + 2) % 24
+
+
+def test_user_triggered_notices_bypass_digests_and_quiet_hours() -> None:
+    async def scenario() -> None:
+        sender = _SlowSender()
+        service = NotificationService(sender, global_limit=100, digest_window_seconds=60, quiet_hours=_quiet_now())
+        await service.send_user(1, "Grade released")
+        await service.send_user(1, "Authentication failed", background=False)
+        await service.drain()
+        assert sender.calls == [(1, "Authentication failed")]
+        assert service.stats()["digest_held_chats"] == 1
+        await service.close()
+        assert sender.calls[-1] == (1, "Grade released")
+
+    asyncio.run(scenario())
+
+
+def test_manual_refresh_auth_failure_is_not_held_for_quiet_hours() -> None:
+    async def scenario() -> None:
+        from clients.aau_portal import PortalAuthenticationError
+        from dto.bot import GradeReadRequest
+        from services.grades.service import GradeReadService
+
+        sender = _SlowSender()
+        notifications = NotificationService(sender, global_limit=100, quiet_hours=_quiet_now())
+        uow = AsyncMock()
+        uow.__aenter__ = AsyncMock(return_value=uow)
+        uow.__aexit__ = AsyncMock(return_value=False)
+        uow.credentials.get_by_user_id = AsyncMock(return_value=None)
+        uow.session = MagicMock()
+        service = GradeReadService(session_factory=MagicMock(), notification_service=notifications)
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=uow):
+            await service._record_refresh_failure(
+                GradeReadRequest(telegram_id=8, force_refresh=True), "user-8", "UGR/8888/16",
+                PortalAuthenticationError("bad password"),
+            )
+        await notifications.drain()
+        assert [chat for chat, text in sender.calls if "Authentication Failed" in text] == [8]
+        await notifications.close()
+
+    asyncio.run(scenario())
+
+
+def test_digest_splits_at_the_telegram_message_limit() -> None:
+    assert group_for_digest(["a" * 3100, "b" * 1000, "c" * 100, "d"], limit=4096) == [[0], [1, 2, 3]]
+
+
+def test_quiet_hours_defer_to_the_end_of_the_night() -> None:
+    assert quiet_hours_delay(datetime(2026, 10, 19, 23, 30), (22, 7)) == 7.5 * 3600
+    assert quiet_hours_delay(datetime(2026, 10, 20, 6, 0), (22, 7)) == 3600
+    assert quiet_hours_delay(datetime(2026, 10, 20, 7, 0), (22, 7)) == 0
+    assert quiet_hours_delay(datetime(2026, 10, 20, 13, 15), (13, 14)) == 45 * 60
@@ -0,0 +1,79 @@
+"""Unit tests for token-bucket refresh limiting."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from clients.cache_adapter import InMemoryCache
+from crypto.cipher import AesGcmCipher
+from dto.bot import GradeReadRequest
+from services.grades.limiter import GLOBAL_BUCKET_KEY, RefreshLimiter
+from services.grades.service import GradeReadService
+
+from tests.unit.test_grade_refresh_modes import _mock_uow, _report
+
+
+def test_in_memory_token_buckets_allow_bursts_and_are_all_or_nothing() -> None:
+    async def scenario() -> None:
+        cache = InMemoryCache()
+        user = ("tokens:refresh:1", 2.0, 1 / 60)
+        shared = ("tokens:portal:global", 3.0, 1 / 60)
+
+        assert await cache.consume_tokens([user, shared]) == 0.0
+        assert await cache.consume_tokens([user, shared]) == 0.0
+        wait = await cache.consume_tokens([user, shared])
+        assert 59 < wait <= 60
+
+        # The global bucket still has one token; a second user can spend it...
+        other = ("tokens:refresh:2", 2.0, 1 / 60)
+        assert await cache.consume_tokens([other, shared]) == 0.0
+        # ...but once it is empty, nothing is taken from the user's own bucket.
+        assert await cache.consume_tokens([other, shared]) > 0
+        assert await cache.consume_tokens([other]) == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limited_force_refresh_serves_stored_grades_in_one_round_trip() -> None:
+    async def scenario() -> None:
+        cipher = AesGcmCipher.from_base64_key(AesGcmCipher.generate_key())
+        cache = InMemoryCache()
+        cache.get = AsyncMock(wraps=cache.get)
+        portal = AsyncMock()
+        limiter = RefreshLimiter(cache, user_burst=1, user_refill_seconds=1800)
+        limiter.cache.consume_tokens = AsyncMock(return_value=1500.0)
+
+        with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=_mock_uow(cipher, [_report("B")])):
+            service = GradeReadService(
+                cache=cache,
+                cipher=cipher,
+                portal_client=portal,
+                session_factory=MagicMock(),
+                refresh_limiter=limiter,
+            )
+            result = await service.read(GradeReadRequest(telegram_id=5, force_refresh=True, page_index=0))
+
+        portal.scrape.assert_not_awaited()
+        limiter.cache.consume_tokens.assert_awaited_once()
+        cache.get.assert_not_awaited()
+        assert "refresh again in 25 min" in result.message
+        assert "Grade: <b>B</b>" in result.message
+
+    asyncio.run(scenario())
+
+
+def test_scheduled_scrapes_wait_for_the_shared_global_budget() -> None:
+    async def scenario() -> None:
+        cache = InMemoryCache()
+        limiter = RefreshLimiter(cache, global_burst=1, global_per_minute=600)
+
+        assert await limiter.try_manual_refresh(7) == 0.0
+        t0 = time.perf_counter()
+        assert await limiter.acquire_scheduled() is True
+        assert time.perf_counter() - t0 >= 0.08
+        assert await limiter.acquire_scheduled(max_wait_seconds=0.01) is False
+        assert await cache.get(GLOBAL_BUCKET_KEY) is not None
+
+    asyncio.run(scenario())
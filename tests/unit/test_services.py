@@ -226,7 +226,7 @@ async def _grade_read_round_trip() -> None:
     mock_uow.session = AsyncMock()
     import json
     mock_uow.session.scalars = AsyncMock(return_value=[
-        SimpleNamespace(user_id="user-1", encrypted_result_detail=cipher.encrypt(json.dumps(rep.model_dump()))),
+        SimpleNamespace(user_id="user-1", academic_year="1", semester="FIRST", encrypted_result_detail=cipher.encrypt(json.dumps(rep.model_dump())), is_bound=False),
     ])
 
     with patch("repositories.sqlalchemy.unit_of_work.SqlAlchemyRepositoryUnitOfWork", return_value=mock_uow):
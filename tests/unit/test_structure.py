@@ -57,7 +57,7 @@ class DummyLifecycleService:
 
 @dataclass
 class DummyNotificationService:
-    async def send_user(self, telegram_id: int, text: str) -> None:
+    async def send_user(self, telegram_id: int, text: str, background: bool = True) -> None:
         return None
 
     async def send_admin(self, text: str) -> None:
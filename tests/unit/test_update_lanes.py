@@ -0,0 +1,124 @@
+"""Unit tests for per-chat update ordering and processing lanes."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from handlers.commands.my_data import ProfileUpdateState
+from handlers.middlewares.lanes import (
+    FAST_LANE,
+    SLOW_LANE,
+    ChatOrderIsolation,
+    UpdateLanesMiddleware,
+    update_lane,
+)
+
+
+def _message(update_id: int, chat: int, text: str) -> Update:
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id,
+        date=datetime.now(timezone.utc),
+        chat=Chat(id=chat, type="private"),
+        from_user=User(id=chat, is_bot=False, first_name="Tester"),
+        text=text,
+    ))
+
+
+def _callback(update_id: int, chat: int, data: str) -> Update:
+    return Update(update_id=update_id, callback_query=CallbackQuery(
+        id=str(update_id),
+        chat_instance="1",
+        from_user=User(id=chat, is_bot=False, first_name="Tester"),
+        data=data,
+        message=_message(update_id, chat, "menu").message,
+    ))
+
+
+def _dispatcher(isolation: ChatOrderIsolation, lanes: UpdateLanesMiddleware) -> Dispatcher:
+    dispatcher = Dispatcher(events_isolation=isolation)
+    dispatcher.update.middleware(lanes)
+    return dispatcher
+
+
+def test_portal_bound_updates_take_the_slow_lane() -> None:
+    assert update_lane(_callback(1, 1, "grade_r:Year 3:One")) == SLOW_LANE
+    assert update_lane(_callback(1, 1, "grade_c:Year 3:One:0")) == SLOW_LANE
+    assert update_lane(_callback(1, 1, "confirm_registration")) == SLOW_LANE
+    assert update_lane(_callback(1, 1, "grade_y:Year 3")) == FAST_LANE
+    assert update_lane(_message(1, 1, "/start")) == FAST_LANE
+
+    # The new password is checked against the portal; a command typed instead is not
+    waiting = ProfileUpdateState.waiting_for_password.state
+    assert update_lane(_message(1, 1, "new-password"), waiting) == SLOW_LANE
+    assert update_lane(_message(1, 1, "/cancel"), waiting) == FAST_LANE
+
+
+def test_updates_for_one_chat_run_in_order_while_chats_overlap() -> None:
+    async def scenario() -> None:
+        isolation = ChatOrderIsolation()
+        dispatcher = _dispatcher(isolation, UpdateLanesMiddleware(fast_concurrency=8))
+        bot = Bot(token="123:FAKE")
+        events: list[tuple[str, int, int]] = []
+
+        @dispatcher.message()
+        async def handle(message: Message) -> None:
+            events.append(("start", message.chat.id, message.message_id))
+            # Later updates of a chat are quicker, so without ordering they would overtake
+            await asyncio.sleep(0.05 / message.message_id)
+            events.append(("end", message.chat.id, message.message_id))
+
+        updates = [_message(n, chat, f"step {n}") for n in range(1, 4) for chat in (1, 2)]
+        # As polling does: one task per update, created in arrival order
+        await asyncio.gather(*(asyncio.create_task(dispatcher.feed_update(bot, update)) for update in updates))
+
+        for chat in (1, 2):
+            assert [(kind, n) for kind, c, n in events if c == chat] == [
+                ("start", 1), ("end", 1), ("start", 2), ("end", 2), ("start", 3), ("end", 3)
+            ]
+        # Chat 2 started before chat 1 finished its first update
+        assert events.index(("start", 2, 1)) < events.index(("end", 1, 1))
+        assert isolation.tracked_chats == 0
+        await bot.session.close()
+
+    asyncio.run(scenario())
+
+
+def test_a_stalled_slow_lane_does_not_hold_up_fast_updates() -> None:
+    async def scenario() -> None:
+        lanes = UpdateLanesMiddleware(fast_concurrency=2, slow_concurrency=1)
+        dispatcher = _dispatcher(ChatOrderIsolation(), lanes)
+        bot = Bot(token="123:FAKE")
+        portal = asyncio.Event()
+        answered: list[int] = []
+
+        @dispatcher.callback_query()
+        async def refresh(query: CallbackQuery) -> None:
+            await portal.wait()
+
+        @dispatcher.message()
+        async def start(message: Message) -> None:
+            answered.append(message.chat.id)
+
+        refreshes = [
+            asyncio.create_task(dispatcher.feed_update(bot, _callback(n, 100 + n, "grade_r:Year 3:One")))
+            for n in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        assert (lanes.running[SLOW_LANE], lanes.waiting[SLOW_LANE]) == (1, 2)
+
+        await asyncio.wait_for(
+            asyncio.gather(*(dispatcher.feed_update(bot, _message(10 + n, 200 + n, "/start")) for n in range(5))),
+            timeout=1,
+        )
+        assert sorted(answered) == [200, 201, 202, 203, 204]
+
+        portal.set()
+        await asyncio.gather(*refreshes)
+        assert lanes.running == {FAST_LANE: 0, SLOW_LANE: 0}
+        await bot.session.close()
+
+    asyncio.run(scenario())